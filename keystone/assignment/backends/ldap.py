@@ -277,7 +277,28 @@ class Assignment(assignment.Driver):
         return self._roles_from_role_dicts(metadata_ref.get('roles', []),
                                            inherited_to_projects)
 
-    def list_role_assignments(self):
+    def list_role_assignments(self, role_id=None, user_id=None,
+                              group_ids=None, domain_id=None,
+                              project_ids=None, inherited_to_projects=None):
+        # NOTE: This backend only stores direct project assignments, so
+        # there is nothing to return for domain or inherited queries.
+        if inherited_to_projects or (domain_id and project_ids is None):
+            return []
+
+        def matches(assignment):
+            if role_id and assignment['role_id'] != role_id:
+                return False
+            if user_id or group_ids is not None:
+                if not (('user_id' in assignment and
+                         assignment['user_id'] == user_id) or
+                        ('group_id' in assignment and
+                         assignment['group_id'] in (group_ids or []))):
+                    return False
+            if (project_ids is not None and
+                    assignment['project_id'] not in project_ids):
+                return False
+            return True
+
         role_assignments = []
         for a in self.role.list_role_assignments(self.project.tree_dn):
             if isinstance(a, UserRoleAssociation):
@@ -290,7 +311,8 @@ class Assignment(assignment.Driver):
                     'role_id': self.role._dn_to_id(a.role_dn),
                     'group_id': self.group._dn_to_id(a.group_dn),
                     'project_id': self.project._dn_to_id(a.project_dn)}
-            role_assignments.append(assignment)
+            if matches(assignment):
+                role_assignments.append(assignment)
         return role_assignments
 
     def delete_project_assignments(self, project_id):
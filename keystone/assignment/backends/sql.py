@@ -293,6 +293,54 @@ class Assignment(keystone_assignment.Driver):
 
         return [result.role_id for result in query.all()]
 
+    def list_role_ids_for_user_on_project(
+            self, user_id, group_ids, project_id, project_domain_id,
+            project_parents):
+
+        project_types = [AssignmentType.USER_PROJECT,
+                         AssignmentType.GROUP_PROJECT]
+        domain_types = [AssignmentType.USER_DOMAIN,
+                        AssignmentType.GROUP_DOMAIN]
+
+        actor_constraints = sqlalchemy.and_(
+            RoleAssignment.type.in_([AssignmentType.USER_PROJECT,
+                                     AssignmentType.USER_DOMAIN]),
+            RoleAssignment.actor_id == user_id)
+        if group_ids:
+            actor_constraints = sqlalchemy.or_(
+                actor_constraints,
+                sqlalchemy.and_(
+                    RoleAssignment.type.in_([AssignmentType.GROUP_PROJECT,
+                                             AssignmentType.GROUP_DOMAIN]),
+                    RoleAssignment.actor_id.in_(group_ids)))
+
+        target_constraints = sqlalchemy.and_(
+            RoleAssignment.type.in_(project_types),
+            RoleAssignment.inherited == false(),
+            RoleAssignment.target_id == project_id)
+
+        if CONF.os_inherit.enabled:
+            target_constraints = sqlalchemy.or_(
+                target_constraints,
+                sqlalchemy.and_(
+                    RoleAssignment.type.in_(domain_types),
+                    RoleAssignment.inherited,
+                    RoleAssignment.target_id == project_domain_id))
+
+            if project_parents:
+                target_constraints = sqlalchemy.or_(
+                    target_constraints,
+                    sqlalchemy.and_(
+                        RoleAssignment.type.in_(project_types),
+                        RoleAssignment.inherited,
+                        RoleAssignment.target_id.in_(project_parents)))
+
+        with sql.transaction() as session:
+            query = session.query(RoleAssignment.role_id).filter(
+                sqlalchemy.and_(actor_constraints,
+                                target_constraints)).distinct()
+            return [result.role_id for result in query.all()]
+
     def list_project_ids_for_groups(self, group_ids, hints,
                                     inherited=False):
         return self._list_project_ids_for_actor(
@@ -336,7 +384,9 @@ class Assignment(keystone_assignment.Driver):
                     'Cannot remove role that has not been granted, %s') %
                     role_id)
 
-    def list_role_assignments(self):
+    def list_role_assignments(self, role_id=None, user_id=None,
+                              group_ids=None, domain_id=None,
+                              project_ids=None, inherited_to_projects=None):
 
         def denormalize_role(ref):
             assignment = {}
@@ -361,8 +411,51 @@ class Assignment(keystone_assignment.Driver):
                 assignment['inherited_to_projects'] = 'projects'
             return assignment
 
+        def actor_filter():
+            filters = []
+            if user_id:
+                filters.append(sqlalchemy.and_(
+                    RoleAssignment.type.in_([AssignmentType.USER_PROJECT,
+                                             AssignmentType.USER_DOMAIN]),
+                    RoleAssignment.actor_id == user_id))
+            if group_ids:
+                filters.append(sqlalchemy.and_(
+                    RoleAssignment.type.in_([AssignmentType.GROUP_PROJECT,
+                                             AssignmentType.GROUP_DOMAIN]),
+                    RoleAssignment.actor_id.in_(group_ids)))
+            return filters
+
+        def target_filter():
+            filters = []
+            if domain_id:
+                filters.append(sqlalchemy.and_(
+                    RoleAssignment.type.in_([AssignmentType.USER_DOMAIN,
+                                             AssignmentType.GROUP_DOMAIN]),
+                    RoleAssignment.target_id == domain_id))
+            if project_ids:
+                filters.append(sqlalchemy.and_(
+                    RoleAssignment.type.in_([AssignmentType.USER_PROJECT,
+                                             AssignmentType.GROUP_PROJECT]),
+                    RoleAssignment.target_id.in_(project_ids)))
+            return filters
+
         with sql.transaction() as session:
-            refs = session.query(RoleAssignment).all()
+            query = session.query(RoleAssignment)
+            if role_id:
+                query = query.filter_by(role_id=role_id)
+            if user_id or group_ids is not None:
+                filters = actor_filter()
+                if not filters:
+                    return []
+                query = query.filter(sqlalchemy.or_(*filters))
+            if domain_id or project_ids is not None:
+                filters = target_filter()
+                if not filters:
+                    return []
+                query = query.filter(sqlalchemy.or_(*filters))
+            if inherited_to_projects is not None:
+                query = query.filter_by(inherited=inherited_to_projects)
+            refs = query.all()
             return [denormalize_role(ref) for ref in refs]
 
     def delete_project_assignments(self, project_id):
@@ -544,7 +544,8 @@ class RoleAssignmentV3(controller.V3Controller):
 
         return formatted_entity
 
-    def _expand_indirect_assignments(self, context, refs):
+    def _expand_indirect_assignments(self, context, refs, user_id=None,
+                                     project_id=None):
         """Processes entity list into all-direct assignments.
 
         For any group role assignments in the list, create a role assignment
@@ -558,6 +559,14 @@ class RoleAssignmentV3(controller.V3Controller):
         For any new entity created by virtue of group membership, add in an
         additional link to that membership.
 
+        If user_id is specified, refs must only contain assignments to that
+        user or to groups they are a member of, and group assignments are
+        only expanded for that user. Likewise, if project_id is specified,
+        refs must only contain assignments on that project, its parents or
+        its domain, and inherited assignments are only expanded onto that
+        project. This avoids listing whole groups and domains when the
+        caller is going to filter the result down anyway.
+
         """
         def _get_group_members(ref):
             """Get a list of group members.
@@ -567,6 +576,8 @@ class RoleAssignmentV3(controller.V3Controller):
             overall processing to continue.
 
             """
+            if user_id:
+                return [{'id': user_id}]
             try:
                 members = self.identity_api.list_users_in_group(
                     ref['group']['id'])
@@ -674,39 +685,50 @@ class RoleAssignmentV3(controller.V3Controller):
         new_refs = []
         for r in refs:
             if 'OS-INHERIT:inherited_to' in r['scope']:
+                base_entry = copy.deepcopy(r)
                 if 'domain' in r['scope']:
-                    # It's an inherited domain role - so get the list of
+                    # It's an inherited domain role, which lands on the
                     # projects owned by this domain.
-                    project_ids = (
-                        [x['id'] for x in
-                            self.resource_api.list_projects_in_domain(
-                                r['scope']['domain']['id'])])
-                    base_entry = copy.deepcopy(r)
                     target_type = 'domains'
                     target_id = base_entry['scope']['domain']['id']
                     base_entry['scope'].pop('domain')
                 else:
-                    # It's an inherited project role - so get the list of
+                    # It's an inherited project role, which lands on the
                     # projects in this project subtree.
-                    project_id = r['scope']['project']['id']
-                    project_ids = (
-                        [x['id'] for x in
-                            self.resource_api.list_projects_in_subtree(
-                                project_id)])
-                    base_entry = copy.deepcopy(r)
                     target_type = 'projects'
                     target_id = base_entry['scope']['project']['id']
                     base_entry['scope'].pop('project')
 
+                if project_id:
+                    # The target is the domain or a parent of the project,
+                    # so it will be the only project this role lands on. An
+                    # inherited role on the project itself only applies to
+                    # its children.
+                    project_ids = (
+                        [project_id] if target_id != project_id else [])
+                elif target_type == 'domains':
+                    project_ids = (
+                        [x['id'] for x in
+                            self.resource_api.list_projects_in_domain(
+                                target_id)])
+                else:
+                    project_ids = (
+                        [x['id'] for x in
+                            self.resource_api.list_projects_in_subtree(
+                                target_id)])
+
+                # If it's a group assignment, then create equivalent user
+                # roles based on membership of the group, listing the members
+                # only if the role lands on any project
+                if 'group' in base_entry and project_ids:
+                    members = _get_group_members(base_entry)
+                    sub_entry = copy.deepcopy(base_entry)
+                    group_id = sub_entry['group']['id']
+                    sub_entry.pop('group')
+
                 # For each project, create an equivalent role assignment
                 for p in project_ids:
-                    # If it's a group assignment, then create equivalent user
-                    # roles based on membership of the group
                     if 'group' in base_entry:
-                        members = _get_group_members(base_entry)
-                        sub_entry = copy.deepcopy(base_entry)
-                        group_id = sub_entry['group']['id']
-                        sub_entry.pop('group')
                         for m in members:
                             new_entry = (
                                 _build_project_equivalent_of_group_target_role(
@@ -719,6 +741,11 @@ class RoleAssignmentV3(controller.V3Controller):
                                 p, target_id, target_type, base_entry))
                         new_refs.append(new_entry)
             elif 'group' in r:
+                if project_id and r['scope'].get('project', {}).get(
+                        'id') != project_id:
+                    # A direct assignment elsewhere doesn't reach the
+                    # project, so don't list the group for it.
+                    continue
                 # It's a non-inherited group role assignment, so get the list
                 # of members.
                 members = _get_group_members(r)
@@ -774,16 +801,64 @@ class RoleAssignmentV3(controller.V3Controller):
             msg = _('Specify a user or group, not both')
             raise exception.ValidationError(msg)
 
+    def _list_effective_candidates(self, role_id, user_id, domain_id,
+                                   project_id, inherited):
+        """List the stored assignments that may produce effective ones.
+
+        A user's effective assignments come from assignments to the user
+        and to any group they are a member of, and a project's from
+        assignments on the project and inherited assignments on its parents
+        and its domain.
+
+        """
+        group_ids = None
+        if user_id:
+            try:
+                group_ids = [
+                    g['id'] for g in
+                    self.identity_api.list_groups_for_user(user_id)]
+            except exception.UserNotFound:
+                group_ids = []
+
+        if not project_id:
+            return self.assignment_api.list_role_assignments(
+                role_id=role_id, user_id=user_id, group_ids=group_ids,
+                domain_id=domain_id, inherited_to_projects=inherited)
+
+        try:
+            project = self.resource_api.get_project(project_id)
+        except exception.ProjectNotFound:
+            return []
+
+        refs = []
+        if not inherited:
+            # An inherited assignment on the project itself only applies to
+            # its children, so only direct ones are needed.
+            refs += self.assignment_api.list_role_assignments(
+                role_id=role_id, user_id=user_id, group_ids=group_ids,
+                project_ids=[project_id], inherited_to_projects=False)
+        if CONF.os_inherit.enabled and inherited is not False:
+            # Only inherited assignments on the parents and the domain reach
+            # the project.
+            refs += self.assignment_api.list_role_assignments(
+                role_id=role_id, user_id=user_id, group_ids=group_ids,
+                domain_id=project['domain_id'],
+                project_ids=[x['id'] for x in
+                             self.resource_api.list_project_parents(
+                                 project_id)],
+                inherited_to_projects=True)
+        return refs
+
     @controller.filterprotected('group.id', 'role.id',
                                 'scope.domain.id', 'scope.project.id',
                                 'scope.OS-INHERIT:inherited_to', 'user.id')
     def list_role_assignments(self, context, filters):
 
-        # TODO(henry-nash): This implementation uses the standard filtering
-        # in the V3.wrap_collection. Given the large number of individual
-        # assignments, this is pretty inefficient.  An alternative would be
-        # to pass the filters into the driver call, so that the list size is
-        # kept a minimum.
+        # NOTE: The filters are passed into the driver call so that only the
+        # assignments that can contribute to the result are read. The
+        # standard filtering in V3.wrap_collection is still applied to the
+        # final list, which takes care of anything the driver filters
+        # conservatively, such as the entities created in effective mode.
 
         params = context['query_string']
         effective = 'effective' in params and (
@@ -808,14 +883,32 @@ class RoleAssignmentV3(controller.V3Controller):
                                                'scope.domain.id'))
 
         hints = self.build_driver_hints(context, filters)
-        refs = self.assignment_api.list_role_assignments()
+        if effective:
+            refs = self._list_effective_candidates(
+                role_id=params.get('role.id'),
+                user_id=params.get('user.id'),
+                domain_id=params.get('scope.domain.id'),
+                project_id=params.get('scope.project.id'),
+                inherited=inherited)
+        else:
+            group_id = params.get('group.id')
+            project_id = params.get('scope.project.id')
+            refs = self.assignment_api.list_role_assignments(
+                role_id=params.get('role.id'),
+                user_id=params.get('user.id'),
+                group_ids=[group_id] if group_id else None,
+                domain_id=params.get('scope.domain.id'),
+                project_ids=[project_id] if project_id else None,
+                inherited_to_projects=inherited)
         formatted_refs = (
             [self._format_entity(context, x) for x in refs
              if self._filter_inherited(x)])
 
         if effective:
-            formatted_refs = self._expand_indirect_assignments(context,
-                                                               formatted_refs)
+            formatted_refs = self._expand_indirect_assignments(
+                context, formatted_refs,
+                user_id=params.get('user.id'),
+                project_id=params.get('scope.project.id'))
 
         return self.wrap_collection(context, formatted_refs, hints=hints)
 
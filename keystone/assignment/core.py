@@ -15,6 +15,9 @@
 """Main entry point into the assignment service."""
 
 import abc
+import collections
+import threading
+import uuid
 
 from oslo_config import cfg
 from oslo_log import log
@@ -26,6 +29,7 @@ from keystone.common import driver_hints
 from keystone.common import manager
 from keystone import exception
 from keystone.i18n import _
+from keystone.i18n import _LE
 from keystone.i18n import _LI
 from keystone import notifications
 from keystone.openstack.common import versionutils
@@ -127,47 +131,45 @@ class Manager(manager.Manager):
                  keystone.exception.ProjectNotFound
 
         """
-        def _get_group_project_roles(user_id, project_ref):
-            group_ids = self._get_group_ids_for_user_id(user_id)
-            return self.list_role_ids_for_groups_on_project(
-                group_ids,
-                project_ref['id'],
-                project_ref['domain_id'],
-                self._list_parent_ids_of_project(project_ref['id']))
+        project_ref = self.resource_api.get_project(tenant_id)
+        group_ids = self._get_group_ids_for_user_id(user_id)
+        return list(self._list_role_ids_for_user_on_project(
+            user_id, tuple(sorted(group_ids)), project_ref['id'],
+            project_ref['domain_id'], CONF.os_inherit.enabled,
+            self._get_assignment_generation()))
 
-        def _get_user_project_roles(user_id, project_ref):
-            role_list = []
-            try:
-                metadata_ref = self._get_metadata(user_id=user_id,
-                                                  tenant_id=project_ref['id'])
-                role_list = self._roles_from_role_dicts(
-                    metadata_ref.get('roles', {}), False)
-            except exception.MetadataNotFound:
-                pass
+    @MEMOIZE
+    def _list_role_ids_for_user_on_project(self, user_id, group_ids,
+                                           project_id, domain_id,
+                                           inherit_enabled, generation):
+        # NOTE: inherit_enabled and generation are not used directly, they
+        # are part of the arguments so that they are part of the cache key.
+        return self.driver.list_role_ids_for_user_on_project(
+            user_id, list(group_ids), project_id, domain_id,
+            self._list_parent_ids_of_project(project_id))
 
-            if CONF.os_inherit.enabled:
-                # Now get any inherited roles for the owning domain
-                try:
-                    metadata_ref = self._get_metadata(
-                        user_id=user_id, domain_id=project_ref['domain_id'])
-                    role_list += self._roles_from_role_dicts(
-                        metadata_ref.get('roles', {}), True)
-                except (exception.MetadataNotFound, exception.NotImplemented):
-                    pass
-                # As well inherited roles from parent projects
-                for p in self.list_project_parents(project_ref['id']):
-                    p_roles = self.list_grants(
-                        user_id=user_id, project_id=p['id'],
-                        inherited_to_projects=True)
-                    role_list += [x['id'] for x in p_roles]
+    @MEMOIZE
+    def _get_assignment_generation(self):
+        # NOTE: A marker shared through the cache, replaced whenever any
+        # assignment changes, so that cached effective roles from before the
+        # change are no longer looked up, in this process or any other.
+        return uuid.uuid4().hex
 
-            return role_list
+    def get_assignment_generation(self):
+        """Return a marker that changes whenever any assignment changes."""
+        return self._get_assignment_generation()
 
-        project_ref = self.resource_api.get_project(tenant_id)
-        user_role_list = _get_user_project_roles(user_id, project_ref)
-        group_role_list = _get_group_project_roles(user_id, project_ref)
-        # Use set() to process the list to remove any duplicates
-        return list(set(user_role_list + group_role_list))
+    def _assignments_changed(self):
+        self._get_assignment_generation.invalidate(self)
+
+    def group_membership_changed(self):
+        """Called when a user is added to or removed from a group.
+
+        The user's effective roles include those of their groups, so the
+        assignment generation is replaced as if an assignment had changed.
+
+        """
+        self._assignments_changed()
 
     def get_roles_for_user_and_domain(self, user_id, domain_id):
         """Get the roles associated with a user within given domain.
@@ -260,6 +262,7 @@ class Manager(manager.Manager):
                 user_id,
                 tenant_id,
                 CONF.member_role_id)
+        self._assignments_changed()
 
     @notifications.role_assignment('created')
     def _add_role_to_user_and_project_adapter(self, role_id, user_id=None,
@@ -275,6 +278,7 @@ class Manager(manager.Manager):
         self.resource_api.get_project(project_id)
         self.role_api.get_role(role_id)
         self.driver.add_role_to_user_and_project(user_id, project_id, role_id)
+        self._assignments_changed()
 
     def add_role_to_user_and_project(self, user_id, tenant_id, role_id):
         self._add_role_to_user_and_project_adapter(
@@ -301,6 +305,7 @@ class Manager(manager.Manager):
             except exception.RoleNotFound:
                 LOG.debug("Removing role %s failed because it does not exist.",
                           role_id)
+        self._assignments_changed()
 
     # TODO(henry-nash): We might want to consider list limiting this at some
     # point in the future.
@@ -387,15 +392,23 @@ class Manager(manager.Manager):
             list(set(project_ids + project_ids_from_domains + subproject_ids)))
 
     def list_role_assignments_for_role(self, role_id=None):
-        # NOTE(henry-nash): Currently the efficiency of the key driver
-        # implementation (SQL) of list_role_assignments is severely hampered by
-        # the existence of the multiple grant tables - hence there is little
-        # advantage in pushing the logic of this method down into the driver.
-        # Once the single assignment table is implemented, then this situation
-        # will be different, and this method should have its own driver
-        # implementation.
-        return [r for r in self.driver.list_role_assignments()
-                if r['role_id'] == role_id]
+        return self.driver.list_role_assignments(role_id=role_id)
+
+    def delete_project_assignments(self, project_id):
+        self.driver.delete_project_assignments(project_id)
+        self._assignments_changed()
+
+    def delete_role_assignments(self, role_id):
+        self.driver.delete_role_assignments(role_id)
+        self._assignments_changed()
+
+    def delete_user(self, user_id):
+        self.driver.delete_user(user_id)
+        self._assignments_changed()
+
+    def delete_group(self, group_id):
+        self.driver.delete_group(group_id)
+        self._assignments_changed()
 
     @notifications.role_assignment('deleted')
     def _remove_role_from_user_and_project_adapter(self, role_id, user_id=None,
@@ -411,6 +424,7 @@ class Manager(manager.Manager):
 
         self.driver.remove_role_from_user_and_project(user_id, project_id,
                                                       role_id)
+        self._assignments_changed()
         self.identity_api.emit_invalidate_user_token_persistence(user_id)
         self.revoke_api.revoke_by_grant(role_id, user_id=user_id,
                                         project_id=project_id)
@@ -434,6 +448,7 @@ class Manager(manager.Manager):
             self.resource_api.get_project(project_id)
         self.driver.create_grant(role_id, user_id, group_id, domain_id,
                                  project_id, inherited_to_projects)
+        self._assignments_changed()
 
     def get_grant(self, role_id, user_id=None, group_id=None,
                   domain_id=None, project_id=None,
@@ -493,79 +508,97 @@ class Manager(manager.Manager):
             self.resource_api.get_project(project_id)
         self.driver.delete_grant(role_id, user_id, group_id, domain_id,
                                  project_id, inherited_to_projects)
+        self._assignments_changed()
         if user_id is not None:
             self._emit_invalidate_user_token_persistence(user_id)
 
     def delete_tokens_for_role_assignments(self, role_id):
+        # NOTE: The assignments have to be read now, since the caller is
+        # about to delete them, but working out whose tokens they affect can
+        # be left to the background if so configured.
         assignments = self.list_role_assignments_for_role(role_id=role_id)
+        if CONF.token.revoke_by_id_in_background:
+            worker = threading.Thread(
+                target=self._delete_tokens_for_assignments,
+                args=(assignments,))
+            worker.daemon = True
+            worker.start()
+        else:
+            self._delete_tokens_for_assignments(assignments)
+
+    def _delete_tokens_for_assignments(self, assignments):
+        try:
+            user_projects = self._list_users_for_assignments(assignments)
+            if user_projects:
+                self._emit_invalidate_users_tokens_notification(user_projects)
+        except Exception:
+            if not CONF.token.revoke_by_id_in_background:
+                raise
+            LOG.exception(_LE('Failed to delete the tokens affected by a '
+                              'role deletion.'))
+
+    def _list_users_for_assignments(self, assignments):
+        """Work out whose tokens are affected by a list of assignments.
+
+        :returns: a dict of user ids to the list of projects whose tokens
+                  are affected, or to None if all the user's tokens are.
 
-        # Iterate over the assignments for this role and build the list of
-        # user or user+project IDs for the tokens we need to delete
+        """
+        # Iterate over the assignments and build the set of user or
+        # user+project IDs for the tokens we need to delete
         user_ids = set()
-        user_and_project_ids = list()
+        user_project_ids = {}
+        group_members = {}
         for assignment in assignments:
+            if 'user_id' in assignment:
+                users = [assignment['user_id']]
+            elif 'group_id' in assignment:
+                # Add in any users for this group, being tolerant of any
+                # cross-driver database integrity errors. Groups are often
+                # assigned on many projects, so only list them once.
+                group_id = assignment['group_id']
+                if group_id not in group_members:
+                    try:
+                        group_members[group_id] = [
+                            user['id'] for user in
+                            self.identity_api.list_users_in_group(group_id)]
+                    except exception.GroupNotFound:
+                        group_members[group_id] = []
+                        # Ignore it, but log a debug message
+                        msg = ('Group (%(group)s), referenced in an '
+                               'assignment, not found - ignoring.')
+                        LOG.debug(msg, {'group': group_id})
+                users = group_members[group_id]
+            else:
+                continue
+
             # If we have a project assignment, then record both the user and
             # project IDs so we can target the right token to delete. If it is
             # a domain assignment, we might as well kill all the tokens for
             # the user, since in the vast majority of cases all the tokens
             # for a user will be within one domain anyway, so not worth
             # trying to delete tokens for each project in the domain.
-            if 'user_id' in assignment:
-                if 'project_id' in assignment:
-                    user_and_project_ids.append(
-                        (assignment['user_id'], assignment['project_id']))
-                elif 'domain_id' in assignment:
-                    self._emit_invalidate_user_token_persistence(
-                        assignment['user_id'])
-            elif 'group_id' in assignment:
-                # Add in any users for this group, being tolerant of any
-                # cross-driver database integrity errors.
-                try:
-                    users = self.identity_api.list_users_in_group(
-                        assignment['group_id'])
-                except exception.GroupNotFound:
-                    # Ignore it, but log a debug message
-                    if 'project_id' in assignment:
-                        target = _('Project (%s)') % assignment['project_id']
-                    elif 'domain_id' in assignment:
-                        target = _('Domain (%s)') % assignment['domain_id']
-                    else:
-                        target = _('Unknown Target')
-                    msg = ('Group (%(group)s), referenced in assignment '
-                           'for %(target)s, not found - ignoring.')
-                    LOG.debug(msg, {'group': assignment['group_id'],
-                                    'target': target})
-                    continue
-
-                if 'project_id' in assignment:
-                    for user in users:
-                        user_and_project_ids.append(
-                            (user['id'], assignment['project_id']))
-                elif 'domain_id' in assignment:
-                    for user in users:
-                        self._emit_invalidate_user_token_persistence(
-                            user['id'])
-
-        # Now process the built up lists.  Before issuing calls to delete any
-        # tokens, let's try and minimize the number of calls by pruning out
-        # any user+project deletions where a general token deletion for that
-        # same user is also planned.
-        user_and_project_ids_to_action = []
-        for user_and_project_id in user_and_project_ids:
-            if user_and_project_id[0] not in user_ids:
-                user_and_project_ids_to_action.append(user_and_project_id)
-
-        for user_id, project_id in user_and_project_ids_to_action:
-            self._emit_invalidate_user_project_tokens_notification(
-                {'user_id': user_id,
-                 'project_id': project_id})
-
-    @notifications.internal(
-        notifications.INVALIDATE_USER_PROJECT_TOKEN_PERSISTENCE)
-    def _emit_invalidate_user_project_tokens_notification(self, payload):
-        # This notification's payload is a dict of user_id and
-        # project_id so the token provider can invalidate the tokens
-        # from persistence if persistence is enabled.
+            if 'project_id' in assignment:
+                for user_id in users:
+                    user_project_ids.setdefault(user_id, set()).add(
+                        assignment['project_id'])
+            elif 'domain_id' in assignment:
+                user_ids.update(users)
+
+        # Any user+project deletions where a general token deletion for that
+        # same user is also planned can be pruned out.
+        user_projects = dict((user_id, None) for user_id in user_ids)
+        for user_id, project_ids in six.iteritems(user_project_ids):
+            if user_id not in user_ids:
+                user_projects[user_id] = sorted(project_ids)
+        return user_projects
+
+    @notifications.internal(notifications.INVALIDATE_USERS_TOKEN_PERSISTENCE)
+    def _emit_invalidate_users_tokens_notification(self, user_projects):
+        # This notification's payload is a dict of user_id to the list of
+        # project_ids whose tokens should be invalidated (None for all of
+        # them), so the token provider can invalidate them from persistence
+        # in bulk if persistence is enabled.
         pass
 
     @deprecated_to_role_api
@@ -776,8 +809,26 @@ class Driver(object):
         raise exception.NotImplemented()  # pragma: no cover
 
     @abc.abstractmethod
-    def list_role_assignments(self):
+    def list_role_assignments(self, role_id=None, user_id=None,
+                              group_ids=None, domain_id=None,
+                              project_ids=None, inherited_to_projects=None):
+        """Returns a list of role assignments, optionally filtered.
+
+        :param role_id: only return assignments of this role
+        :param user_id: only return assignments to this user
+        :param group_ids: only return assignments to these groups
+        :param domain_id: only return assignments on this domain
+        :param project_ids: only return assignments on these projects
+        :param inherited_to_projects: if True, only return inherited
+                                      assignments; if False, only return
+                                      direct ones; if None, return both
+
+        The actor filters (user_id and group_ids) are combined with OR, as
+        are the target filters (domain_id and project_ids), so that a caller
+        can ask for, say, everything assigned to a user or to any of the
+        groups they belong to in one call.
 
+        """
         raise exception.NotImplemented()  # pragma: no cover
 
     @abc.abstractmethod
@@ -874,6 +925,49 @@ class Driver(object):
         """
         raise exception.NotImplemented()
 
+    def list_role_ids_for_user_on_project(
+            self, user_id, group_ids, project_id, project_domain_id,
+            project_parents):
+        """List the effective role ids of a user on a project.
+
+        This includes roles assigned to the user directly and via any of
+        the groups given, together with, if ``OS-INHERIT`` is enabled, roles
+        inherited from the project's domain or parents.
+
+        Drivers are encouraged to override this so that it takes a single
+        call to the backend; the default just combines the other calls.
+
+        :param user_id: user identifier
+        :type user_id: str
+        :param group_ids: list of ids of the groups the user is a member of
+        :type group_ids: list
+        :param project_id: project identifier
+        :type project_id: str
+        :param project_domain_id: project's domain identifier
+        :type project_domain_id: str
+        :param project_parents: list of parent ids of this project
+        :type project_parents: list
+        :returns: list of role ids for the project
+        :rtype: list
+        """
+        role_ids = set(self.list_grant_role_ids(user_id=user_id,
+                                                project_id=project_id))
+        if CONF.os_inherit.enabled:
+            try:
+                role_ids.update(self.list_grant_role_ids(
+                    user_id=user_id, domain_id=project_domain_id,
+                    inherited_to_projects=True))
+            except exception.NotImplemented:
+                pass
+            for parent_id in project_parents:
+                role_ids.update(self.list_grant_role_ids(
+                    user_id=user_id, project_id=parent_id,
+                    inherited_to_projects=True))
+        if group_ids:
+            role_ids.update(self.list_role_ids_for_groups_on_project(
+                group_ids, project_id, project_domain_id, project_parents))
+        return list(role_ids)
+
     @abc.abstractmethod
     def list_role_ids_for_groups_on_domain(self, group_ids, domain_id):
         """List the group role ids for a specific domain.
@@ -947,6 +1041,26 @@ class RoleManager(manager.Manager):
     def get_role(self, role_id):
         return self.driver.get_role(role_id)
 
+    def list_roles_from_ids(self, role_ids):
+        """List the roles with the given ids, in the order of the ids.
+
+        The roles are read from the cache shared with get_role() in a single
+        request, and any that are not cached are read from the driver with a
+        single call. Ids without a role are skipped.
+
+        """
+        role_ids = list(collections.OrderedDict.fromkeys(role_ids))
+
+        def list_roles(arguments):
+            refs = self.driver.list_roles_from_ids(
+                [role_id for _self, role_id in arguments])
+            refs = dict((ref['id'], ref) for ref in refs)
+            return [refs.get(role_id) for _self, role_id in arguments]
+
+        roles = self.get_role.get_multi(
+            [(self, role_id) for role_id in role_ids], list_roles)
+        return [role for role in roles if role is not None]
+
     def create_role(self, role_id, role, initiator=None):
         ret = self.driver.create_role(role_id, role)
         notifications.Audit.created(self._ROLE, role_id, initiator)
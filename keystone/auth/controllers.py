@@ -14,16 +14,15 @@
 
 import sys
 
-from keystoneclient.common import cms
 from oslo_config import cfg
 from oslo_log import log
-from oslo_serialization import jsonutils
 from oslo_utils import importutils
-from oslo_utils import timeutils
 import six
 
+from keystone.auth import schema
 from keystone.common import controller
 from keystone.common import dependency
+from keystone.common import validation
 from keystone.common import wsgi
 from keystone import config
 from keystone.contrib import federation
@@ -535,23 +534,40 @@ class Auth(controller.V3Controller):
             del token_data['token']['catalog']
         return render_token_data_response(token_id, token_data)
 
+    @controller.protected()
+    @validation.validated(schema.validate_tokens, 'tokens')
+    def validate_tokens(self, context, tokens):
+        """Validate a batch of subject tokens.
+
+        The response holds one entry per subject token, in the order they
+        were given: either the token data or an error.
+
+        """
+        include_catalog = 'nocatalog' not in context['query_string']
+        results = []
+        for token_data in self.token_provider_api.validate_v3_tokens(tokens):
+            if token_data is None:
+                results.append({'error': {
+                    'code': exception.TokenNotFound.code,
+                    'title': exception.TokenNotFound.title,
+                    'message': six.text_type(_('Failed to validate token'))}})
+                continue
+            if not include_catalog and 'catalog' in token_data['token']:
+                del token_data['token']['catalog']
+            results.append(token_data)
+        # NOTE: This is a read-only POST, so it doesn't answer with the
+        # default 201 Created.
+        return wsgi.render_response(body={'tokens': results},
+                                    status=(200, 'OK'))
+
     @controller.protected()
     def revocation_list(self, context, auth=None):
         if not CONF.token.revoke_by_id:
             raise exception.Gone()
-        tokens = self.token_provider_api.list_revoked_tokens()
-
-        for t in tokens:
-            expires = t['expires']
-            if not (expires and isinstance(expires, six.text_type)):
-                t['expires'] = timeutils.isotime(expires)
-        data = {'revoked': tokens}
-        json_data = jsonutils.dumps(data)
-        signed_text = cms.cms_sign_text(json_data,
-                                        CONF.signing.certfile,
-                                        CONF.signing.keyfile)
-
-        return {'signed': signed_text}
+        signed_text, etag = (
+            self.token_provider_api.get_signed_revocation_list())
+        return wsgi.render_conditional_response(
+            context, {'signed': signed_text}, etag)
 
     def _combine_lists_uniquely(self, a, b):
         # it's most likely that only one of these will be filled so avoid
@@ -31,6 +31,13 @@ class Routers(wsgi.RoutersBase):
             delete_action='revoke_token',
             rel=json_home.build_v3_resource_relation('auth_tokens'))
 
+        self._add_resource(
+            mapper, auth_controller,
+            path='/auth/tokens/validate',
+            post_action='validate_tokens',
+            rel=json_home.build_v3_resource_relation('auth_tokens_validate'),
+            status=json_home.Status.EXPERIMENTAL)
+
         self._add_resource(
             mapper, auth_controller,
             path='/auth/tokens/OS-PKI/revoked',
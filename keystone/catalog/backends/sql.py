@@ -13,10 +13,10 @@
 # License for the specific language governing permissions and limitations
 # under the License.
 
-import itertools
+import threading
+import uuid
 
 from oslo_config import cfg
-import six
 import sqlalchemy
 from sqlalchemy.sql import true
 
@@ -88,6 +88,12 @@ class Endpoint(sql.ModelBase, sql.DictBase):
 
 
 class Catalog(catalog.Driver):
+    def __init__(self):
+        super(Catalog, self).__init__()
+        self._catalog_lock = threading.Lock()
+        self._catalog_skeleton = None
+        self._catalog_generation = None
+
     # Regions
     def list_regions(self, hints):
         session = sql.get_session()
@@ -268,6 +274,78 @@ class Catalog(catalog.Driver):
             ref.extra = new_endpoint.extra
         return ref.to_dict()
 
+    def invalidate_catalog(self):
+        with self._catalog_lock:
+            self._catalog_skeleton = None
+        self._get_catalog_generation.invalidate(self)
+
+    @core.MEMOIZE
+    def _get_catalog_generation(self):
+        # NOTE: Shared through the cache so that a change made by one process
+        # is noticed by the others. Without caching a new generation is
+        # returned every time, so the catalog is simply rebuilt per request.
+        return uuid.uuid4().hex
+
+    def _build_catalog_skeleton(self):
+        """Read the enabled endpoints and parse their URLs.
+
+        Both catalog formats are prepared, with everything that doesn't
+        depend on the user and project filled in.
+
+        """
+        session = sql.get_session()
+        endpoints = (session.query(Endpoint).
+                     options(sql.joinedload(Endpoint.service)).
+                     filter(Endpoint.enabled == true()).all())
+
+        v2 = []
+        for endpoint in endpoints:
+            if not endpoint.service['enabled']:
+                continue
+            default_service = {
+                'id': endpoint['id'],
+                'name': endpoint.service.extra.get('name', ''),
+                'publicURL': ''
+            }
+            v2.append((endpoint['region_id'],
+                       endpoint.service['type'],
+                       default_service,
+                       '%sURL' % endpoint['interface'],
+                       core.URLTemplate(endpoint['url'])))
+
+        services = (session.query(Service).filter(Service.enabled == true()).
+                    options(sql.joinedload(Service.endpoints)).
+                    all())
+
+        v3 = []
+        for svc in services:
+            service = {'id': svc.id, 'type': svc.type,
+                       'name': svc.extra.get('name', '')}
+            v3_endpoints = []
+            for endpoint in (ep.to_dict() for ep in svc.endpoints
+                             if ep.enabled):
+                del endpoint['service_id']
+                del endpoint['legacy_endpoint_id']
+                del endpoint['enabled']
+                endpoint['region'] = endpoint['region_id']
+                v3_endpoints.append(
+                    (endpoint, core.URLTemplate(endpoint['url'])))
+            v3.append((service, v3_endpoints))
+
+        return {'v2': v2, 'v3': v3}
+
+    def _get_catalog_skeleton(self):
+        generation = self._get_catalog_generation()
+        with self._catalog_lock:
+            if (self._catalog_skeleton is not None and
+                    self._catalog_generation == generation):
+                return self._catalog_skeleton
+        skeleton = self._build_catalog_skeleton()
+        with self._catalog_lock:
+            self._catalog_skeleton = skeleton
+            self._catalog_generation = generation
+        return skeleton
+
     def get_catalog(self, user_id, tenant_id):
         """Retrieve and format the V2 service catalog.
 
@@ -283,47 +361,25 @@ class Catalog(catalog.Driver):
                   empty dict.
 
         """
-        substitutions = dict(
-            itertools.chain(six.iteritems(CONF),
-                            six.iteritems(CONF.eventlet_server)))
-        substitutions.update({'user_id': user_id})
-        silent_keyerror_failures = []
-        if tenant_id:
-            substitutions.update({'tenant_id': tenant_id})
-        else:
-            silent_keyerror_failures = ['tenant_id']
-
-        session = sql.get_session()
-        endpoints = (session.query(Endpoint).
-                     options(sql.joinedload(Endpoint.service)).
-                     filter(Endpoint.enabled == true()).all())
+        substitutions = core.get_url_substitutions(user_id, tenant_id)
+        silent_keyerror_failures = [] if tenant_id else ['tenant_id']
 
         catalog = {}
 
-        for endpoint in endpoints:
-            if not endpoint.service['enabled']:
-                continue
+        for (region, service_type, default_service, interface_url,
+                template) in self._get_catalog_skeleton()['v2']:
             try:
-                formatted_url = core.format_url(
-                    endpoint['url'], substitutions,
+                url = template.format(
+                    substitutions,
                     silent_keyerror_failures=silent_keyerror_failures)
-                if formatted_url is not None:
-                    url = formatted_url
-                else:
+                if url is None:
                     continue
             except exception.MalformedEndpoint:
                 continue  # this failure is already logged in format_url()
 
-            region = endpoint['region_id']
-            service_type = endpoint.service['type']
-            default_service = {
-                'id': endpoint['id'],
-                'name': endpoint.service.extra.get('name', ''),
-                'publicURL': ''
-            }
             catalog.setdefault(region, {})
-            catalog[region].setdefault(service_type, default_service)
-            interface_url = '%sURL' % endpoint['interface']
+            if service_type not in catalog[region]:
+                catalog[region][service_type] = dict(default_service)
             catalog[region][service_type][interface_url] = url
 
         return catalog
@@ -341,46 +397,30 @@ class Catalog(catalog.Driver):
         :returns: A list representing the service catalog or an empty list
 
         """
-        d = dict(
-            itertools.chain(six.iteritems(CONF),
-                            six.iteritems(CONF.eventlet_server)))
-        d.update({'user_id': user_id})
-        silent_keyerror_failures = []
-        if tenant_id:
-            d.update({'tenant_id': tenant_id})
-        else:
-            silent_keyerror_failures = ['tenant_id']
-
-        session = sql.get_session()
-        services = (session.query(Service).filter(Service.enabled == true()).
-                    options(sql.joinedload(Service.endpoints)).
-                    all())
+        substitutions = core.get_url_substitutions(user_id, tenant_id)
+        silent_keyerror_failures = [] if tenant_id else ['tenant_id']
 
         def make_v3_endpoints(endpoints):
-            for endpoint in (ep.to_dict() for ep in endpoints if ep.enabled):
-                del endpoint['service_id']
-                del endpoint['legacy_endpoint_id']
-                del endpoint['enabled']
-                endpoint['region'] = endpoint['region_id']
+            for endpoint, template in endpoints:
                 try:
-                    formatted_url = core.format_url(
-                        endpoint['url'], d,
+                    formatted_url = template.format(
+                        substitutions,
                         silent_keyerror_failures=silent_keyerror_failures)
-                    if formatted_url:
-                        endpoint['url'] = formatted_url
-                    else:
+                    if not formatted_url:
                         continue
                 except exception.MalformedEndpoint:
                     continue  # this failure is already logged in format_url()
 
+                endpoint = dict(endpoint)
+                endpoint['url'] = formatted_url
                 yield endpoint
 
         # TODO(davechen): If there is service with no endpoints, we should skip
         # the service instead of keeping it in the catalog, see bug #1436704.
-        def make_v3_service(svc):
-            eps = list(make_v3_endpoints(svc.endpoints))
-            service = {'endpoints': eps, 'id': svc.id, 'type': svc.type}
-            service['name'] = svc.extra.get('name', '')
+        def make_v3_service(svc, endpoints):
+            service = dict(svc)
+            service['endpoints'] = list(make_v3_endpoints(endpoints))
             return service
 
-        return [make_v3_service(svc) for svc in services]
+        return [make_v3_service(svc, endpoints)
+                for svc, endpoints in self._get_catalog_skeleton()['v3']]
@@ -16,6 +16,7 @@
 """Main entry point into the Catalog service."""
 
 import abc
+import re
 
 from oslo_config import cfg
 from oslo_log import log
@@ -37,6 +38,14 @@ LOG = log.getLogger(__name__)
 MEMOIZE = cache.get_memoization_decorator(section='catalog')
 
 
+WHITELISTED_PROPERTIES = [
+    'tenant_id', 'user_id', 'public_bind_host', 'admin_bind_host',
+    'compute_host', 'compute_port', 'admin_port', 'public_port',
+    'public_endpoint', 'admin_endpoint', ]
+
+_SUBSTITUTION_RE = re.compile(r'%\(([^)]*)\)([diouxXeEfFgGcrs])')
+
+
 def format_url(url, substitutions, silent_keyerror_failures=None):
     """Formats a user-defined URL with the given substitutions.
 
@@ -47,12 +56,6 @@ def format_url(url, substitutions, silent_keyerror_failures=None):
     :returns: a formatted URL
 
     """
-
-    WHITELISTED_PROPERTIES = [
-        'tenant_id', 'user_id', 'public_bind_host', 'admin_bind_host',
-        'compute_host', 'compute_port', 'admin_port', 'public_port',
-        'public_endpoint', 'admin_endpoint', ]
-
     substitutions = utils.WhiteListedItemFilter(
         WHITELISTED_PROPERTIES,
         substitutions)
@@ -85,6 +88,78 @@ def format_url(url, substitutions, silent_keyerror_failures=None):
     return result
 
 
+def get_url_substitutions(user_id, tenant_id=None):
+    """Returns the substitutions available to endpoint URLs.
+
+    Only the whitelisted properties can ever be substituted, so rather than
+    copying the whole of CONF, just look those up.
+
+    """
+    substitutions = {}
+    for name in WHITELISTED_PROPERTIES:
+        for group in (CONF.eventlet_server, CONF):
+            try:
+                substitutions[name] = group[name]
+                break
+            except cfg.NoSuchOptError:
+                continue
+    substitutions['user_id'] = user_id
+    if tenant_id:
+        substitutions['tenant_id'] = tenant_id
+    else:
+        substitutions.pop('tenant_id', None)
+    return substitutions
+
+
+class URLTemplate(object):
+    """An endpoint URL parsed once, so that it can be formatted cheaply.
+
+    The URL is split into its fixed segments and the substitutions between
+    them. Formatting gives the same result as :func:`format_url`, which is
+    also used for URLs that can't be split (such as those containing a
+    literal '%') and for any URL that is going to fail, so that errors are
+    raised and logged in the same way.
+
+    """
+
+    def __init__(self, url):
+        self.url = url
+        self._prefix = None
+        self._slots = []
+        if not isinstance(url, six.string_types):
+            return
+        parts = _SUBSTITUTION_RE.split(url.replace('$(', '%('))
+        literals = parts[::3]
+        if any('%' in literal for literal in literals):
+            return
+        self._prefix = literals[0]
+        self._slots = [('%' + conversion, name, literal)
+                       for name, conversion, literal in
+                       zip(parts[1::3], parts[2::3], literals[1:])]
+
+    def format(self, substitutions, silent_keyerror_failures=None):
+        if self._prefix is None:
+            return format_url(self.url, substitutions,
+                              silent_keyerror_failures)
+
+        result = [self._prefix]
+        for conversion, name, literal in self._slots:
+            if (name not in WHITELISTED_PROPERTIES or
+                    name not in substitutions):
+                if (name in WHITELISTED_PROPERTIES and
+                        name in (silent_keyerror_failures or [])):
+                    return None
+                return format_url(self.url, substitutions,
+                                  silent_keyerror_failures)
+            try:
+                result.append(conversion % (substitutions[name],))
+            except (TypeError, ValueError):
+                return format_url(self.url, substitutions,
+                                  silent_keyerror_failures)
+            result.append(literal)
+        return ''.join(result)
+
+
 @dependency.provider('catalog_api')
 class Manager(manager.Manager):
     """Default pivot point for the Catalog backend.
@@ -100,6 +175,20 @@ class Manager(manager.Manager):
     def __init__(self):
         super(Manager, self).__init__(CONF.catalog.driver)
 
+        catalog_callbacks = {
+            self._ENDPOINT: [self._catalog_changed],
+            self._SERVICE: [self._catalog_changed],
+            self._REGION: [self._catalog_changed],
+        }
+        self.event_callbacks = {
+            notifications.ACTIONS.created: catalog_callbacks,
+            notifications.ACTIONS.updated: catalog_callbacks,
+            notifications.ACTIONS.deleted: catalog_callbacks,
+        }
+
+    def _catalog_changed(self, service, resource_type, operation, payload):
+        self.driver.invalidate_catalog()
+
     def create_region(self, region_ref, initiator=None):
         # Check duplicate ID
         try:
@@ -259,6 +348,15 @@ class Driver(object):
     def _get_list_limit(self):
         return CONF.catalog.list_limit or CONF.list_limit
 
+    def invalidate_catalog(self):
+        """Called whenever an endpoint, service or region changes.
+
+        Drivers that keep a prepared copy of the catalog should discard it
+        here, including any copy shared with other keystone processes.
+
+        """
+        pass
+
     def _ensure_no_circle_in_hierarchical_regions(self, region_ref):
         if region_ref.get('parent_region_id') is None:
             return
@@ -14,13 +14,21 @@
 
 """Keystone Caching Layer Implementation."""
 
+import time
+import uuid
+import zlib
+
 import dogpile.cache
+from dogpile.cache import api
 from dogpile.cache import proxy
 from dogpile.cache import util
 from oslo_config import cfg
 from oslo_log import log
 from oslo_utils import importutils
+import six
+from six.moves import cPickle as pickle
 
+from keystone.common import utils
 from keystone import exception
 from keystone.i18n import _, _LE
 
@@ -84,6 +92,109 @@ class DebugProxy(proxy.ProxyBackend):
         self.proxied.delete_multi(keys)
 
 
+class LocalCacheProxy(proxy.ProxyBackend):
+    """Keeps recently used values in memory, in front of the backend.
+
+    Invalidations made by this process are applied to both. Keys are spread
+    over ``GENERATION_BUCKETS`` buckets, each with a generation marker kept in
+    the backend. An invalidation replaces the markers of the buckets of the
+    keys it deletes. Every process checks the markers at most every
+    ``check_interval`` seconds, and drops the in-memory values of the buckets
+    whose marker has changed. Values are kept pickled, so that callers never
+    share an object.
+
+    """
+
+    GENERATION_KEY = 'keystone.local_cache_generation'
+    GENERATION_BUCKETS = 64
+
+    def __init__(self, size, expiration_time, check_interval=0):
+        super(LocalCacheProxy, self).__init__()
+        self.expiration_time = expiration_time
+        self.check_interval = check_interval
+        self._values = utils.LRUCache(size)
+        self._generation_keys = ['%s.%d' % (self.GENERATION_KEY, i)
+                                 for i in range(self.GENERATION_BUCKETS)]
+        self._generations = [api.NO_VALUE] * self.GENERATION_BUCKETS
+        self._next_check = 0
+
+    def _bucket(self, key):
+        if isinstance(key, six.text_type):
+            key = key.encode('utf-8')
+        return (zlib.crc32(key) & 0xffffffff) % self.GENERATION_BUCKETS
+
+    def _check_generation(self):
+        now = time.time()
+        if now < self._next_check:
+            return
+        self._next_check = now + self.check_interval
+        # Values stored under an older marker are ignored from now on.
+        self._generations = self.proxied.get_multi(self._generation_keys)
+
+    def _new_generation(self, keys):
+        markers = {}
+        for bucket in set(self._bucket(key) for key in keys):
+            self._generations[bucket] = uuid.uuid4().hex
+            markers[self._generation_keys[bucket]] = self._generations[bucket]
+        self.proxied.set_multi(markers)
+
+    def _get_local(self, key):
+        entry = self._values.get(key)
+        if entry is not None:
+            expires, generation, value = entry
+            if (time.time() < expires and
+                    generation == self._generations[self._bucket(key)]):
+                return pickle.loads(value)
+        return api.NO_VALUE
+
+    def _set_local(self, key, value):
+        if value is not api.NO_VALUE:
+            self._values.set(key, (time.time() + self.expiration_time,
+                                   self._generations[self._bucket(key)],
+                                   pickle.dumps(value,
+                                                pickle.HIGHEST_PROTOCOL)))
+
+    def get(self, key):
+        self._check_generation()
+        value = self._get_local(key)
+        if value is api.NO_VALUE:
+            value = self.proxied.get(key)
+            self._set_local(key, value)
+        return value
+
+    def get_multi(self, keys):
+        self._check_generation()
+        values = [self._get_local(key) for key in keys]
+        misses = [i for i, value in enumerate(values)
+                  if value is api.NO_VALUE]
+        if misses:
+            fetched = self.proxied.get_multi([keys[i] for i in misses])
+            for i, value in zip(misses, fetched):
+                self._set_local(keys[i], value)
+                values[i] = value
+        return values
+
+    def set(self, key, value):
+        self.proxied.set(key, value)
+        self._set_local(key, value)
+
+    def set_multi(self, mapping):
+        self.proxied.set_multi(mapping)
+        for key, value in mapping.items():
+            self._set_local(key, value)
+
+    def delete(self, key):
+        self._values.pop(key)
+        self.proxied.delete(key)
+        self._new_generation([key])
+
+    def delete_multi(self, keys):
+        for key in keys:
+            self._values.pop(key)
+        self.proxied.delete_multi(keys)
+        self._new_generation(keys)
+
+
 def build_cache_config():
     """Build the cache region dictionary configuration.
 
@@ -162,6 +273,13 @@ def configure_cache_region(region):
             LOG.debug("Adding cache-proxy '%s' to backend.", class_path)
             region.wrap(cls)
 
+        if CONF.cache.local_cache_size > 0:
+            # NOTE: This goes outermost, so that a local hit skips every
+            # other proxy as well as the backend.
+            region.wrap(LocalCacheProxy(CONF.cache.local_cache_size,
+                                        CONF.cache.local_cache_time,
+                                        CONF.cache.local_cache_check_interval))
+
     return region
 
 
@@ -296,8 +414,14 @@ def get_memoization_decorator(section, expiration_section=None):
     should_cache = get_should_cache_fn(section)
     expiration_time = get_expiration_time_fn(expiration_section)
 
-    memoize = REGION.cache_on_arguments(should_cache_fn=should_cache,
-                                        expiration_time=expiration_time)
+    on_arguments = REGION.cache_on_arguments(should_cache_fn=should_cache,
+                                             expiration_time=expiration_time)
+
+    def memoize(fn):
+        decorated = on_arguments(fn)
+        decorated.get_multi = _build_get_multi(fn, should_cache,
+                                               expiration_time)
+        return decorated
 
     # Make sure the actual "should_cache" and "expiration_time" methods are
     # available. This is potentially interesting/useful to pre-seed cache
@@ -306,3 +430,38 @@ def get_memoization_decorator(section, expiration_section=None):
     memoize.get_expiration_time = expiration_time
 
     return memoize
+
+
+def _build_get_multi(fn, should_cache, expiration_time):
+    """Build the ``get_multi`` method of a memoized function.
+
+    ``get_multi(arguments, creator)`` returns the results of the function for
+    each tuple of arguments in ``arguments``, reading the cache with a single
+    request. The results missing from the cache are created in one call to
+    ``creator``, which is passed the list of argument tuples they are missing
+    for and returns their results in the same order, with ``None`` where there
+    is no result. Those are then written to the cache with a single request.
+
+    """
+    key_generator = function_key_generator(None, fn)
+
+    def get_multi(arguments, creator):
+        if not arguments:
+            return []
+        keys = [key_generator(*args) for args in arguments]
+        values = list(REGION.get_multi(keys,
+                                       expiration_time=expiration_time()))
+        missing = [i for i, value in enumerate(values)
+                   if value is api.NO_VALUE]
+        if missing:
+            created = creator([arguments[i] for i in missing])
+            mapping = {}
+            for i, value in zip(missing, created):
+                values[i] = value
+                if value is not None and should_cache(value):
+                    mapping[keys[i]] = value
+            if mapping:
+                REGION.set_multi(mapping)
+        return values
+
+    return get_multi
@@ -0,0 +1,240 @@
+# Licensed under the Apache License, Version 2.0 (the "License"); you may
+# not use this file except in compliance with the License. You may obtain
+# a copy of the License at
+#
+#      http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS, WITHOUT
+# WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the
+# License for the specific language governing permissions and limitations
+# under the License.
+
+"""In-process CMS signing.
+
+keystoneclient signs PKI tokens and the revocation list by running
+``openssl cms -sign -nosmimecap -nodetach -nocerts -noattr`` for every
+document. The functions in this module have the same signatures and
+produce the same documents, but build them in-process with the signing
+certificate and key kept loaded until the files change.
+
+With ``-noattr`` the signature is made directly over the content and a
+PKCS#1 v1.5 signature is deterministic, so for an RSA signing key the
+output is byte for byte what the openssl command prints. Any other key,
+or a missing ``cryptography`` library, falls back to the openssl command.
+
+"""
+
+import base64
+import zlib
+
+from keystoneclient.common import cms
+from oslo_config import cfg
+import six
+
+from keystone.common import signing
+from keystone.i18n import _LW
+
+try:
+    from cryptography.hazmat.primitives import hashes
+except ImportError:  # pragma: no cover
+    hashes = None
+
+
+CONF = cfg.CONF
+
+_SIGNED_DATA_OID = '1.2.840.113549.1.7.2'
+_DATA_OID = '1.2.840.113549.1.7.1'
+_RSA_ENCRYPTION_OID = '1.2.840.113549.1.1.1'
+
+# Digest name (as given to openssl -md) to its OID and cryptography class
+# name.
+_DIGESTS = {
+    'sha1': ('1.3.14.3.2.26', 'SHA1'),
+    'sha224': ('2.16.840.1.101.3.4.2.4', 'SHA224'),
+    'sha256': ('2.16.840.1.101.3.4.2.1', 'SHA256'),
+    'sha384': ('2.16.840.1.101.3.4.2.2', 'SHA384'),
+    'sha512': ('2.16.840.1.101.3.4.2.3', 'SHA512'),
+}
+
+_SEQUENCE = 0x30
+_SET = 0x31
+_INTEGER = 0x02
+_OCTET_STRING = 0x04
+_NULL = 0x05
+_OID = 0x06
+_EXPLICIT_0 = 0xa0
+
+
+def _der_length(length):
+    if length < 0x80:
+        return six.int2byte(length)
+    encoded = b''
+    while length:
+        encoded = six.int2byte(length & 0xff) + encoded
+        length >>= 8
+    return six.int2byte(0x80 | len(encoded)) + encoded
+
+
+def _der(tag, *contents):
+    content = b''.join(contents)
+    return six.int2byte(tag) + _der_length(len(content)) + content
+
+
+def _der_oid(dotted):
+    arcs = [int(arc) for arc in dotted.split('.')]
+    encoded = bytearray([40 * arcs[0] + arcs[1]])
+    for arc in arcs[2:]:
+        septets = [arc & 0x7f]
+        arc >>= 7
+        while arc:
+            septets.insert(0, 0x80 | (arc & 0x7f))
+            arc >>= 7
+        encoded.extend(septets)
+    return _der(_OID, bytes(encoded))
+
+
+def _der_element(data, offset):
+    """Return the tag, content offset and end offset of a DER element."""
+    tag = six.indexbytes(data, offset)
+    length = six.indexbytes(data, offset + 1)
+    offset += 2
+    if length & 0x80:
+        num_octets = length & 0x7f
+        length = 0
+        for i in range(num_octets):
+            length = (length << 8) | six.indexbytes(data, offset + i)
+        offset += num_octets
+    return tag, offset, offset + length
+
+
+def _issuer_and_serial_number(cert_der):
+    """Return the encoded IssuerAndSerialNumber of a certificate."""
+    _tag, tbs, _end = _der_element(cert_der, 0)
+    _tag, offset, _end = _der_element(cert_der, tbs)
+    tag, _start, end = _der_element(cert_der, offset)
+    if tag == _EXPLICIT_0:
+        # skip the version
+        offset = end
+    _tag, _start, serial_end = _der_element(cert_der, offset)
+    # skip the signature algorithm
+    _tag, _start, issuer = _der_element(cert_der, serial_end)
+    _tag, _start, issuer_end = _der_element(cert_der, issuer)
+    return _der(_SEQUENCE,
+                cert_der[issuer:issuer_end],
+                cert_der[offset:serial_end])
+
+
+def _canonicalize(data):
+    """Convert line endings to CRLF, as openssl does when not signing binary.
+
+    Any CRs at the end of a line are dropped and its LF becomes a CRLF, so
+    empty lines are kept. Trailing CRs are also dropped from a last line
+    without a newline.
+
+    """
+    lines = data.split(b'\n')
+    last = lines.pop()
+    canonical = b''.join(line.rstrip(b'\r') + b'\r\n' for line in lines)
+    return canonical + last.rstrip(b'\r')
+
+
+class CMSSigner(object):
+    """Signs CMS documents with a ``signing.SigningKey``."""
+
+    def __init__(self, signing_key):
+        self._key = signing_key
+        self._issuer_and_serial_number = _issuer_and_serial_number(
+            signing_key.certificate)
+
+    def sign(self, data, message_digest=cms.DEFAULT_TOKEN_DIGEST_ALGORITHM):
+        """Return the DER encoded CMS SignedData document for data."""
+        digest_oid, digest_name = _DIGESTS[message_digest]
+        content = _canonicalize(data)
+        signature = self._key.sign(content, getattr(hashes, digest_name)())
+
+        digest_algorithm = _der(_SEQUENCE, _der_oid(digest_oid))
+        signer_info = _der(
+            _SEQUENCE,
+            _der(_INTEGER, b'\x01'),
+            self._issuer_and_serial_number,
+            digest_algorithm,
+            _der(_SEQUENCE, _der_oid(_RSA_ENCRYPTION_OID), _der(_NULL)),
+            _der(_OCTET_STRING, signature))
+        signed_data = _der(
+            _SEQUENCE,
+            _der(_INTEGER, b'\x01'),
+            _der(_SET, digest_algorithm),
+            _der(_SEQUENCE,
+                 _der_oid(_DATA_OID),
+                 _der(_EXPLICIT_0, _der(_OCTET_STRING, content))),
+            _der(_SET, signer_info))
+        return _der(_SEQUENCE,
+                    _der_oid(_SIGNED_DATA_OID),
+                    _der(_EXPLICIT_0, signed_data))
+
+
+_signers = signing.SignerCache(
+    CMSSigner, _LW('Unable to sign in-process, falling back to openssl: %s'))
+
+
+def _get_signer(certfile, keyfile):
+    """Return the signer for a certificate and key, or None if unusable."""
+    if not CONF.signing.sign_in_process or hashes is None:
+        return None
+    return _signers.get(certfile, keyfile)
+
+
+def _sign_data(data_to_sign, signing_cert_file_name, signing_key_file_name,
+               message_digest):
+    """Return the PEM encoded signed document, or None if unable to sign."""
+    if message_digest not in _DIGESTS:
+        return None
+    signer = _get_signer(signing_cert_file_name, signing_key_file_name)
+    if signer is None:
+        return None
+    if isinstance(data_to_sign, six.text_type):
+        data_to_sign = data_to_sign.encode('utf-8')
+    encoded = base64.b64encode(signer.sign(bytes(data_to_sign),
+                                           message_digest)).decode('ascii')
+    lines = ['-----BEGIN CMS-----']
+    lines.extend(encoded[i:i + 64] for i in range(0, len(encoded), 64))
+    lines.append('-----END CMS-----\n')
+    return '\n'.join(lines)
+
+
+def cms_sign_text(data_to_sign, signing_cert_file_name, signing_key_file_name,
+                  message_digest=cms.DEFAULT_TOKEN_DIGEST_ALGORITHM):
+    signed = _sign_data(data_to_sign, signing_cert_file_name,
+                        signing_key_file_name, message_digest)
+    if signed is None:
+        return cms.cms_sign_text(data_to_sign, signing_cert_file_name,
+                                 signing_key_file_name,
+                                 message_digest=message_digest)
+    return signed
+
+
+def cms_sign_token(text, signing_cert_file_name, signing_key_file_name,
+                   message_digest=cms.DEFAULT_TOKEN_DIGEST_ALGORITHM):
+    signed = _sign_data(text, signing_cert_file_name, signing_key_file_name,
+                        message_digest)
+    if signed is None:
+        return cms.cms_sign_token(text, signing_cert_file_name,
+                                  signing_key_file_name,
+                                  message_digest=message_digest)
+    return cms.cms_to_token(signed)
+
+
+def pkiz_sign(text, signing_cert_file_name, signing_key_file_name,
+              compression_level=6,
+              message_digest=cms.DEFAULT_TOKEN_DIGEST_ALGORITHM):
+    signed = _sign_data(text, signing_cert_file_name, signing_key_file_name,
+                        message_digest)
+    if signed is None:
+        return cms.pkiz_sign(text, signing_cert_file_name,
+                             signing_key_file_name,
+                             compression_level=compression_level,
+                             message_digest=message_digest)
+    compressed = zlib.compress(signed.encode('utf-8'), compression_level)
+    return cms.PKIZ_PREFIX + base64.urlsafe_b64encode(
+        compressed).decode('utf-8')
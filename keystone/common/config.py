@@ -84,6 +84,18 @@ FILE_OPTIONS = {
         cfg.IntOpt('crypt_strength', default=40000,
                    help='The value passed as the keyword "rounds" to '
                         'passlib\'s encrypt method.'),
+        cfg.IntOpt('crypt_pool_size', default=0,
+                   help='Number of worker processes each keystone process '
+                        'starts to hash and check passwords in, so that '
+                        'other requests are not held up while they run and '
+                        'the work is spread over all CPU cores. Set to 0 to '
+                        'hash passwords in the process handling the '
+                        'request.'),
+        cfg.IntOpt('crypt_pool_timeout', default=60,
+                   help='Number of seconds to wait for a password hashing '
+                        'worker process to answer before it is restarted '
+                        'and the password is hashed in the process handling '
+                        'the request instead.'),
         cfg.IntOpt('list_limit',
                    help='The maximum number of entities that will be '
                         'returned in a collection, with no limit set by '
@@ -162,6 +174,12 @@ FILE_OPTIONS = {
         cfg.IntOpt('max_password_length', default=4096,
                    help='Maximum supported length for user passwords; '
                         'decrease to improve performance.'),
+        cfg.IntOpt('password_cache_size', default=1000,
+                   help='Maximum number of verified passwords that each '
+                        'process remembers, as a keyed hash, so that '
+                        'repeated authentications with the same password '
+                        'do not have to be checked against the slow stored '
+                        'hash again. Set to 0 to disable.'),
         cfg.IntOpt('list_limit',
                    help='Maximum number of entities that will be returned in '
                         'an identity collection.'),
@@ -199,6 +217,13 @@ FILE_OPTIONS = {
                          'this means that the only time you can set this '
                          'value to False is when configuring a fresh '
                          'installation.'),
+        cfg.IntOpt('cache_size', default=10000,
+                   help='Maximum number of local to public ID mappings held '
+                        'in memory by each process. Mappings do not change '
+                        'once created, so they are kept for the life of the '
+                        'process, and keystone should be restarted after '
+                        'purging mappings with keystone-manage. Set to 0 to '
+                        'disable.'),
     ],
     'trust': [
         cfg.BoolOpt('enabled', default=True,
@@ -210,7 +235,13 @@ FILE_OPTIONS = {
                    help='Maximum depth of trust redelegation.'),
         cfg.StrOpt('driver',
                    default='keystone.trust.backends.sql.Trust',
-                   help='Trust backend driver.')],
+                   help='Trust backend driver.'),
+        cfg.BoolOpt('caching', default=True,
+                    help='Toggle for trust pedigree caching. This has no '
+                         'effect unless global caching is enabled.'),
+        cfg.IntOpt('cache_time',
+                   help='TTL (in seconds) to cache trust pedigrees. This has '
+                        'no effect unless global caching is enabled.')],
     'os_inherit': [
         cfg.BoolOpt('enabled', default=False,
                     help='role-assignment inheritance to projects from '
@@ -268,6 +299,12 @@ FILE_OPTIONS = {
                     'list of tokens to revoke. Only disable if you are '
                     'switching to using the Revoke extension with a '
                     'backend other than KVS, which stores events in memory.'),
+        cfg.BoolOpt('revoke_by_id_in_background', default=False,
+                    help='Delete the tokens affected by the deletion of a '
+                    'role in a background thread, rather than before the '
+                    'deletion request returns. Deleting a role assigned to '
+                    'large groups can otherwise take a long time. Has no '
+                    'effect unless revoke_by_id is enabled.'),
         cfg.BoolOpt('allow_rescope_scoped_token', default=True,
                     help='Allow rescoping of scoped token. Setting '
                     'allow_rescoped_scoped_token to false prevents a user '
@@ -289,6 +326,13 @@ FILE_OPTIONS = {
                    help='This value (calculated in seconds) is added to token '
                         'expiration before a revocation event may be removed '
                         'from the backend.'),
+        cfg.IntOpt('fetch_overlap', default=60,
+                   help='When reading new revocation events, events recorded '
+                        'up to this many seconds before the newest event '
+                        'already read are read again. This allows for events '
+                        'that are committed late, or recorded by a server '
+                        'whose clock is behind, and should exceed the clock '
+                        'skew between servers.'),
         cfg.BoolOpt('caching', default=True,
                     help='Toggle for revocation event caching. This has no '
                          'effect unless global caching is enabled.'),
@@ -346,6 +390,24 @@ FILE_OPTIONS = {
                          'cache-backend get/set/delete calls with the '
                          'keys/values.  Typically this should be left set '
                          'to false.'),
+        cfg.IntOpt('local_cache_size', default=0,
+                   help='Number of cached values each process keeps in '
+                        'memory, in front of the cache backend, so that '
+                        'repeated reads do not go over the network. Other '
+                        'processes may see a value for up to '
+                        'local_cache_check_interval seconds after it has '
+                        'been invalidated. Each invalidation also drops the '
+                        'in-memory values whose keys share one of 64 '
+                        'buckets with the invalidated keys, in every '
+                        'process. Set to 0 to disable.'),
+        cfg.IntOpt('local_cache_time', default=5,
+                   help='Time in seconds a value is kept in the in-process '
+                        'cache.'),
+        cfg.FloatOpt('local_cache_check_interval', default=0.1,
+                     help='Interval in seconds at which each process checks '
+                          'the cache backend for invalidations made by '
+                          'other processes, and if there are any drops the '
+                          'in-memory values they may affect.'),
         cfg.ListOpt('memcache_servers', default=['localhost:11211'],
                     help='Memcache servers in the format of "host:port".'
                     ' (dogpile.cache.memcache and keystone.cache.memcache_pool'
@@ -417,6 +479,12 @@ FILE_OPTIONS = {
                             'CN=www.example.com'),
                    help='Certificate subject (auto generated certificate) for '
                         'token signing.'),
+        cfg.BoolOpt('sign_in_process', default=True,
+                    help='Sign PKI and PKIZ tokens and the revocation list '
+                         'within the keystone process rather than by running '
+                         'the openssl command for each document. Requires '
+                         'an RSA signing key; the openssl command is used '
+                         'otherwise.'),
     ],
     'assignment': [
         # assignment has no default for backward compatibility reasons.
@@ -531,6 +599,12 @@ FILE_OPTIONS = {
         cfg.IntOpt('list_limit',
                    help='Maximum number of entities that will be returned '
                         'in a policy collection.'),
+        cfg.IntOpt('decision_cache_size', default=1000,
+                   help='Maximum number of policy decisions remembered by '
+                        'the rules driver. A decision is keyed on the action '
+                        'and the credential and target values its rule '
+                        'refers to, and all decisions are forgotten when '
+                        'the policy file changes. Set to 0 to disable.'),
     ],
     'endpoint_filter': [
         cfg.StrOpt('driver',
@@ -825,6 +899,22 @@ FILE_OPTIONS = {
                    help='End user auth connection pool size.'),
         cfg.IntOpt('auth_pool_connection_lifetime', default=60,
                    help='End user auth connection lifetime in seconds.'),
+        cfg.BoolOpt('auth_cache_enabled', default=False,
+                    help='Remember successful end user authentications for '
+                         'a short time, so that repeated authentications '
+                         'with the same password do not need to bind to the '
+                         'LDAP server. Only a salted hash of the password is '
+                         'kept in memory. Each keystone process keeps its '
+                         'own entries, so a password changed directly in the '
+                         'LDAP server, or through another keystone process, '
+                         'is still accepted by this process until the entry '
+                         'expires.'),
+        cfg.IntOpt('auth_cache_time', default=60,
+                   help='Time in seconds to remember a successful end user '
+                        'authentication.'),
+        cfg.IntOpt('auth_cache_size', default=1000,
+                   help='Maximum number of end user authentications to '
+                        'remember.'),
     ],
     'auth': [
         cfg.ListOpt('methods', default=_DEFAULT_AUTH_METHODS,
@@ -939,6 +1029,11 @@ FILE_OPTIONS = {
                    default=_KEYFILE,
                    help='Path of the keyfile for SAML signing. Note, the path '
                         'cannot contain a comma.'),
+        cfg.BoolOpt('sign_in_process', default=True,
+                    help='Sign SAML assertions within the keystone process '
+                         'rather than by running xmlsec1 for each assertion. '
+                         'Requires lxml and an RSA signing key; xmlsec1 is '
+                         'used otherwise.'),
         cfg.StrOpt('idp_entity_id',
                    help='Entity ID value for unique Identity Provider '
                         'identification. Usually FQDN is set with a suffix. '
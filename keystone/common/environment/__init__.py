@@ -28,6 +28,23 @@ Server = None
 httplib = None
 subprocess = None
 
+_reset_callbacks = []
+
+
+def register_reset_callback(callback):
+    """Register a callable to run when a server is reset.
+
+    Servers are reset by the launcher when it receives a SIGHUP; modules use
+    this to drop process-wide state that should be reloaded then.
+    """
+    _reset_callbacks.append(callback)
+
+
+def reset():
+    """Run the registered reset callbacks."""
+    for callback in _reset_callbacks:
+        callback()
+
 
 def configure_once(name):
     """Ensure that environment configuration is only run once.
@@ -28,6 +28,7 @@ import greenlet
 from oslo_log import log
 from oslo_log import loggers
 
+from keystone.common import environment
 from keystone.i18n import _LE, _LI
 
 
@@ -175,9 +176,10 @@ class Server(object):
         SIGHUP. The service interface is defined in
         keystone.openstack.common.service.Service.
 
-        Keystone does not need to do anything here.
+        Run the callbacks registered with the environment, so that cached
+        state such as the Fernet keys is reloaded.
         """
-        pass
+        environment.reset()
 
     def _run(self, application, socket):
         """Start a WSGI server with a new green thread pool."""
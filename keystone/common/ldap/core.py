@@ -48,6 +48,8 @@ LDAP_TLS_CERTS = {'never': ldap.OPT_X_TLS_NEVER,
 # RFC 4511 (The LDAP Protocol) defines a list containing only the OID '1.1' to
 # indicate that no attributes should be returned besides the DN.
 DN_ONLY = ['1.1']
+# Number of IDs ORed together in one search filter by get_by_ids().
+ID_FILTER_BATCH_SIZE = 100
 
 _utf8_encoder = codecs.getencoder('utf-8')
 
@@ -1504,6 +1506,26 @@ class BaseLdap(object):
         return [self._ldap_res_to_model(x)
                 for x in self._ldap_get_all(ldap_filter)]
 
+    def get_by_ids(self, object_ids):
+        """Return the objects with the given IDs.
+
+        The objects are fetched with a search per batch of IDs, rather than
+        one search per ID. IDs that are not found are left out of the result.
+
+        """
+        refs = []
+        object_ids = list(object_ids)
+        for i in six.moves.range(0, len(object_ids), ID_FILTER_BATCH_SIZE):
+            query = u'(&(|%s)%s)' % (
+                ''.join(u'(%s=%s)' % (self.id_attr,
+                                      ldap.filter.escape_filter_chars(
+                                          six.text_type(object_id)))
+                        for object_id in
+                        object_ids[i:i + ID_FILTER_BATCH_SIZE]),
+                self.ldap_filter or '')
+            refs.extend(self.get_all(query))
+        return refs
+
     def update(self, object_id, values, old_obj=None):
         if old_obj is None:
             old_obj = self.get(object_id)
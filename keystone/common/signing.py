@@ -0,0 +1,142 @@
+# Licensed under the Apache License, Version 2.0 (the "License"); you may
+# not use this file except in compliance with the License. You may obtain
+# a copy of the License at
+#
+#      http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS, WITHOUT
+# WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the
+# License for the specific language governing permissions and limitations
+# under the License.
+
+"""RSA certificates and keys for signing in-process.
+
+PKI tokens (see ``keystone.common.cmsutils``) and SAML assertions (see
+``keystone.contrib.federation.idp``) can be signed in-process rather than by
+running an external command. Both load a PEM certificate and RSA key with
+``SigningKey`` and keep a signer per pair of files in a ``SignerCache``.
+
+"""
+
+import base64
+import os
+import re
+import threading
+
+from oslo_log import log
+
+from keystone.common import environment
+
+try:
+    from cryptography.hazmat import backends
+    from cryptography.hazmat.primitives.asymmetric import padding
+    from cryptography.hazmat.primitives.asymmetric import rsa
+    from cryptography.hazmat.primitives import serialization
+except ImportError:  # pragma: no cover
+    serialization = None
+
+
+LOG = log.getLogger(__name__)
+
+_PEM_CERT_RE = re.compile(
+    br'-----BEGIN CERTIFICATE-----(.*?)-----END CERTIFICATE-----', re.DOTALL)
+
+
+class SigningKey(object):
+    """An RSA private key and the certificate that goes with it.
+
+    ``certificate`` is the DER encoded certificate.
+
+    """
+
+    def __init__(self, cert_pem, key_pem):
+        match = _PEM_CERT_RE.search(cert_pem)
+        if match is None:
+            raise ValueError('No certificate found')
+        self.certificate = base64.b64decode(b''.join(match.group(1).split()))
+        self._key = serialization.load_pem_private_key(
+            key_pem, password=None, backend=backends.default_backend())
+        if not isinstance(self._key, rsa.RSAPrivateKey):
+            raise ValueError('Only RSA signing keys are supported')
+
+    @classmethod
+    def from_files(cls, certfile, keyfile):
+        with open(certfile, 'rb') as f:
+            cert_pem = f.read()
+        with open(keyfile, 'rb') as f:
+            key_pem = f.read()
+        return cls(cert_pem, key_pem)
+
+    def sign(self, data, algorithm):
+        """Return the PKCS#1 v1.5 signature of data.
+
+        :param algorithm: a ``cryptography`` hash algorithm instance.
+
+        """
+        if hasattr(self._key, 'sign'):
+            return self._key.sign(data, padding.PKCS1v15(), algorithm)
+        signer = self._key.signer(padding.PKCS1v15(), algorithm)
+        signer.update(data)
+        return signer.finalize()
+
+
+def get_fingerprint(*paths):
+    """Return the path, inode and modification time of each file.
+
+    The fingerprint changes whenever any of the files is replaced or
+    modified. A file that doesn't exist is represented by None.
+
+    """
+    fingerprint = []
+    for path in paths:
+        try:
+            stat_info = os.stat(path)
+        except OSError:
+            fingerprint.append(None)
+        else:
+            fingerprint.append(
+                (path, stat_info.st_ino, stat_info.st_mtime))
+    return tuple(fingerprint)
+
+
+class SignerCache(object):
+    """Process-wide cache of signers, one per certificate and key file.
+
+    A signer is built by ``factory(signing_key)`` when the files are first
+    used, and built again once either file is replaced or modified, or when
+    ``reset()`` is called, e.g. on SIGHUP. If the files can't be loaded,
+    ``warning`` is logged with the error and the failure is remembered the
+    same way, so that it is only logged again once the files change.
+
+    """
+
+    def __init__(self, factory, warning):
+        self._factory = factory
+        self._warning = warning
+        self._lock = threading.Lock()
+        self._signers = {}
+        environment.register_reset_callback(self.reset)
+
+    def get(self, certfile, keyfile):
+        """Return the signer for a certificate and key, or None if unusable."""
+        if serialization is None:
+            return None
+        fingerprint = get_fingerprint(certfile, keyfile)
+        with self._lock:
+            entry = self._signers.get((certfile, keyfile))
+            if entry is not None and entry[0] == fingerprint:
+                return entry[1]
+            try:
+                signer = self._factory(
+                    SigningKey.from_files(certfile, keyfile))
+            except Exception as e:
+                LOG.warning(self._warning, e)
+                signer = None
+            self._signers[(certfile, keyfile)] = (fingerprint, signer)
+            return signer
+
+    def reset(self):
+        """Forget the signers so that the files are loaded on next use."""
+        with self._lock:
+            self._signers.clear()
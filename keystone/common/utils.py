@@ -20,8 +20,12 @@ import calendar
 import collections
 import grp
 import hashlib
+import hmac
+import multiprocessing
 import os
 import pwd
+import select
+import threading
 
 from oslo_config import cfg
 from oslo_log import log
@@ -124,11 +128,116 @@ def hash_user_password(user):
     return dict(user, password=hash_password(password))
 
 
+def _crypt_worker(conn):
+    """Run the calls sent by the parent process until it goes away."""
+    while True:
+        try:
+            func, args = conn.recv()
+        except EOFError:
+            return
+        try:
+            conn.send((True, func(*args)))
+        except Exception as e:
+            conn.send((False, e))
+
+
+class CryptPool(object):
+    """A pool of worker processes to hash and check passwords in.
+
+    Hashing a password is deliberately slow. Done in the process handling
+    the request, it holds up every other request that process is handling.
+    Results are waited for with select(), which lets other green threads run
+    when eventlet is in use.
+
+    """
+
+    def __init__(self, size):
+        self.pid = os.getpid()
+        self._idle = moves.queue.Queue()
+        for i in moves.range(size):
+            self._idle.put(self._start_worker())
+
+    @staticmethod
+    def _start_worker():
+        conn, child_conn = multiprocessing.Pipe()
+        process = multiprocessing.Process(target=_crypt_worker,
+                                          args=(child_conn,))
+        process.daemon = True
+        process.start()
+        child_conn.close()
+        return conn, process
+
+    def _restart_worker(self, worker):
+        conn, process = worker
+        conn.close()
+        process.terminate()
+        return self._start_worker()
+
+    def run(self, func, *args):
+        """Call func(*args) in a worker process and return the result.
+
+        If the worker fails or doesn't answer within
+        ``CONF.crypt_pool_timeout`` seconds, it is replaced and func(*args) is
+        called in this process instead.
+
+        """
+        worker = self._idle.get()
+        conn, process = worker
+        try:
+            conn.send((func, args))
+            if select.select([conn], [], [], CONF.crypt_pool_timeout)[0]:
+                succeeded, result = conn.recv()
+            else:
+                LOG.warning(_LW('Password hashing worker process %s timed '
+                                'out, restarting it.'), process.pid)
+                worker = self._restart_worker(worker)
+        except (EOFError, IOError, OSError):
+            LOG.warning(_LW('Password hashing worker process %s failed, '
+                            'restarting it.'), process.pid)
+            worker = self._restart_worker(worker)
+        finally:
+            self._idle.put(worker)
+        if worker[1] is not process:
+            return func(*args)
+        if not succeeded:
+            raise result
+        return result
+
+    def close(self):
+        while not self._idle.empty():
+            conn, process = self._idle.get()
+            conn.close()
+            process.terminate()
+
+
+_crypt_pool = None
+_crypt_pool_lock = threading.Lock()
+
+
+def _run_crypt(func, *args):
+    global _crypt_pool
+
+    if CONF.crypt_pool_size <= 0:
+        return func(*args)
+    with _crypt_pool_lock:
+        # A pool inherited from a parent process isn't usable.
+        if _crypt_pool is None or _crypt_pool.pid != os.getpid():
+            _crypt_pool = CryptPool(CONF.crypt_pool_size)
+    return _crypt_pool.run(func, *args)
+
+
+def _crypt_encrypt(password_utf8, rounds):
+    return passlib.hash.sha512_crypt.encrypt(password_utf8, rounds=rounds)
+
+
+def _crypt_verify(password_utf8, hashed):
+    return passlib.hash.sha512_crypt.verify(password_utf8, hashed)
+
+
 def hash_password(password):
     """Hash a password. Hard."""
     password_utf8 = verify_length_and_trunc_password(password).encode('utf-8')
-    return passlib.hash.sha512_crypt.encrypt(
-        password_utf8, rounds=CONF.crypt_strength)
+    return _run_crypt(_crypt_encrypt, password_utf8, CONF.crypt_strength)
 
 
 def check_password(password, hashed):
@@ -141,7 +250,45 @@ def check_password(password, hashed):
     if password is None or hashed is None:
         return False
     password_utf8 = verify_length_and_trunc_password(password).encode('utf-8')
-    return passlib.hash.sha512_crypt.verify(password_utf8, hashed)
+    return _run_crypt(_crypt_verify, password_utf8, hashed)
+
+
+class VerifiedPasswordCache(object):
+    """Remembers passwords that have been checked against a stored hash.
+
+    Checking a password against its stored hash is deliberately slow. Once a
+    password has matched, a keyed HMAC of it is remembered along with the
+    stored hash, so that the same password can be checked again cheaply
+    until the stored hash changes. The HMAC key is random and never leaves
+    the process.
+
+    """
+
+    def __init__(self, maxsize):
+        self._key = os.urandom(32)
+        self._digests = LRUCache(maxsize)
+
+    def _digest(self, password_utf8):
+        return hmac.new(self._key, password_utf8, hashlib.sha256).hexdigest()
+
+    def check_password(self, user_id, password, hashed):
+        """Check that a plaintext password matches the user's hash.
+
+        :returns: True if the password matches, as for check_password().
+
+        """
+        if password is None or hashed is None:
+            return False
+        password_utf8 = verify_length_and_trunc_password(
+            password).encode('utf-8')
+        digest = self._digest(password_utf8)
+        known = self._digests.get((user_id, hashed))
+        if known is not None and auth_str_equal(digest, known):
+            return True
+        if not _run_crypt(_crypt_verify, password_utf8, hashed):
+            return False
+        self._digests.set((user_id, hashed), digest)
+        return True
 
 
 def attr_as_boolean(val_attr):
@@ -469,3 +616,45 @@ class WhiteListedItemFilter(object):
         if name not in self._whitelist:
             raise KeyError
         return self._data[name]
+
+
+class LRUCache(object):
+    """A thread-safe mapping holding at most ``maxsize`` items.
+
+    When full, the least recently used item is discarded to make room.
+
+    """
+
+    def __init__(self, maxsize):
+        self.maxsize = maxsize
+        self._data = collections.OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key, default=None):
+        with self._lock:
+            try:
+                value = self._data.pop(key)
+            except KeyError:
+                return default
+            self._data[key] = value
+            return value
+
+    def set(self, key, value):
+        if self.maxsize <= 0:
+            return
+        with self._lock:
+            self._data.pop(key, None)
+            self._data[key] = value
+            while len(self._data) > self.maxsize:
+                self._data.popitem(last=False)
+
+    def pop(self, key, default=None):
+        with self._lock:
+            return self._data.pop(key, default)
+
+    def clear(self):
+        with self._lock:
+            self._data.clear()
+
+    def __len__(self):
+        return len(self._data)
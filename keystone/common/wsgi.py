@@ -785,6 +785,24 @@ def render_response(body=None, status=None, headers=None, method=None):
     return resp
 
 
+def render_conditional_response(context, body, etag):
+    """Forms a WSGI response for a body identified by an entity tag.
+
+    If the request's If-None-Match header names the tag, a 304 Not Modified
+    response without a body is formed instead.
+
+    """
+    etag = '"%s"' % etag
+    headers = [('ETag', etag)]
+    if_none_match = context.get('headers', {}).get('If-None-Match')
+    if if_none_match:
+        tags = [t.strip() for t in if_none_match.split(',')]
+        if '*' in tags or etag in tags or 'W/' + etag in tags:
+            return render_response(status=(304, 'Not Modified'),
+                                   headers=headers)
+    return render_response(body=body, headers=headers)
+
+
 def render_exception(error, context=None, request=None, user_locale=None):
     """Forms a WSGI response based on the current error."""
 
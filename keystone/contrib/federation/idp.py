@@ -10,6 +10,8 @@
 # License for the specific language governing permissions and limitations
 # under the License.
 
+import base64
+import copy
 import datetime
 import os
 import subprocess
@@ -26,12 +28,21 @@ from saml2 import saml
 from saml2 import samlp
 from saml2.schema import soapenv
 from saml2 import sigver
+import six
 import xmldsig
 
+from keystone.common import signing
 from keystone import exception
-from keystone.i18n import _, _LE
+from keystone.i18n import _, _LE, _LW
 from keystone.openstack.common import fileutils
 
+try:
+    from cryptography.hazmat import backends
+    from cryptography.hazmat.primitives import hashes
+    from lxml import etree
+except ImportError:  # pragma: no cover
+    etree = None
+
 
 LOG = log.getLogger(__name__)
 CONF = cfg.CONF
@@ -367,16 +378,103 @@ class SAMLGenerator(object):
         return signature
 
 
+# Algorithm URIs of the signature templates the in-process signer can fill
+# in, with the cryptography hash class name they use.
+_SIGNATURE_METHODS = {
+    xmldsig.SIG_RSA_SHA1: 'SHA1',
+    'http://www.w3.org/2001/04/xmldsig-more#rsa-sha256': 'SHA256',
+}
+_DIGEST_METHODS = {
+    xmldsig.DIGEST_SHA1: 'SHA1',
+    'http://www.w3.org/2001/04/xmlenc#sha256': 'SHA256',
+}
+
+
+def _ds(tag):
+    return '{%s}%s' % (xmldsig.NAMESPACE, tag)
+
+
+def _c14n(element):
+    return etree.tostring(element, method='c14n', exclusive=True,
+                          with_comments=False)
+
+
+class _AssertionSigner(object):
+    """Signs SAML assertions with a ``signing.SigningKey``.
+
+    Fills in the ``<Signature>`` template of an assertion as ``xmlsec1
+    --sign`` does: the reference is digested with the enveloped signature
+    and exclusive canonicalization transforms, the canonical
+    ``<SignedInfo>`` is signed and the certificate is added to
+    ``<X509Data>``. Templates using other algorithms are rejected.
+
+    """
+
+    def __init__(self, signing_key):
+        self._key = signing_key
+        self._certificate = base64.b64encode(
+            signing_key.certificate).decode('ascii')
+
+    def _hash(self, name, data):
+        digest = hashes.Hash(getattr(hashes, name)(),
+                             backend=backends.default_backend())
+        digest.update(data)
+        return digest.finalize()
+
+    def sign(self, assertion_xml):
+        """Return the assertion XML with its signature template filled in."""
+        if isinstance(assertion_xml, six.text_type):
+            assertion_xml = assertion_xml.encode('utf-8')
+        root = etree.fromstring(assertion_xml)
+        signature = root.find(_ds('Signature'))
+        signed_info = signature.find(_ds('SignedInfo'))
+        reference = signed_info.find(_ds('Reference'))
+        transforms = [t.get('Algorithm') for t in
+                      reference.find(_ds('Transforms'))]
+        if (signed_info.find(_ds('CanonicalizationMethod')).get('Algorithm')
+                != xmldsig.ALG_EXC_C14N or
+                transforms != [xmldsig.TRANSFORM_ENVELOPED,
+                               xmldsig.ALG_EXC_C14N] or
+                reference.get('URI') != '#' + root.get('ID')):
+            raise ValueError('Unsupported signature template')
+        signature_hash = _SIGNATURE_METHODS[
+            signed_info.find(_ds('SignatureMethod')).get('Algorithm')]
+        digest_hash = _DIGEST_METHODS[
+            reference.find(_ds('DigestMethod')).get('Algorithm')]
+
+        enveloped = copy.deepcopy(root)
+        enveloped.remove(enveloped.find(_ds('Signature')))
+        reference.find(_ds('DigestValue')).text = base64.b64encode(
+            self._hash(digest_hash, _c14n(enveloped))).decode('ascii')
+
+        signature.find(_ds('SignatureValue')).text = base64.b64encode(
+            self._key.sign(_c14n(signed_info),
+                           getattr(hashes, signature_hash)())).decode('ascii')
+        x509_data = signature.find(_ds('KeyInfo')).find(_ds('X509Data'))
+        etree.SubElement(x509_data, _ds('X509Certificate')).text = (
+            self._certificate)
+        return etree.tostring(root)
+
+
+_signers = signing.SignerCache(
+    _AssertionSigner, _LW('Unable to sign assertions in-process, falling '
+                          'back to xmlsec1: %s'))
+
+
+def _get_signer(certfile, keyfile):
+    """Return the signer for a certificate and key, or None if unusable."""
+    if not CONF.saml.sign_in_process or etree is None:
+        return None
+    return _signers.get(certfile, keyfile)
+
+
 def _sign_assertion(assertion):
     """Sign a SAML assertion.
 
-    This method utilizes ``xmlsec1`` binary and signs SAML assertions in a
-    separate process. ``xmlsec1`` cannot read input data from stdin so the
-    prepared assertion needs to be serialized and stored in a temporary
-    file. This file will be deleted immediately after ``xmlsec1`` returns.
-    The signed assertion is redirected to a standard output and read using
-    subprocess.PIPE redirection. A ``saml.Assertion`` class is created
-    from the signed string again and returned.
+    The assertion is signed in-process with the IdP key and certificate,
+    which are kept loaded until the files change. If that is disabled or not
+    possible, it is signed by ``xmlsec1`` instead. A ``saml.Assertion`` class
+    is created from the signed string again and returned.
 
     Parameters that are required in the CONF::
     * xmlsec_binary
@@ -384,6 +482,38 @@ def _sign_assertion(assertion):
     * public key file path
     :return: XML <Assertion> object
 
+    """
+    # NOTE(gyee): need to make the namespace prefixes explicit so
+    # they won't get reassigned when we wrap the assertion into
+    # SAML2 response
+    assertion_xml = assertion.to_string(
+        nspair={'saml': saml2.NAMESPACE,
+                'xmldsig': xmldsig.NAMESPACE})
+
+    signed = None
+    signer = _get_signer(CONF.saml.certfile, CONF.saml.keyfile)
+    if signer is not None:
+        try:
+            signed = signer.sign(assertion_xml)
+        except Exception as e:
+            LOG.warning(_LW('Unable to sign assertion in-process, falling '
+                            'back to xmlsec1: %s'), e)
+    if signed is None:
+        signed = _sign_assertion_with_xmlsec1(assertion_xml)
+
+    return saml2.create_class_from_xml_string(saml.Assertion, signed)
+
+
+def _sign_assertion_with_xmlsec1(assertion_xml):
+    """Sign a serialized SAML assertion with the ``xmlsec1`` binary.
+
+    ``xmlsec1`` cannot read input data from stdin so the assertion needs to
+    be stored in a temporary file. This file will be deleted immediately
+    after ``xmlsec1`` returns. The signed assertion is redirected to a
+    standard output and read using subprocess.PIPE redirection.
+
+    :return: the signed assertion XML
+
     """
     xmlsec_binary = CONF.saml.xmlsec1_binary
     idp_private_key = CONF.saml.keyfile
@@ -398,27 +528,22 @@ def _sign_assertion(assertion):
     command_list = [xmlsec_binary, '--sign', '--privkey-pem', certificates,
                     '--id-attr:ID', 'Assertion']
 
+    file_path = None
     try:
-        # NOTE(gyee): need to make the namespace prefixes explicit so
-        # they won't get reassigned when we wrap the assertion into
-        # SAML2 response
-        file_path = fileutils.write_to_tempfile(assertion.to_string(
-            nspair={'saml': saml2.NAMESPACE,
-                    'xmldsig': xmldsig.NAMESPACE}))
+        file_path = fileutils.write_to_tempfile(assertion_xml)
         command_list.append(file_path)
-        stdout = subprocess.check_output(command_list)
+        return subprocess.check_output(command_list)
     except Exception as e:
         msg = _LE('Error when signing assertion, reason: %(reason)s')
         msg = msg % {'reason': e}
         LOG.error(msg)
         raise exception.SAMLSigningError(reason=e)
     finally:
-        try:
-            os.remove(file_path)
-        except OSError:
-            pass
-
-    return saml2.create_class_from_xml_string(saml.Assertion, stdout)
+        if file_path is not None:
+            try:
+                os.remove(file_path)
+            except OSError:
+                pass
 
 
 class MetadataGenerator(object):
@@ -11,7 +11,10 @@
 # under the License.
 
 import abc
+import collections
 import datetime
+import threading
+import uuid
 
 from oslo_config import cfg
 from oslo_log import log
@@ -74,6 +77,17 @@ class Manager(manager.Manager):
         super(Manager, self).__init__(CONF.revoke.driver)
         self._register_listeners()
         self.model = model
+        self._revoke_tree_lock = threading.Lock()
+        self._reset_revoke_tree()
+
+    def _reset_revoke_tree(self):
+        self._revoke_tree = model.RevokeTree()
+        # Events held by the tree, oldest `revoked_at` first, so that expired
+        # events can be pruned from the left.
+        self._revoke_events = collections.deque()
+        self._revoke_event_keys = set()
+        self._revoke_generation = None
+        self._last_fetch = None
 
     def _user_callback(self, service, resource_type, operation,
                        payload):
@@ -198,11 +212,66 @@ class Manager(manager.Manager):
         self.revoke(model.RevokeEvent(domain_id=domain_id, role_id=role_id))
 
     @MEMOIZE
+    def _get_revoke_generation(self):
+        """Return a marker that changes whenever an event is recorded.
+
+        The marker lives in the shared cache region, so a revocation recorded
+        by any process is noticed by all of them. Without caching a new
+        marker is returned on every call and the tree is always refreshed.
+
+        """
+        return uuid.uuid4().hex
+
+    def get_revoke_generation(self):
+        """Return a marker that changes whenever an event is recorded."""
+        return self._get_revoke_generation()
+
+    def _add_to_revoke_tree(self, events):
+        for event in events:
+            key = model.event_key(event)
+            if key in self._revoke_event_keys:
+                continue
+            self._revoke_event_keys.add(key)
+            self._revoke_tree.add_event(event)
+            self._revoke_events.append(event)
+            if self._last_fetch is None or event.revoked_at > self._last_fetch:
+                self._last_fetch = event.revoked_at
+
+    def _prune_revoke_tree(self):
+        oldest = revoked_before_cutoff_time()
+        events = self._revoke_events
+        while events and events[0].revoked_at < oldest:
+            event = events.popleft()
+            self._revoke_event_keys.discard(model.event_key(event))
+            self._revoke_tree.remove_event(event)
+
     def _get_revoke_tree(self):
-        events = self.driver.list_events()
-        revoke_tree = model.RevokeTree(revoke_events=events)
+        """Return the revocation tree, updated with any new events.
+
+        The tree is kept for the life of the process. Only events recorded
+        since the last fetch are read from the backend and added to it, and
+        events older than the expiration cutoff are removed from it.
 
-        return revoke_tree
+        """
+        generation = self._get_revoke_generation()
+        with self._revoke_tree_lock:
+            if generation != self._revoke_generation:
+                # NOTE: Events are fetched incrementally by `revoked_at`,
+                # which is set by the server recording the event. An event
+                # committed late, recorded by a server whose clock is behind,
+                # or stored to the second by the backend may be older than
+                # the newest event already read, so a window before it is
+                # read again and de-duplicated.
+                last_fetch = self._last_fetch
+                if last_fetch is not None:
+                    last_fetch -= datetime.timedelta(
+                        seconds=CONF.revoke.fetch_overlap)
+                events = self.driver.list_events(last_fetch=last_fetch)
+                events.sort(key=lambda e: e.revoked_at)
+                self._add_to_revoke_tree(events)
+                self._revoke_generation = generation
+            self._prune_revoke_tree()
+            return self._revoke_tree
 
     def check_token(self, token_values):
         """Checks the values from a token against the revocation list
@@ -217,9 +286,22 @@ class Manager(manager.Manager):
         if self._get_revoke_tree().is_revoked(token_values):
             raise exception.TokenNotFound(_('Failed to validate token'))
 
+    def check_tokens(self, token_values_list):
+        """Checks a batch of tokens against the revocation list
+
+        :param token_values_list: list of dictionaries of values from tokens,
+         as for check_token
+
+        :returns: a list of booleans, True for each token that is revoked
+
+        """
+        revoke_tree = self._get_revoke_tree()
+        return [revoke_tree.is_revoked(token_values)
+                for token_values in token_values_list]
+
     def revoke(self, event):
         self.driver.revoke(event)
-        self._get_revoke_tree.invalidate(self)
+        self._get_revoke_generation.invalidate(self)
 
 
 @six.add_metaclass(abc.ABCMeta)
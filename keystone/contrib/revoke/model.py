@@ -10,6 +10,8 @@
 # License for the specific language governing permissions and limitations
 # under the License.
 
+import itertools
+
 from oslo_utils import timeutils
 
 
@@ -110,82 +112,116 @@ class RevokeEvent(object):
         return "%s=%s" % (name, getattr(self, name) or '*')
 
 
-def attr_keys(event):
-    return map(event.key_for_name, _EVENT_NAMES)
+def event_key(event):
+    """Return a hashable value identifying an event by its contents."""
+    return tuple(getattr(event, name) for name in REVOKE_KEYS)
+
+
+# Alternative names to be checked in the token for every field of an event.
+_TOKEN_ALTERNATIVES = {
+    'user_id': ('user_id', 'trustor_id', 'trustee_id'),
+    'domain_id': ('identity_domain_id', 'assignment_domain_id'),
+    # For a domain-scoped token, the domain is in assignment_domain_id.
+    'domain_scope_id': ('assignment_domain_id',),
+}
+
+# Upper bound on the number of "not revoked" verdicts remembered by a tree.
+_VERDICT_CACHE_SIZE = 10000
+
+
+def _event_shape(event):
+    """The names of the attributes constrained by an event, in tree order."""
+    return tuple(name for name in _EVENT_NAMES if getattr(event, name))
+
+
+def _token_candidates(token_data, name):
+    """The token values an event attribute is allowed to match."""
+    if name == 'role_id':
+        # Roles are very special since a token has a list of them. If the
+        # revocation event matches any one of them, revoke the token.
+        return token_data.get('roles') or ()
+    alternatives = _TOKEN_ALTERNATIVES.get(name)
+    if alternatives is None:
+        value = token_data.get(name)
+        return (value,) if value is not None else ()
+    return tuple(token_data[alt] for alt in alternatives
+                 if token_data.get(alt) is not None)
 
 
 class RevokeTree(object):
-    """Fast Revocation Checking Tree Structure
+    """Fast Revocation Checking Structure
+
+    Events are grouped by their "shape", the set of attributes they
+    constrain; attributes an event leaves unset act as wildcards. Within a
+    shape, the tuple of constrained values maps to the latest
+    'issued_before' of the events with those values. Checking a token is
+    then one hash lookup per shape (times the number of alternative values
+    the token carries), independent of the number of events.
 
-    The Tree is an index to quickly match tokens against events.
-    Each node is a hashtable of key=value combinations from revocation events.
-    The
+    Tokens found not to be revoked are remembered by audit_id until another
+    event is added.
 
     """
 
     def __init__(self, revoke_events=None):
         self.revoke_map = dict()
+        # Incremented every time an event is added, which is the only change
+        # that can turn a valid token into a revoked one.
+        self.generation = 0
+        self._not_revoked = dict()
         self.add_events(revoke_events)
 
     def add_event(self, event):
         """Updates the tree based on a revocation event.
 
-        Creates any necessary internal nodes in the tree corresponding to the
-        fields of the revocation event.  The leaf node will always be set to
-        the latest 'issued_before' for events that are otherwise identical.
+        The stored value will always be set to the latest 'issued_before' for
+        events that are otherwise identical.
 
         :param:  Event to add to the tree
 
         :returns:  the event that was passed in.
 
         """
-        revoke_map = self.revoke_map
-        for key in attr_keys(event):
-            revoke_map = revoke_map.setdefault(key, {})
-        revoke_map['issued_before'] = max(
-            event.issued_before, revoke_map.get(
-                'issued_before', event.issued_before))
+        shape = _event_shape(event)
+        values = tuple(getattr(event, name) for name in shape)
+        leaves = self.revoke_map.setdefault(shape, {})
+        leaves[values] = max(event.issued_before,
+                             leaves.get(values, event.issued_before))
+        self.generation += 1
         return event
 
     def remove_event(self, event):
         """Update the tree based on the removal of a Revocation Event
 
-        Removes empty nodes from the tree from the leaf back to the root.
+        Removes the shape from the tree once it holds no more events.
 
-        If multiple events trace the same path, but have different
+        If multiple events have the same values, but different
         'issued_before' values, only the last is ever stored in the tree.
         So only an exact match on 'issued_before' ever triggers a removal
 
         :param: Event to remove from the tree
 
         """
-        stack = []
-        revoke_map = self.revoke_map
-        for name in _EVENT_NAMES:
-            key = event.key_for_name(name)
-            nxt = revoke_map.get(key)
-            if nxt is None:
-                break
-            stack.append((revoke_map, key, nxt))
-            revoke_map = nxt
-        else:
-            if event.issued_before == revoke_map['issued_before']:
-                revoke_map.pop('issued_before')
-        for parent, key, child in reversed(stack):
-            if not any(child):
-                del parent[key]
+        shape = _event_shape(event)
+        leaves = self.revoke_map.get(shape)
+        if leaves is None:
+            return
+        values = tuple(getattr(event, name) for name in shape)
+        if leaves.get(values) == event.issued_before:
+            del leaves[values]
+            if not leaves:
+                del self.revoke_map[shape]
 
     def add_events(self, revoke_events):
-        return map(self.add_event, revoke_events or [])
+        return [self.add_event(event) for event in revoke_events or []]
 
     def is_revoked(self, token_data):
-        """Check if a token matches the revocation event
+        """Check if a token matches any revocation event
 
-        Compare the values for each level of the tree with the values from
-        the token, accounting for attributes that have alternative
-        keys, and for wildcard matches.
-        if there is a match, continue down the tree.
-        if there is no match, exit early.
+        For every shape of event in the tree, look up the values the token
+        has for the attributes of that shape, accounting for attributes that
+        have alternative keys and for the list of roles. A match revokes the
+        token if the event was issued after the token.
 
         token_data is a map based on a flattened view of token.
         The required fields are:
@@ -195,57 +231,29 @@ class RevokeTree(object):
            'consumer_id', 'access_token_id'
 
         """
-        # Alternative names to be checked in token for every field in
-        # revoke tree.
-        alternatives = {
-            'user_id': ['user_id', 'trustor_id', 'trustee_id'],
-            'domain_id': ['identity_domain_id', 'assignment_domain_id'],
-            # For a domain-scoped token, the domain is in assignment_domain_id.
-            'domain_scope_id': ['assignment_domain_id', ],
-        }
-        # Contains current forest (collection of trees) to be checked.
-        partial_matches = [self.revoke_map]
-        # We iterate over every layer of our revoke tree (except the last one).
-        for name in _EVENT_NAMES:
-            # bundle is the set of partial matches for the next level down
-            # the tree
-            bundle = []
-            wildcard = '%s=*' % (name,)
-            # For every tree in current forest.
-            for tree in partial_matches:
-                # If there is wildcard node on current level we take it.
-                bundle.append(tree.get(wildcard))
-                if name == 'role_id':
-                    # Roles are very special since a token has a list of them.
-                    # If the revocation event matches any one of them,
-                    # revoke the token.
-                    for role_id in token_data.get('roles', []):
-                        bundle.append(tree.get('role_id=%s' % role_id))
-                else:
-                    # For other fields we try to get any branch that concur
-                    # with any alternative field in the token.
-                    for alt_name in alternatives.get(name, [name]):
-                        bundle.append(
-                            tree.get('%s=%s' % (name, token_data[alt_name])))
-            # tree.get returns `None` if there is no match, so `bundle.append`
-            # adds a 'None' entry. This call remoes the `None` entries.
-            partial_matches = [x for x in bundle if x is not None]
-            if not partial_matches:
-                # If we end up with no branches to follow means that the token
-                # is definitely not in the revoke tree and all further
-                # iterations will be for nothing.
-                return False
-
-        # The last (leaf) level is checked in a special way because we verify
-        # issued_at field differently.
-        for leaf in partial_matches:
-            try:
-                if leaf['issued_before'] > token_data['issued_at']:
+        generation = self.generation
+        audit_id = token_data.get('audit_id')
+        if (audit_id is not None and
+                self._not_revoked.get(audit_id) == generation):
+            return False
+
+        issued_at = token_data['issued_at']
+        for shape, leaves in list(self.revoke_map.items()):
+            if len(shape) == 1:
+                candidates = _token_candidates(token_data, shape[0])
+                keys = ((value,) for value in candidates)
+            else:
+                keys = itertools.product(
+                    *[_token_candidates(token_data, name) for name in shape])
+            for key in keys:
+                issued_before = leaves.get(key)
+                if issued_before is not None and issued_before > issued_at:
                     return True
-            except KeyError:
-                pass
-        # If we made it out of the loop then no element in revocation tree
-        # corresponds to our token and it is good.
+
+        if audit_id is not None:
+            if len(self._not_revoked) >= _VERDICT_CACHE_SIZE:
+                self._not_revoked.clear()
+            self._not_revoked[audit_id] = generation
         return False
 
 
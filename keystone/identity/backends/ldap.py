@@ -12,18 +12,21 @@
 # License for the specific language governing permissions and limitations
 # under the License.
 from __future__ import absolute_import
+import os
+import time
 import uuid
 
 import ldap
 import ldap.filter
 from oslo_config import cfg
 from oslo_log import log
+import passlib.hash
 import six
 
 from keystone import clean
-from keystone.common import driver_hints
 from keystone.common import ldap as common_ldap
 from keystone.common import models
+from keystone.common import utils
 from keystone import exception
 from keystone.i18n import _
 from keystone import identity
@@ -33,6 +36,57 @@ CONF = cfg.CONF
 LOG = log.getLogger(__name__)
 
 
+class AuthCache(object):
+    """Remembers successful end user authentications for a short time.
+
+    Entries are keyed by the DN the user bound as, and only a salted,
+    deliberately slow hash of each password is kept. Counts of hits and
+    misses are kept in ``hits`` and ``misses``.
+
+    """
+
+    # Iterations of PBKDF2 used to hash the passwords.
+    HASH_ROUNDS = 10000
+
+    def __init__(self, ttl, size):
+        self.ttl = ttl
+        self._entries = utils.LRUCache(size)
+        self.hits = 0
+        self.misses = 0
+
+    def _hash(self, password, salt):
+        if isinstance(password, six.text_type):
+            password = password.encode('utf-8')
+        return passlib.hash.pbkdf2_sha256.encrypt(password, salt=salt,
+                                                  rounds=self.HASH_ROUNDS)
+
+    def check(self, dn, password):
+        """Return whether the DN recently bound with the password.
+
+        :returns: False if the authentication has to be checked against the
+                  LDAP server.
+
+        """
+        entry = self._entries.get(dn)
+        if entry is not None:
+            expires, salt, digest = entry
+            if (time.time() < expires and
+                    utils.auth_str_equal(self._hash(password, salt),
+                                         digest)):
+                self.hits += 1
+                return True
+        self.misses += 1
+        return False
+
+    def set(self, dn, password):
+        salt = os.urandom(16)
+        self._entries.set(dn, (time.time() + self.ttl, salt,
+                               self._hash(password, salt)))
+
+    def invalidate(self, dn):
+        self._entries.pop(dn)
+
+
 class Identity(identity.Driver):
     def __init__(self, conf=None):
         super(Identity, self).__init__()
@@ -40,6 +94,10 @@ class Identity(identity.Driver):
             conf = CONF
         self.user = UserApi(conf)
         self.group = GroupApi(conf)
+        self.auth_cache = None
+        if conf.ldap.auth_cache_enabled:
+            self.auth_cache = AuthCache(conf.ldap.auth_cache_time,
+                                        conf.ldap.auth_cache_size)
 
     def default_assignment_driver(self):
         return "keystone.assignment.backends.ldap.Assignment"
@@ -53,12 +111,17 @@ class Identity(identity.Driver):
     # Identity interface
 
     def authenticate(self, user_id, password):
+        if not user_id or not password:
+            raise AssertionError(_('Invalid user / password'))
         try:
             user_ref = self._get_user(user_id)
         except exception.UserNotFound:
             raise AssertionError(_('Invalid user / password'))
-        if not user_id or not password:
-            raise AssertionError(_('Invalid user / password'))
+        # NOTE: The user is always looked up, so that the cache is keyed by
+        # the DN the user currently has, and only the bind is skipped.
+        if (self.auth_cache is not None and
+                self.auth_cache.check(user_ref['dn'], password)):
+            return self.user.filter_attributes(user_ref)
         conn = None
         try:
             conn = self.user.get_connection(user_ref['dn'],
@@ -70,6 +133,8 @@ class Identity(identity.Driver):
         finally:
             if conn:
                 conn.unbind_s()
+        if self.auth_cache is not None:
+            self.auth_cache.set(user_ref['dn'], password)
         return self.user.filter_attributes(user_ref)
 
     def _get_user(self, user_id):
@@ -108,6 +173,9 @@ class Identity(identity.Driver):
             old_obj['enabled'] = not old_obj['enabled']
 
         self.user.update(user_id, user, old_obj)
+        if self.auth_cache is not None:
+            # The user may have had their password changed.
+            self.auth_cache.invalidate(old_obj['dn'])
         return self.user.get_filtered(user_id)
 
     def delete_user(self, user_id):
@@ -121,6 +189,8 @@ class Identity(identity.Driver):
         if hasattr(user, 'tenant_id'):
             self.project.remove_user(user.tenant_id, user_dn)
         self.user.delete(user_id)
+        if self.auth_cache is not None:
+            self.auth_cache.invalidate(user_dn)
 
     def create_group(self, group_id, group):
         self.group.check_allow_create()
@@ -164,27 +234,26 @@ class Identity(identity.Driver):
         return self.group.get_all_filtered(hints)
 
     def list_users_in_group(self, group_id, hints):
-        users = []
-        for user_dn in self.group.list_group_users(group_id):
-            user_id = self.user._dn_to_id(user_dn)
+        user_ids = [self.user._dn_to_id(user_dn)
+                    for user_dn in self.group.list_group_users(group_id)]
+        users = dict((user['id'].lower(), user)
+                     for user in self.user.get_all_filtered_by_ids(user_ids))
+        refs = []
+        for user_id in user_ids:
             try:
-                users.append(self.user.get_filtered(user_id))
-            except exception.UserNotFound:
-                LOG.debug(("Group member '%(user_dn)s' not found in"
+                refs.append(users[user_id.lower()])
+            except KeyError:
+                LOG.debug(("Group member '%(user_id)s' not found in"
                            " '%(group_id)s'. The user should be removed"
                            " from the group. The user will be ignored."),
-                          dict(user_dn=user_dn, group_id=group_id))
-        return users
+                          dict(user_id=user_id, group_id=group_id))
+        return refs
 
     def check_user_in_group(self, user_id, group_id):
-        user_refs = self.list_users_in_group(group_id, driver_hints.Hints())
-        for x in user_refs:
-            if x['id'] == user_id:
-                break
-        else:
-            # Try to fetch the user to see if it even exists.  This
-            # will raise a more accurate exception.
-            self.get_user(user_id)
+        # Fetch the user first, to raise a more accurate exception if it
+        # doesn't even exist.
+        user_ref = self._get_user(user_id)
+        if not self.group.has_user(user_ref['dn'], group_id):
             raise exception.NotFound(_("User '%(user_id)s' not found in"
                                        " group '%(group_id)s'") %
                                      {'user_id': user_id,
@@ -268,6 +337,10 @@ class UserApi(common_ldap.EnabledEmuMixIn, common_ldap.BaseLdap):
         query = self.filter_query(hints)
         return [self.filter_attributes(user) for user in self.get_all(query)]
 
+    def get_all_filtered_by_ids(self, user_ids):
+        return [self.filter_attributes(user)
+                for user in self.get_by_ids(user_ids)]
+
     def filter_attributes(self, user):
         return identity.filter_user(common_ldap.filter_entity(user))
 
@@ -348,6 +421,24 @@ class GroupApi(common_ldap.BaseLdap):
         except ldap.NO_SUCH_ATTRIBUTE:
             raise exception.UserNotFound(user_id=user_id)
 
+    def has_user(self, user_dn, group_id):
+        """Return True if the user is a member of the group.
+
+        The membership is checked by the directory server, with a single
+        search for the group entry holding the member, so the members of
+        large groups aren't read back.
+
+        """
+        user_dn_esc = ldap.filter.escape_filter_chars(user_dn)
+        query = u'(%s=%s)%s' % (self.member_attribute,
+                                user_dn_esc,
+                                self.ldap_filter or '')
+        if self._ldap_get(group_id, query) is not None:
+            return True
+        # Raise GroupNotFound if the group doesn't exist at all.
+        self.get(group_id)
+        return False
+
     def list_user_groups(self, user_dn):
         """Return a list of groups for which the user is a member."""
 
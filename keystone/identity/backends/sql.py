@@ -75,6 +75,8 @@ class Identity(identity.Driver):
     # config parameter to enable sql to be used as a domain-specific driver.
     def __init__(self, conf=None):
         super(Identity, self).__init__()
+        self._password_cache = utils.VerifiedPasswordCache(
+            CONF.identity.password_cache_size)
 
     def default_assignment_driver(self):
         return "keystone.assignment.backends.sql.Assignment"
@@ -92,7 +94,8 @@ class Identity(identity.Driver):
         https://blueprints.launchpad.net/keystone/+spec/sql-identiy-pam
 
         """
-        return utils.check_password(password, user_ref.password)
+        return self._password_cache.check_password(
+            user_ref.id, password, user_ref.password)
 
     # Identity interface
     def authenticate(self, user_id, password):
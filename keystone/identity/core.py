@@ -29,6 +29,7 @@ from keystone.common import cache
 from keystone.common import dependency
 from keystone.common import driver_hints
 from keystone.common import manager
+from keystone.common import utils
 from keystone import config
 from keystone import exception
 from keystone.i18n import _, _LW
@@ -495,8 +496,8 @@ class Manager(manager.Manager):
             return self._set_domain_id_and_mapping_for_single_ref(
                 ref, domain_id, driver, entity_type, conf)
         elif isinstance(ref, list):
-            return [self._set_domain_id_and_mapping(
-                    x, domain_id, driver, entity_type) for x in ref]
+            return self._set_domain_id_and_mapping_for_list(
+                ref, domain_id, driver, entity_type, conf)
         else:
             raise ValueError(_('Expected dict or list: %s') % type(ref))
 
@@ -532,6 +533,40 @@ class Manager(manager.Manager):
                           ref['id'])
         return ref
 
+    def _set_domain_id_and_mapping_for_list(self, ref_list, domain_id,
+                                            driver, entity_type, conf):
+        # The mappings for the whole list are looked up, and any missing ones
+        # created, together rather than one entity at a time.
+        ref_list = [ref.copy() for ref in ref_list]
+        for ref in ref_list:
+            self._insert_domain_id_if_needed(ref, driver, domain_id, conf)
+
+        if not self._is_mapping_needed(driver):
+            return ref_list
+
+        local_entities = [{'domain_id': ref['domain_id'],
+                           'local_id': ref['id'],
+                           'entity_type': entity_type}
+                          for ref in ref_list]
+        public_ids = self.id_mapping_api.get_public_ids(local_entities)
+        unmapped = [i for i, public_id in enumerate(public_ids)
+                    if not public_id]
+        if unmapped:
+            # If the driver generates UUIDs then pass the local UUIDs in as
+            # the public IDs to use.
+            new_public_ids = None
+            if driver.generates_uuids():
+                new_public_ids = [ref_list[i]['id'] for i in unmapped]
+            new_public_ids = self.id_mapping_api.create_id_mappings(
+                [local_entities[i] for i in unmapped], new_public_ids)
+            for i, public_id in zip(unmapped, new_public_ids):
+                public_ids[i] = public_id
+            LOG.debug('Created %d new mappings to public IDs', len(unmapped))
+
+        for ref, public_id in zip(ref_list, public_ids):
+            ref['id'] = public_id
+        return ref_list
+
     def _insert_domain_id_if_needed(self, ref, driver, domain_id, conf):
         """Inserts the domain ID into the ref, if required.
 
@@ -935,6 +970,7 @@ class Manager(manager.Manager):
             user_entity_id, user_driver, group_entity_id, group_driver)
 
         group_driver.add_user_to_group(user_entity_id, group_entity_id)
+        self.assignment_api.group_membership_changed()
 
     @domains_configured
     @exception_translated('group')
@@ -954,6 +990,7 @@ class Manager(manager.Manager):
             user_entity_id, user_driver, group_entity_id, group_driver)
 
         group_driver.remove_user_from_group(user_entity_id, group_entity_id)
+        self.assignment_api.group_membership_changed()
         self.emit_invalidate_user_token_persistence(user_id)
 
     @notifications.internal(notifications.INVALIDATE_USER_TOKEN_PERSISTENCE)
@@ -1268,6 +1305,60 @@ class MappingManager(manager.Manager):
 
     def __init__(self):
         super(MappingManager, self).__init__(CONF.identity_mapping.driver)
+        # Local entities to their public IDs. Mappings never change once
+        # created, so there is no need to expire them, only to forget them
+        # when they are deleted.
+        self._public_ids = utils.LRUCache(CONF.identity_mapping.cache_size)
+
+    @staticmethod
+    def _cache_key(local_entity):
+        return (local_entity['domain_id'], local_entity['local_id'],
+                local_entity['entity_type'])
+
+    def get_public_id(self, local_entity):
+        key = self._cache_key(local_entity)
+        public_id = self._public_ids.get(key)
+        if public_id is None:
+            public_id = self.driver.get_public_id(local_entity)
+            if public_id is not None:
+                self._public_ids.set(key, public_id)
+        return public_id
+
+    def get_public_ids(self, local_entities):
+        public_ids = [self._public_ids.get(self._cache_key(local_entity))
+                      for local_entity in local_entities]
+        misses = [i for i, public_id in enumerate(public_ids)
+                  if public_id is None]
+        if misses:
+            found = self.driver.get_public_ids(
+                [local_entities[i] for i in misses])
+            for i, public_id in zip(misses, found):
+                if public_id is not None:
+                    self._public_ids.set(
+                        self._cache_key(local_entities[i]), public_id)
+                public_ids[i] = public_id
+        return public_ids
+
+    def create_id_mapping(self, local_entity, public_id=None):
+        public_id = self.driver.create_id_mapping(local_entity, public_id)
+        self._public_ids.set(self._cache_key(local_entity), public_id)
+        return public_id
+
+    def create_id_mappings(self, local_entities, public_ids=None):
+        public_ids = self.driver.create_id_mappings(local_entities, public_ids)
+        for local_entity, public_id in zip(local_entities, public_ids):
+            self._public_ids.set(self._cache_key(local_entity), public_id)
+        return public_ids
+
+    def delete_id_mapping(self, public_id):
+        self.driver.delete_id_mapping(public_id)
+        # Deletions are rare, so rather than keep a reverse index just start
+        # again.
+        self._public_ids.clear()
+
+    def purge_mappings(self, purge_filter):
+        self.driver.purge_mappings(purge_filter)
+        self._public_ids.clear()
 
 
 @six.add_metaclass(abc.ABCMeta)
@@ -1285,6 +1376,18 @@ class MappingDriver(object):
         """
         raise exception.NotImplemented()  # pragma: no cover
 
+    def get_public_ids(self, local_entities):
+        """Returns the public IDs for a list of local entities.
+
+        :param list local_entities: Each containing the entity domain, local
+                                    ID and type ('user' or 'group').
+        :returns: list of public IDs, in the same order as the entities, with
+                  None for any entity that has no mapping.
+
+        """
+        return [self.get_public_id(local_entity)
+                for local_entity in local_entities]
+
     @abc.abstractmethod
     def get_id_mapping(self, public_id):
         """Returns the local mapping.
@@ -1309,6 +1412,23 @@ class MappingDriver(object):
         """
         raise exception.NotImplemented()  # pragma: no cover
 
+    def create_id_mappings(self, local_entities, public_ids=None):
+        """Create and store mappings for a list of local entities.
+
+        :param list local_entities: Each containing the entity domain, local
+                                    ID and type ('user' or 'group').
+        :param public_ids: If specified, a list of the public IDs to use, in
+                           the same order as the entities. If this is not
+                           specified, public IDs will be generated.
+        :returns: list of public IDs, in the same order as the entities.
+
+        """
+        if public_ids is None:
+            public_ids = [None] * len(local_entities)
+        return [self.create_id_mapping(local_entity, public_id)
+                for local_entity, public_id in zip(local_entities,
+                                                   public_ids)]
+
     @abc.abstractmethod
     def delete_id_mapping(self, public_id):
         """Deletes an entry for the given public_id.
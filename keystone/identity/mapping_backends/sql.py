@@ -12,12 +12,18 @@
 # License for the specific language governing permissions and limitations
 # under the License.
 
+import six
+
 from keystone.common import dependency
 from keystone.common import sql
 from keystone import identity
 from keystone.identity.mapping_backends import mapping as identity_mapping
 
 
+# Keep IN clauses well below the bound parameter limits of the backends.
+_LOCAL_ID_BATCH_SIZE = 500
+
+
 class IDMapping(sql.ModelBase, sql.ModelDictMixin):
     __tablename__ = 'id_mapping'
     public_id = sql.Column(sql.String(64), primary_key=True)
@@ -57,6 +63,33 @@ class Mapping(identity.MappingDriver):
         except sql.NotFound:
             return None
 
+    def get_public_ids(self, local_entities):
+        # Look the entities up a domain and entity type at a time, since
+        # those are almost always the same for the whole list.
+        local_ids = {}
+        for local_entity in local_entities:
+            local_ids.setdefault(
+                (local_entity['domain_id'], local_entity['entity_type']),
+                set()).add(local_entity['local_id'])
+
+        public_ids = {}
+        session = sql.get_session()
+        for (domain_id, entity_type), ids in six.iteritems(local_ids):
+            ids = list(ids)
+            for i in range(0, len(ids), _LOCAL_ID_BATCH_SIZE):
+                query = session.query(IDMapping.local_id, IDMapping.public_id)
+                query = query.filter_by(domain_id=domain_id)
+                query = query.filter_by(entity_type=entity_type)
+                query = query.filter(IDMapping.local_id.in_(
+                    ids[i:i + _LOCAL_ID_BATCH_SIZE]))
+                for local_id, public_id in query:
+                    public_ids[domain_id, local_id, entity_type] = public_id
+
+        return [public_ids.get((local_entity['domain_id'],
+                                local_entity['local_id'],
+                                local_entity['entity_type']))
+                for local_entity in local_entities]
+
     def get_id_mapping(self, public_id):
         session = sql.get_session()
         mapping_ref = session.query(IDMapping).get(public_id)
@@ -73,6 +106,46 @@ class Mapping(identity.MappingDriver):
             session.add(mapping_ref)
         return public_id
 
+    def create_id_mappings(self, local_entities, public_ids=None):
+        if public_ids is None:
+            public_ids = [None] * len(local_entities)
+        rows = []
+        for local_entity, public_id in zip(local_entities, public_ids):
+            row = local_entity.copy()
+            if public_id is None:
+                public_id = self.id_generator_api.generate_public_ID(row)
+            row['public_id'] = public_id
+            rows.append(row)
+        if rows:
+            try:
+                self._insert_id_mappings(rows)
+            except sql.DBDuplicateEntry:
+                # Another process mapped some of these entities since the
+                # caller looked them up, so use its mappings and create only
+                # the ones that are still missing.
+                existing_ids = self.get_public_ids(local_entities)
+                missing = {}
+                for row, public_id in zip(rows, existing_ids):
+                    if public_id is None:
+                        missing.setdefault(
+                            (row['domain_id'], row['local_id'],
+                             row['entity_type']), row)
+                    else:
+                        row['public_id'] = public_id
+                self._insert_id_mappings(list(missing.values()))
+                for row in rows:
+                    key = (row['domain_id'], row['local_id'],
+                           row['entity_type'])
+                    if key in missing:
+                        row['public_id'] = missing[key]['public_id']
+        return [row['public_id'] for row in rows]
+
+    def _insert_id_mappings(self, rows):
+        if rows:
+            with sql.transaction() as session:
+                # A single multi-row insert, rather than one per mapping.
+                session.execute(IDMapping.__table__.insert(), rows)
+
     def delete_id_mapping(self, public_id):
         with sql.transaction() as session:
             try:
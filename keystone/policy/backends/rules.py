@@ -15,10 +15,14 @@
 
 """Policy engine for keystone"""
 
+import re
+
 from oslo_config import cfg
 from oslo_log import log
 from oslo_policy import policy as common_policy
+import six
 
+from keystone.common import utils
 from keystone import exception
 from keystone import policy
 
@@ -29,6 +33,11 @@ LOG = log.getLogger(__name__)
 
 _ENFORCER = None
 
+# Matches the target substitutions in a check, e.g. %(target.user.id)s.
+_TARGET_KEY_RE = re.compile(r'%\(([^)]+)\)')
+
+_MISSING = object()
+
 
 def reset():
     global _ENFORCER
@@ -69,12 +78,141 @@ def enforce(credentials, action, target, do_raise=True):
     return _ENFORCER.enforce(action, target, credentials, **extra)
 
 
+def _rule_dependencies(rule, rules, seen):
+    """Return the credential and target keys a compiled rule refers to.
+
+    Returns a pair of sets, or None if the outcome of the rule may depend on
+    anything else (an HTTP check, or a check registered by a third party) and
+    so must not be remembered.
+
+    """
+    if hasattr(rule, 'rules'):
+        # AndCheck and OrCheck
+        creds_keys, target_keys = set(), set()
+        for sub_rule in rule.rules:
+            deps = _rule_dependencies(sub_rule, rules, seen)
+            if deps is None:
+                return None
+            creds_keys.update(deps[0])
+            target_keys.update(deps[1])
+        return creds_keys, target_keys
+    if hasattr(rule, 'rule'):
+        # NotCheck
+        return _rule_dependencies(rule.rule, rules, seen)
+
+    kind = type(rule).__name__
+    if kind in ('TrueCheck', 'FalseCheck'):
+        return set(), set()
+    if kind == 'RuleCheck':
+        if rule.match in seen:
+            return set(), set()
+        seen.add(rule.match)
+        try:
+            sub_rule = rules[rule.match]
+        except KeyError:
+            return set(), set()
+        return _rule_dependencies(sub_rule, rules, seen)
+
+    target_keys = set(_TARGET_KEY_RE.findall(rule.match))
+    if kind == 'RoleCheck':
+        return set(['roles']), target_keys
+    if kind == 'GenericCheck':
+        return set([rule.kind.split('.')[0]]), target_keys
+    return None
+
+
+def _freeze(value):
+    """Return a hashable equivalent of a credential or target value."""
+    if isinstance(value, dict):
+        return tuple(sorted((k, _freeze(v)) for k, v in six.iteritems(value)))
+    if isinstance(value, (list, tuple, set)):
+        return tuple(_freeze(v) for v in value)
+    return value
+
+
 class Policy(policy.Driver):
+
+    def __init__(self):
+        super(Policy, self).__init__()
+        self._decisions = utils.LRUCache(CONF.policy.decision_cache_size)
+        self._dependencies = {}
+        self._rules = None
+        # The number of enforce calls answered from remembered decisions.
+        self.enforcements_avoided = 0
+
+    def _decision_key(self, credentials, action, target):
+        """Return the key a decision is remembered under, or None.
+
+        Only the credential and target values that the action's rule refers
+        to are part of the key, so requests which differ in anything else
+        share a decision.
+
+        """
+        init()
+        # Reloads the rules if the policy file has changed.
+        _ENFORCER.load_rules()
+        if _ENFORCER.rules is not self._rules:
+            self._decisions.clear()
+            self._dependencies = {}
+            self._rules = _ENFORCER.rules
+
+        try:
+            deps = self._dependencies[action]
+        except KeyError:
+            try:
+                rule = self._rules[action]
+            except KeyError:
+                deps = (set(), set())
+            else:
+                deps = _rule_dependencies(rule, self._rules, set([action]))
+            if deps is not None:
+                deps = (sorted(deps[0]), sorted(deps[1]))
+            self._dependencies[action] = deps
+        if deps is None:
+            return None
+
+        creds_keys, target_keys = deps
+        return (action,
+                tuple(_freeze(credentials.get(k, _MISSING))
+                      for k in creds_keys),
+                tuple(_freeze(target.get(k, _MISSING))
+                      for k in target_keys))
+
+    def _check(self, credentials, action, target):
+        """Check the action against the rules loaded by _decision_key().
+
+        This is what the enforcer does, without checking the policy file for
+        changes a second time.
+
+        """
+        try:
+            rule = self._rules[action]
+        except KeyError:
+            # If the rule doesn't exist, fail closed
+            return False
+        return bool(rule(target, credentials, _ENFORCER))
+
     def enforce(self, credentials, action, target):
-        LOG.debug('enforce %(action)s: %(credentials)s', {
-            'action': action,
-            'credentials': credentials})
-        enforce(credentials, action, target)
+        if self._decisions.maxsize <= 0:
+            LOG.debug('enforce %(action)s: %(credentials)s', {
+                'action': action,
+                'credentials': credentials})
+            enforce(credentials, action, target)
+            return
+
+        key = self._decision_key(credentials, action, target)
+        allowed = self._decisions.get(key) if key is not None else None
+        if allowed is not None:
+            self.enforcements_avoided += 1
+        else:
+            LOG.debug('enforce %(action)s: %(credentials)s', {
+                'action': action,
+                'credentials': credentials})
+            allowed = self._check(credentials, action, target)
+            if key is not None:
+                self._decisions.set(key, allowed)
+        if not allowed:
+            raise exception.ForbiddenAction(action=action)
 
     def create_policy(self, policy_id, policy):
         raise exception.NotImplemented()
@@ -10,8 +10,12 @@
 # License for the specific language governing permissions and limitations
 # under the License.
 
+import functools
+
 from oslo_config import cfg
 from oslo_log import log
+import six
+import sqlalchemy
 
 from keystone import clean
 from keystone.common import sql
@@ -24,6 +28,23 @@ CONF = cfg.CONF
 LOG = log.getLogger(__name__)
 
 
+def _supports_recursive_queries(session):
+    """Whether the database can walk the project hierarchy in one query."""
+    dialect = session.get_bind().dialect
+    if dialect.name == 'postgresql':
+        return True
+    if dialect.name == 'sqlite':
+        # NOTE: The sqlite3 module of Python 2 leaves cursor.description
+        # unset for a WITH query that returns no rows, which SQLAlchemy then
+        # reports as a result that is closed.
+        return (not six.PY2 and
+                dialect.dbapi.sqlite_version_info >= (3, 8, 3))
+    if dialect.name == 'mysql':
+        version = dialect.server_version_info or ()
+        return 'MariaDB' not in version and version >= (8, 0)
+    return False
+
+
 class Resource(keystone_resource.Driver):
 
     def default_assignment_driver(self):
@@ -89,12 +110,54 @@ class Resource(keystone_resource.Driver):
         project_refs = query.all()
         return [project_ref.to_dict() for project_ref in project_refs]
 
+    def _list_ancestry(self, session, project_id):
+        """Returns the project and all of its parents, in one query."""
+        ancestry = (session.query(Project.id, Project.parent_id).
+                    filter(Project.id == project_id).
+                    cte(name='ancestry', recursive=True))
+        ancestry_alias = sqlalchemy.orm.aliased(ancestry, name='a')
+        parent = sqlalchemy.orm.aliased(Project, name='parent')
+        # NOTE: UNION rather than UNION ALL, so that the query still ends if
+        # the hierarchy contains a cycle; that is reported by the caller.
+        ancestry = ancestry.union(
+            session.query(parent.id, parent.parent_id).
+            filter(parent.id == ancestry_alias.c.parent_id))
+        query = session.query(Project).join(
+            ancestry, Project.id == ancestry.c.id)
+        return [project_ref.to_dict() for project_ref in query.all()]
+
+    def _list_descendants(self, session, project_id):
+        """Returns all the projects below the project, in one query."""
+        subtree = (session.query(Project.id, Project.parent_id).
+                   filter(Project.parent_id == project_id).
+                   cte(name='subtree', recursive=True))
+        subtree_alias = sqlalchemy.orm.aliased(subtree, name='s')
+        child = sqlalchemy.orm.aliased(Project, name='child')
+        subtree = subtree.union(
+            session.query(child.id, child.parent_id).
+            filter(child.parent_id == subtree_alias.c.id))
+        query = session.query(Project).join(
+            subtree, Project.id == subtree.c.id)
+        return [project_ref.to_dict() for project_ref in query.all()]
+
     def list_projects_in_subtree(self, project_id):
         with sql.transaction() as session:
             project = self._get_project(session, project_id).to_dict()
-            children = self._get_children(session, [project['id']])
+            if _supports_recursive_queries(session):
+                children_by_parent = {}
+                for ref in self._list_descendants(session, project_id):
+                    children_by_parent.setdefault(
+                        ref['parent_id'], []).append(ref)
+
+                def get_children(project_ids):
+                    return [ref for parent_id in project_ids
+                            for ref in children_by_parent.get(parent_id, [])]
+            else:
+                get_children = functools.partial(self._get_children, session)
+
+            children = get_children([project['id']])
             subtree = []
-            examined = set(project['id'])
+            examined = set([project['id']])
             while children:
                 children_ids = set()
                 for ref in children:
@@ -106,14 +169,27 @@ class Resource(keystone_resource.Driver):
                         return
                     children_ids.add(ref['id'])
 
-                examined.union(children_ids)
+                examined.update(children_ids)
                 subtree += children
-                children = self._get_children(session, children_ids)
+                children = get_children(children_ids)
             return subtree
 
     def list_project_parents(self, project_id):
         with sql.transaction() as session:
-            project = self._get_project(session, project_id).to_dict()
+            if _supports_recursive_queries(session):
+                ancestry = dict((ref['id'], ref) for ref in
+                                self._list_ancestry(session, project_id))
+
+                def get_project(project_id):
+                    try:
+                        return ancestry[project_id]
+                    except KeyError:
+                        raise exception.ProjectNotFound(project_id=project_id)
+            else:
+                def get_project(project_id):
+                    return self._get_project(session, project_id).to_dict()
+
+            project = get_project(project_id)
             parents = []
             examined = set()
             while project.get('parent_id') is not None:
@@ -125,8 +201,7 @@ class Resource(keystone_resource.Driver):
                     return
 
                 examined.add(project['id'])
-                parent_project = self._get_project(
-                    session, project['parent_id']).to_dict()
+                parent_project = get_project(project['parent_id'])
                 parents.append(parent_project)
                 project = parent_project
             return parents
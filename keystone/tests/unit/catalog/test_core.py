@@ -86,3 +86,44 @@ class FormatUrlTests(unit.BaseTestCase):
                   'user_id': 'B'}
         self.assertIsNone(core.format_url(url_template, values,
                           silent_keyerror_failures=['tenant_id']))
+
+
+class URLTemplateTests(unit.BaseTestCase):
+
+    def test_successful_formatting(self):
+        template = core.URLTemplate('http://$(public_bind_host)s:'
+                                    '$(admin_port)d/$(tenant_id)s/$(user_id)s')
+        values = {'public_bind_host': 'server', 'admin_port': 9090,
+                  'tenant_id': 'A', 'user_id': 'B'}
+        self.assertEqual('http://server:9090/A/B', template.format(values))
+
+        values.update(tenant_id='C', user_id='D')
+        self.assertEqual('http://server:9090/C/D', template.format(values))
+
+    def test_matches_format_url(self):
+        values = {'public_bind_host': 'server', 'public_port': 9090,
+                  'user_id': 'B', 'admin_token': 'C'}
+        for url in ['http://$(public_bind_host)s/$(public_port)d',
+                    'http://$(public_bind_host)s/$(tenant_id)s',
+                    'http://$(public_bind_host)s/$(admin_token)s',
+                    'http://$(public_bind_host)d',
+                    'http://$(public_bind_host)',
+                    'http://server/100%%/$(user_id)s',
+                    '',
+                    None]:
+            try:
+                expected = core.format_url(url, values)
+            except exception.MalformedEndpoint:
+                self.assertRaises(exception.MalformedEndpoint,
+                                  core.URLTemplate(url).format, values)
+            else:
+                self.assertEqual(expected,
+                                 core.URLTemplate(url).format(values))
+
+    def test_substitution_with_allowed_keyerror(self):
+        template = core.URLTemplate('http://$(public_bind_host)s:'
+                                    '$(admin_port)d/$(tenant_id)s/$(user_id)s')
+        values = {'public_bind_host': 'server', 'admin_port': 9090,
+                  'user_id': 'B'}
+        self.assertIsNone(template.format(
+            values, silent_keyerror_failures=['tenant_id']))
@@ -0,0 +1,113 @@
+# -*- coding: utf-8 -*-
+# Licensed under the Apache License, Version 2.0 (the "License"); you may
+# not use this file except in compliance with the License. You may obtain
+# a copy of the License at
+#
+#      http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS, WITHOUT
+# WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the
+# License for the specific language governing permissions and limitations
+# under the License.
+
+import os
+import shutil
+
+import fixtures
+from keystoneclient.common import cms
+import mock
+from oslo_config import cfg
+
+from keystone.common import cmsutils
+from keystone.common import signing
+from keystone.tests import unit as tests
+
+
+CONF = cfg.CONF
+
+
+class CMSUtilsTestCase(tests.TestCase):
+
+    TEXTS = ['{"access": {"token": {"id": "placeholder"}}}',
+             u'{"name": "é中"}',
+             'line one\nline two\r\n\r\nlast\r',
+             'x' * 5000]
+
+    def setUp(self):
+        super(CMSUtilsTestCase, self).setUp()
+        self.addCleanup(cmsutils._signers.reset)
+
+    def test_sign_text_matches_openssl(self):
+        for md in ('sha1', 'sha256', 'sha512'):
+            for text in self.TEXTS:
+                self.assertEqual(
+                    cms.cms_sign_text(text, CONF.signing.certfile,
+                                      CONF.signing.keyfile,
+                                      message_digest=md),
+                    cmsutils.cms_sign_text(text, CONF.signing.certfile,
+                                           CONF.signing.keyfile,
+                                           message_digest=md))
+
+    def test_sign_token_matches_openssl(self):
+        for text in self.TEXTS:
+            self.assertEqual(
+                cms.cms_sign_token(text, CONF.signing.certfile,
+                                   CONF.signing.keyfile),
+                cmsutils.cms_sign_token(text, CONF.signing.certfile,
+                                        CONF.signing.keyfile))
+            self.assertEqual(
+                cms.pkiz_sign(text, CONF.signing.certfile,
+                              CONF.signing.keyfile),
+                cmsutils.pkiz_sign(text, CONF.signing.certfile,
+                                   CONF.signing.keyfile))
+
+    def test_signed_token_verifies(self):
+        text = self.TEXTS[0]
+        token = cmsutils.cms_sign_token(text, CONF.signing.certfile,
+                                        CONF.signing.keyfile)
+        verified = cms.verify_token(token, CONF.signing.certfile,
+                                    CONF.signing.ca_certs)
+        self.assertEqual(text, verified.decode('utf-8'))
+
+    def test_signer_is_loaded_once(self):
+        with mock.patch.object(signing.SigningKey, 'from_files',
+                               wraps=signing.SigningKey.from_files) as load:
+            for text in self.TEXTS:
+                cmsutils.cms_sign_token(text, CONF.signing.certfile,
+                                        CONF.signing.keyfile)
+        self.assertEqual(1, load.call_count)
+
+    def test_signer_is_reloaded_when_files_change(self):
+        certfile = os.path.join(self.useFixture(fixtures.TempDir()).path,
+                                'signing_cert.pem')
+        shutil.copy(CONF.signing.certfile, certfile)
+        with mock.patch.object(signing.SigningKey, 'from_files',
+                               wraps=signing.SigningKey.from_files) as load:
+            cmsutils.cms_sign_token(self.TEXTS[0], certfile,
+                                    CONF.signing.keyfile)
+            os.remove(certfile)
+            shutil.copy(CONF.signing.certfile, certfile)
+            os.utime(certfile, (0, 0))
+            cmsutils.cms_sign_token(self.TEXTS[0], certfile,
+                                    CONF.signing.keyfile)
+        self.assertEqual(2, load.call_count)
+
+    def test_unusable_files_are_not_reloaded(self):
+        with mock.patch.object(signing.LOG, 'warning') as warning:
+            with mock.patch.object(cms, 'cms_sign_text'):
+                for text in self.TEXTS:
+                    cmsutils.cms_sign_text(text, CONF.signing.certfile,
+                                           CONF.signing.certfile)
+        self.assertEqual(1, warning.call_count)
+
+    def test_falls_back_to_openssl(self):
+        with mock.patch.object(cms, 'cms_sign_text') as sign:
+            cmsutils.cms_sign_text(self.TEXTS[0], CONF.signing.certfile,
+                                   CONF.signing.certfile)
+            self.assertEqual(1, sign.call_count)
+
+            self.config_fixture.config(group='signing', sign_in_process=False)
+            cmsutils.cms_sign_text(self.TEXTS[0], CONF.signing.certfile,
+                                   CONF.signing.keyfile)
+            self.assertEqual(2, sign.call_count)
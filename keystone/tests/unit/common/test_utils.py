@@ -11,11 +11,15 @@
 # under the License.
 
 import datetime
+import os
+import time
 import uuid
 
+import mock
 from oslo_config import cfg
 from oslo_config import fixture as config_fixture
 from oslo_serialization import jsonutils
+import passlib.hash
 
 from keystone.common import utils as common_utils
 from keystone import exception
@@ -154,6 +158,91 @@ class UtilsTestCase(tests.BaseTestCase):
         self.assertEqual(expected_json, json)
 
 
+def _sleep_in_child(parent_pid):
+    if os.getpid() != parent_pid:
+        time.sleep(60)
+    return parent_pid
+
+
+class CryptPoolTests(tests.BaseTestCase):
+
+    def setUp(self):
+        super(CryptPoolTests, self).setUp()
+        self.config_fixture = self.useFixture(config_fixture.Config(CONF))
+
+    def test_run(self):
+        pool = common_utils.CryptPool(1)
+        self.addCleanup(pool.close)
+        self.assertEqual(1024, pool.run(pow, 2, 10))
+        self.assertRaises(ZeroDivisionError, pool.run, divmod, 1, 0)
+
+    def test_worker_that_times_out_is_restarted(self):
+        self.config_fixture.config(crypt_pool_timeout=1)
+        pool = common_utils.CryptPool(1)
+        self.addCleanup(pool.close)
+        pid = pool._idle.queue[0][1].pid
+        self.assertEqual(os.getpid(), pool.run(_sleep_in_child, os.getpid()))
+        self.assertNotEqual(pid, pool._idle.queue[0][1].pid)
+        self.assertEqual(1024, pool.run(pow, 2, 10))
+
+    def test_hash_and_check_password_in_pool(self):
+        self.config_fixture.config(crypt_pool_size=1)
+        self.addCleanup(setattr, common_utils, '_crypt_pool', None)
+        password = uuid.uuid4().hex
+        hashed = common_utils.hash_password(password)
+        self.addCleanup(common_utils._crypt_pool.close)
+        self.assertTrue(common_utils.check_password(password, hashed))
+        self.assertFalse(common_utils.check_password('wrong', hashed))
+
+
+class VerifiedPasswordCacheTests(tests.BaseTestCase):
+
+    def test_verified_password_is_remembered(self):
+        cache = common_utils.VerifiedPasswordCache(10)
+        password = uuid.uuid4().hex
+        hashed = common_utils.hash_password(password)
+        crypt = passlib.hash.sha512_crypt
+
+        with mock.patch.object(crypt, 'verify',
+                               wraps=crypt.verify) as mock_verify:
+            self.assertTrue(cache.check_password('a', password, hashed))
+            self.assertTrue(cache.check_password('a', password, hashed))
+            self.assertEqual(1, mock_verify.call_count)
+
+            # Other passwords, users and hashes are still checked in full.
+            self.assertFalse(cache.check_password('a', 'wrong', hashed))
+            self.assertTrue(cache.check_password('b', password, hashed))
+            new_hashed = common_utils.hash_password(password)
+            self.assertTrue(cache.check_password('a', password, new_hashed))
+            self.assertEqual(4, mock_verify.call_count)
+
+    def test_missing_password(self):
+        cache = common_utils.VerifiedPasswordCache(10)
+        hashed = common_utils.hash_password(uuid.uuid4().hex)
+        self.assertFalse(cache.check_password('a', None, hashed))
+        self.assertFalse(cache.check_password('a', uuid.uuid4().hex, None))
+
+
+class LRUCacheTests(tests.BaseTestCase):
+
+    def test_least_recently_used_is_discarded(self):
+        cache = common_utils.LRUCache(2)
+        cache.set('a', 1)
+        cache.set('b', 2)
+        self.assertEqual(1, cache.get('a'))
+        cache.set('c', 3)
+        self.assertEqual(2, len(cache))
+        self.assertIsNone(cache.get('b'))
+        self.assertEqual(1, cache.get('a'))
+        self.assertEqual(3, cache.get('c'))
+
+    def test_zero_size_holds_nothing(self):
+        cache = common_utils.LRUCache(0)
+        cache.set('a', 1)
+        self.assertIsNone(cache.get('a'))
+        self.assertEqual(0, len(cache))
+
+
 class ServiceHelperTests(tests.BaseTestCase):
 
     @service.fail_gracefully
@@ -14,6 +14,7 @@
 
 import copy
 import datetime
+import functools
 import hashlib
 import uuid
 
@@ -32,6 +33,7 @@ from keystone.tests.unit import default_fixtures
 from keystone.tests.unit import filtering
 from keystone.tests.unit import utils as test_utils
 from keystone.token import provider
+from keystone.trust import core as trust_core
 
 
 CONF = cfg.CONF
@@ -590,6 +592,73 @@ class IdentityTests(object):
              'role_id': 'admin'},
             assignment_list)
 
+    def test_list_role_assignments_filtered(self):
+        new_domain = self._get_domain_fixture()
+        new_user = {'name': uuid.uuid4().hex, 'password': uuid.uuid4().hex,
+                    'enabled': True, 'domain_id': new_domain['id']}
+        new_user = self.identity_api.create_user(new_user)
+        new_group = {'domain_id': new_domain['id'], 'name': uuid.uuid4().hex}
+        new_group = self.identity_api.create_group(new_group)
+        new_project = {'id': uuid.uuid4().hex,
+                       'name': uuid.uuid4().hex,
+                       'domain_id': new_domain['id']}
+        self.resource_api.create_project(new_project['id'], new_project)
+
+        self.assignment_api.create_grant(user_id=new_user['id'],
+                                         domain_id=new_domain['id'],
+                                         role_id='member')
+        self.assignment_api.create_grant(user_id=new_user['id'],
+                                         project_id=new_project['id'],
+                                         role_id='other')
+        self.assignment_api.create_grant(group_id=new_group['id'],
+                                         domain_id=new_domain['id'],
+                                         role_id='admin',
+                                         inherited_to_projects=True)
+        self.assignment_api.create_grant(group_id=new_group['id'],
+                                         project_id=new_project['id'],
+                                         role_id='admin')
+
+        user_domain = {'user_id': new_user['id'],
+                       'domain_id': new_domain['id'],
+                       'role_id': 'member'}
+        user_project = {'user_id': new_user['id'],
+                        'project_id': new_project['id'],
+                        'role_id': 'other'}
+        group_domain = {'group_id': new_group['id'],
+                        'domain_id': new_domain['id'],
+                        'role_id': 'admin',
+                        'inherited_to_projects': 'projects'}
+        group_project = {'group_id': new_group['id'],
+                         'project_id': new_project['id'],
+                         'role_id': 'admin'}
+
+        def assert_listed(expected, **kwargs):
+            assignments = self.assignment_api.list_role_assignments(**kwargs)
+            self.assertItemsEqual(expected, assignments)
+
+        assert_listed([user_domain, user_project], user_id=new_user['id'])
+        assert_listed([group_domain, group_project],
+                      group_ids=[new_group['id']])
+        assert_listed([user_domain, user_project, group_domain,
+                       group_project],
+                      user_id=new_user['id'], group_ids=[new_group['id']])
+        assert_listed([user_domain, group_domain],
+                      user_id=new_user['id'], group_ids=[new_group['id']],
+                      domain_id=new_domain['id'])
+        assert_listed([user_project, group_project],
+                      project_ids=[new_project['id']])
+        assert_listed([group_domain, group_project],
+                      project_ids=[new_project['id']],
+                      domain_id=new_domain['id'], role_id='admin')
+        assert_listed([group_domain],
+                      group_ids=[new_group['id']],
+                      inherited_to_projects=True)
+        assert_listed([group_project],
+                      group_ids=[new_group['id']],
+                      inherited_to_projects=False)
+        assert_listed([], group_ids=[])
+        assert_listed([], project_ids=[])
+
     def test_list_group_role_assignment(self):
         # When a group role assignment is created and the role assignments are
         # listed then the group role assignment is included in the list.
@@ -788,6 +857,75 @@ class IdentityTests(object):
                           new_user1['id'],
                           uuid.uuid4().hex)
 
+    def test_get_roles_for_user_and_project_is_cached(self):
+        user_ref = {'name': uuid.uuid4().hex,
+                    'domain_id': DEFAULT_DOMAIN_ID,
+                    'password': uuid.uuid4().hex,
+                    'enabled': True}
+        user_ref = self.identity_api.create_user(user_ref)
+        group = {'name': uuid.uuid4().hex,
+                 'domain_id': DEFAULT_DOMAIN_ID}
+        group_id = self.identity_api.create_group(group)['id']
+
+        self.assignment_api.add_role_to_user_and_project(
+            user_id=user_ref['id'], tenant_id=self.tenant_bar['id'],
+            role_id=self.role_member['id'])
+
+        driver = self.assignment_api.driver
+        with mock.patch.object(
+                driver, 'list_role_ids_for_user_on_project',
+                wraps=driver.list_role_ids_for_user_on_project) as list_roles:
+            for i in range(2):
+                roles = self.assignment_api.get_roles_for_user_and_project(
+                    user_ref['id'], self.tenant_bar['id'])
+                self.assertEqual([self.role_member['id']], roles)
+            self.assertEqual(1, list_roles.call_count)
+
+            # Joining a group is noticed without any invalidation...
+            self.assignment_api.create_grant(
+                group_id=group_id, project_id=self.tenant_bar['id'],
+                role_id=self.role_admin['id'])
+            self.identity_api.add_user_to_group(user_ref['id'], group_id)
+            roles = self.assignment_api.get_roles_for_user_and_project(
+                user_ref['id'], self.tenant_bar['id'])
+            self.assertItemsEqual(
+                [self.role_member['id'], self.role_admin['id']], roles)
+
+            # ...as is a change to the assignments.
+            self.assignment_api.remove_role_from_user_and_project(
+                user_ref['id'], self.tenant_bar['id'],
+                self.role_member['id'])
+            roles = self.assignment_api.get_roles_for_user_and_project(
+                user_ref['id'], self.tenant_bar['id'])
+            self.assertEqual([self.role_admin['id']], roles)
+
+    def test_list_roles_from_ids_reads_uncached_roles_at_once(self):
+        role_ids = []
+        for i in range(4):
+            role = {'id': uuid.uuid4().hex, 'name': uuid.uuid4().hex}
+            self.role_api.create_role(role['id'], role)
+            role_ids.append(role['id'])
+        for role_id in role_ids[:2]:
+            self.role_api.get_role.invalidate(self.role_api, role_id)
+
+        driver = self.role_api.driver
+        with mock.patch.object(
+                driver, 'list_roles_from_ids',
+                wraps=driver.list_roles_from_ids) as list_roles:
+            roles = self.role_api.list_roles_from_ids(
+                list(reversed(role_ids)) + role_ids[:1])
+            self.assertEqual(list(reversed(role_ids)),
+                             [role['id'] for role in roles])
+            list_roles.assert_called_once_with(
+                list(reversed(role_ids[:2])))
+
+            # The roles read from the driver are cached for get_role.
+            for role_id in role_ids:
+                self.role_api.get_role(role_id)
+            roles = self.role_api.list_roles_from_ids(role_ids)
+            self.assertEqual(role_ids, [role['id'] for role in roles])
+            self.assertEqual(1, list_roles.call_count)
+
     def test_get_roles_for_user_and_project_404(self):
         self.assertRaises(exception.UserNotFound,
                           self.assignment_api.get_roles_for_user_and_project,
@@ -4397,6 +4535,98 @@ class TrustTests(object):
                           self.trust_api.get_trust,
                           trust_data['id'])
 
+    def test_consume_use_limit_reached(self):
+        trust_data = self.create_sample_trust(uuid.uuid4().hex,
+                                              remaining_uses=1)
+        self.trust_api.consume_use(trust_data['id'])
+        self.assertRaises(exception.TrustUseLimitReached,
+                          self.trust_api.consume_use,
+                          trust_data['id'])
+
+    def test_consume_use_of_unlimited_trust(self):
+        trust_data = self.create_sample_trust(uuid.uuid4().hex)
+        self.trust_api.consume_use(trust_data['id'])
+        t = self.trust_api.get_trust(trust_data['id'])
+        self.assertIsNone(t['remaining_uses'])
+
+    def _create_redelegatable_trust(self, redelegated_trust=None):
+        roles = [{'id': 'member'}]
+        trust = {'trustor_user_id': self.user_foo['id'],
+                 'trustee_user_id': self.user_two['id'],
+                 'project_id': self.tenant_bar['id'],
+                 'expires_at': timeutils.parse_isotime('2031-02-18T18:10:00Z'),
+                 'impersonation': True,
+                 'allow_redelegation': True,
+                 'roles': roles}
+        return self.trust_api.create_trust(uuid.uuid4().hex, trust, roles,
+                                           redelegated_trust=redelegated_trust)
+
+    def test_get_trust_pedigree(self):
+        root = self._create_redelegatable_trust()
+        middle = self._create_redelegatable_trust(redelegated_trust=root)
+        leaf = self._create_redelegatable_trust(redelegated_trust=middle)
+
+        pedigree = self.trust_api.get_trust_pedigree(leaf['id'])
+        self.assertEqual([leaf['id'], middle['id'], root['id']],
+                         [t['id'] for t in pedigree])
+        self.assertEqual([{'id': 'member'}], pedigree[-1]['roles'])
+
+    def test_get_trust_pedigree_with_missing_trust(self):
+        root = self._create_redelegatable_trust()
+        child = self._create_redelegatable_trust(redelegated_trust=root)
+        # Delete only the root, as if by a concurrent request.
+        self.trust_api.driver.delete_trust(root['id'])
+        self.assertRaises(exception.TrustNotFound,
+                          self.trust_api.get_trust_pedigree,
+                          child['id'])
+
+    def test_default_get_trust_pedigree(self):
+        root = self._create_redelegatable_trust()
+        leaf = self._create_redelegatable_trust(redelegated_trust=root)
+        # The base driver follows the chain with get_trust().
+        driver = self.trust_api.driver
+        pedigree = trust_core.Driver.get_trust_pedigree(driver, leaf['id'])
+        self.assertEqual([leaf['id'], root['id']],
+                         [t['id'] for t in pedigree])
+        self.assertEqual([{'id': 'member'}], pedigree[-1]['roles'])
+
+        driver.delete_trust(root['id'])
+        self.assertRaises(exception.TrustNotFound,
+                          trust_core.Driver.get_trust_pedigree,
+                          driver, leaf['id'])
+
+    def test_list_trusts_for_users(self):
+        trust1 = self.create_sample_trust(uuid.uuid4().hex)
+        trust2 = self.create_sample_trust(uuid.uuid4().hex)
+        self.trust_api.delete_trust(trust2['id'])
+        for list_trusts_for_users in (
+                self.trust_api.list_trusts_for_users,
+                functools.partial(trust_core.Driver.list_trusts_for_users,
+                                  self.trust_api.driver)):
+            for user_ids in ([self.trustor['id']],
+                             [self.trustee['id']],
+                             [self.trustor['id'], self.trustee['id']]):
+                trusts = list_trusts_for_users(user_ids)
+                self.assertEqual([trust1['id']], [t['id'] for t in trusts])
+            self.assertEqual([], list_trusts_for_users([uuid.uuid4().hex]))
+
+    def test_deleted_trust_pedigree_is_forgotten(self):
+        root = self._create_redelegatable_trust()
+        child = self._create_redelegatable_trust(redelegated_trust=root)
+        self.trust_api.get_trust_pedigree(child['id'])
+        self.trust_api.delete_trust(root['id'])
+        self.assertRaises(exception.TrustNotFound,
+                          self.trust_api.get_trust_pedigree,
+                          child['id'])
+
+    def test_consume_use_of_deleted_trust(self):
+        trust_data = self.create_sample_trust(uuid.uuid4().hex,
+                                              remaining_uses=1)
+        self.trust_api.delete_trust(trust_data['id'])
+        self.assertRaises(exception.TrustNotFound,
+                          self.trust_api.consume_use,
+                          trust_data['id'])
+
 
 class CatalogTests(object):
 
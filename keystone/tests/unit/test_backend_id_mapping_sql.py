@@ -15,6 +15,7 @@
 
 import uuid
 
+import mock
 from testtools import matchers
 
 from keystone.common import sql
@@ -134,6 +135,74 @@ class SqlIDMapping(test_backend_sql.SqlTests):
         self.assertEqual(
             public_id, self.id_mapping_api.get_public_id(local_entity))
 
+    def test_id_mappings_in_bulk(self):
+        initial_mappings = len(mapping_sql.list_id_mappings())
+        local_entities = [{'domain_id': domain['id'],
+                           'local_id': uuid.uuid4().hex,
+                           'entity_type': entity_type}
+                          for domain in (self.domainA, self.domainB)
+                          for entity_type in (mapping.EntityType.USER,
+                                              mapping.EntityType.GROUP)]
+        public_id = self.id_mapping_api.create_id_mapping(local_entities[0])
+
+        public_ids = self.id_mapping_api.get_public_ids(local_entities)
+        self.assertEqual([public_id, None, None, None], public_ids)
+
+        # Create the missing mappings, giving one of them a public ID
+        new_public_id = uuid.uuid4().hex
+        public_ids[1:] = self.id_mapping_api.create_id_mappings(
+            local_entities[1:], [None, new_public_id, None])
+        self.assertEqual(new_public_id, public_ids[2])
+        self.assertThat(mapping_sql.list_id_mappings(),
+                        matchers.HasLength(initial_mappings + 4))
+
+        self.assertEqual(public_ids,
+                         self.id_mapping_api.get_public_ids(local_entities))
+        for local_entity, public_id in zip(local_entities, public_ids):
+            self.assertEqual(
+                public_id, self.id_mapping_api.get_public_id(local_entity))
+            local_id_ref = self.id_mapping_api.get_id_mapping(public_id)
+            for k in local_entity:
+                self.assertEqual(local_entity[k], local_id_ref[k])
+
+    def test_id_mappings_in_bulk_created_concurrently(self):
+        initial_mappings = len(mapping_sql.list_id_mappings())
+        local_entities = [{'domain_id': self.domainA['id'],
+                           'local_id': uuid.uuid4().hex,
+                           'entity_type': mapping.EntityType.USER}
+                          for i in range(3)]
+        # Another process maps one of the entities first
+        public_id = self.id_mapping_api.driver.create_id_mapping(
+            local_entities[1], uuid.uuid4().hex)
+
+        public_ids = self.id_mapping_api.create_id_mappings(local_entities)
+        self.assertEqual(public_id, public_ids[1])
+        self.assertThat(mapping_sql.list_id_mappings(),
+                        matchers.HasLength(initial_mappings + 3))
+        self.assertEqual(public_ids,
+                         self.id_mapping_api.get_public_ids(local_entities))
+
+    def test_public_ids_are_cached(self):
+        local_entity = {'domain_id': self.domainA['id'],
+                        'local_id': uuid.uuid4().hex,
+                        'entity_type': mapping.EntityType.USER}
+        public_id = self.id_mapping_api.create_id_mapping(local_entity)
+
+        driver = self.id_mapping_api.driver
+        with mock.patch.object(driver, 'get_public_id') as mock_get, \
+                mock.patch.object(driver, 'get_public_ids') as mock_get_ids:
+            self.assertEqual(
+                public_id, self.id_mapping_api.get_public_id(local_entity))
+            self.assertEqual(
+                [public_id],
+                self.id_mapping_api.get_public_ids([local_entity]))
+        self.assertFalse(mock_get.called)
+        self.assertFalse(mock_get_ids.called)
+
+        # Deleting the mapping removes it from the cache too
+        self.id_mapping_api.delete_id_mapping(public_id)
+        self.assertIsNone(self.id_mapping_api.get_public_id(local_entity))
+
     def test_delete_public_id_is_silent(self):
         # Test that deleting an invalid public key is silent
         self.id_mapping_api.delete_id_mapping(uuid.uuid4().hex)
@@ -36,70 +36,81 @@ class KvsToken(tests.TestCase, test_backend.TokenTests):
             exception.NotImplemented,
             self.token_provider_api._persistence.flush_expired_tokens)
 
-    def _update_user_token_index_direct(self, user_key, token_id, new_data):
-        persistence = self.token_provider_api._persistence
-        token_list = persistence.driver._get_user_token_list_with_expiry(
-            user_key)
-        # Update the user-index so that the expires time is _actually_ expired
-        # since we do not do an explicit get on the token, we only reference
-        # the data in the user index (to save extra round-trips to the kvs
-        # backend).
-        for i, data in enumerate(token_list):
-            if data[0] == token_id:
-                token_list[i] = new_data
-                break
-        self.token_provider_api._persistence.driver._store.set(user_key,
-                                                               token_list)
+    def test_user_index_is_bucketed_by_expiry(self):
+        user_id = six.text_type(uuid.uuid4().hex)
+        token_id, data = self.create_token_sample_data(user_id=user_id)
+
+        driver = self.token_provider_api._persistence.driver
+        token_ref = driver.get_token(token_id)
+        user_key = driver._prefix_user_id(user_id)
+        bucket = driver._get_expiry_bucket(token_ref['expires'])
+
+        self.assertEqual([bucket], driver._store.get(
+            driver._get_user_token_buckets_key(user_key)))
+        expected_user_token_list = [
+            (token_id, timeutils.isotime(token_ref['expires'],
+                                         subsecond=True))]
+        self.assertEqual(expected_user_token_list, driver._store.get(
+            driver._get_user_token_bucket_key(user_key, bucket)))
+        self.assertEqual(expected_user_token_list,
+                         driver._get_user_token_list_with_expiry(user_key))
 
     def test_cleanup_user_index_on_create(self):
         user_id = six.text_type(uuid.uuid4().hex)
+        driver = self.token_provider_api._persistence.driver
+        user_key = driver._prefix_user_id(user_id)
+
+        # Index a token in a bucket that has expired a day ago.
+        expired = timeutils.utcnow() - datetime.timedelta(seconds=86400)
+        expired_bucket = driver._get_expiry_bucket(expired)
+        expired_bucket_key = driver._get_user_token_bucket_key(
+            user_key, expired_bucket)
+        driver._store.set(
+            expired_bucket_key,
+            [(uuid.uuid4().hex, timeutils.isotime(expired, subsecond=True))])
+        driver._store.set(driver._get_user_token_buckets_key(user_key),
+                          [expired_bucket])
+
         valid_token_id, data = self.create_token_sample_data(user_id=user_id)
-        expired_token_id, expired_data = self.create_token_sample_data(
-            user_id=user_id)
-
-        expire_delta = datetime.timedelta(seconds=86400)
-
-        # NOTE(morganfainberg): Directly access the data cache since we need to
-        # get expired tokens as well as valid tokens.
-        token_persistence = self.token_provider_api._persistence
-        user_key = token_persistence.driver._prefix_user_id(user_id)
-        user_token_list = token_persistence.driver._store.get(user_key)
-        valid_token_ref = token_persistence.get_token(valid_token_id)
-        expired_token_ref = token_persistence.get_token(expired_token_id)
-        expected_user_token_list = [
-            (valid_token_id, timeutils.isotime(valid_token_ref['expires'],
-                                               subsecond=True)),
-            (expired_token_id, timeutils.isotime(expired_token_ref['expires'],
-                                                 subsecond=True))]
-        self.assertEqual(expected_user_token_list, user_token_list)
-        new_expired_data = (expired_token_id,
-                            timeutils.isotime(
-                                (timeutils.utcnow() - expire_delta),
-                                subsecond=True))
-        self._update_user_token_index_direct(user_key, expired_token_id,
-                                             new_expired_data)
-        valid_token_id_2, valid_data_2 = self.create_token_sample_data(
-            user_id=user_id)
-        valid_token_ref_2 = token_persistence.get_token(valid_token_id_2)
-        expected_user_token_list = [
-            (valid_token_id, timeutils.isotime(valid_token_ref['expires'],
-                                               subsecond=True)),
-            (valid_token_id_2, timeutils.isotime(valid_token_ref_2['expires'],
-                                                 subsecond=True))]
-        user_token_list = token_persistence.driver._store.get(user_key)
-        self.assertEqual(expected_user_token_list, user_token_list)
-
-        # Test that revoked tokens are removed from the list on create.
-        token_persistence.delete_token(valid_token_id_2)
-        new_token_id, data = self.create_token_sample_data(user_id=user_id)
-        new_token_ref = token_persistence.get_token(new_token_id)
-        expected_user_token_list = [
-            (valid_token_id, timeutils.isotime(valid_token_ref['expires'],
-                                               subsecond=True)),
-            (new_token_id, timeutils.isotime(new_token_ref['expires'],
-                                             subsecond=True))]
-        user_token_list = token_persistence.driver._store.get(user_key)
-        self.assertEqual(expected_user_token_list, user_token_list)
+        valid_token_ref = driver.get_token(valid_token_id)
+
+        self.assertEqual(
+            [driver._get_expiry_bucket(valid_token_ref['expires'])],
+            driver._store.get(driver._get_user_token_buckets_key(user_key)))
+        self.assertRaises(exception.NotFound,
+                          driver._store.get, expired_bucket_key)
+        self.assertEqual(
+            [(valid_token_id, timeutils.isotime(valid_token_ref['expires'],
+                                                subsecond=True))],
+            driver._get_user_token_list_with_expiry(user_key))
+
+    def test_legacy_user_index_is_read(self):
+        user_id = six.text_type(uuid.uuid4().hex)
+        driver = self.token_provider_api._persistence.driver
+        user_key = driver._prefix_user_id(user_id)
+        legacy_item = (uuid.uuid4().hex, timeutils.isotime(subsecond=True))
+        driver._store.set(user_key, [legacy_item])
+
+        self.assertEqual([legacy_item[0]],
+                         driver._get_user_token_list(user_key))
+
+    def test_legacy_user_index_is_migrated_on_create(self):
+        user_id = six.text_type(uuid.uuid4().hex)
+        driver = self.token_provider_api._persistence.driver
+        user_key = driver._prefix_user_id(user_id)
+        expires = timeutils.utcnow() + datetime.timedelta(hours=2)
+        expired = timeutils.utcnow() - datetime.timedelta(hours=2)
+        legacy_item = (uuid.uuid4().hex,
+                       timeutils.isotime(expires, subsecond=True))
+        expired_item = (uuid.uuid4().hex,
+                        timeutils.isotime(expired, subsecond=True))
+        driver._store.set(user_key, [legacy_item, expired_item])
+
+        token_id, data = self.create_token_sample_data(user_id=user_id)
+        token_ids = driver._get_user_token_list(user_key)
+        self.assertEqual(sorted([legacy_item[0], token_id]),
+                         sorted(token_ids))
+        self.assertRaises(exception.NotFound, driver._store.get, user_key)
 
 
 class KvsCatalog(tests.TestCase, test_backend.CatalogTests):
@@ -468,6 +468,9 @@ class BaseLDAPIdentity(test_backend.IdentityTests):
         after_assignments = len(self.assignment_api.list_role_assignments())
         self.assertEqual(existing_assignments + 2, after_assignments)
 
+    def test_list_role_assignments_filtered(self):
+        self.skipTest('Blocked by bug 1101287')
+
     def test_list_role_assignments_dumb_member(self):
         self.config_fixture.config(group='ldap', use_dumb_member=True)
         self.clear_database()
@@ -555,6 +558,42 @@ class BaseLDAPIdentity(test_backend.IdentityTests):
         self.assertEqual(1, len(res), "Expected 1 entry (user_1)")
         self.assertEqual(user_1_id, res[0]['id'], "Expected user 1 id")
 
+    def test_list_group_members_in_batches(self):
+        group = dict(name=uuid.uuid4().hex,
+                     domain_id=CONF.identity.default_domain_id)
+        group_id = self.identity_api.create_group(group)['id']
+
+        user_ids = []
+        for i in range(5):
+            user = dict(name=uuid.uuid4().hex,
+                        domain_id=CONF.identity.default_domain_id)
+            user_ids.append(self.identity_api.create_user(user)['id'])
+            self.identity_api.add_user_to_group(user_ids[-1], group_id)
+
+        # The members are fetched in batches, not one by one.
+        unused, driver, entity_id = (
+            self.identity_api._get_domain_driver_and_entity_id(group_id))
+        with mock.patch.object(common_ldap_core, 'ID_FILTER_BATCH_SIZE', 2):
+            with mock.patch.object(driver.user, 'get') as mock_get:
+                res = self.identity_api.list_users_in_group(group_id)
+        self.assertFalse(mock_get.called)
+        self.assertItemsEqual(user_ids, [user['id'] for user in res])
+
+    def test_check_user_in_group_does_not_list_members(self):
+        group = dict(name=uuid.uuid4().hex,
+                     domain_id=CONF.identity.default_domain_id)
+        group_id = self.identity_api.create_group(group)['id']
+        user = dict(name=uuid.uuid4().hex,
+                    domain_id=CONF.identity.default_domain_id)
+        user_id = self.identity_api.create_user(user)['id']
+        self.identity_api.add_user_to_group(user_id, group_id)
+
+        unused, driver, entity_id = (
+            self.identity_api._get_domain_driver_and_entity_id(group_id))
+        with mock.patch.object(driver.group, 'list_group_users') as mock_list:
+            self.identity_api.check_user_in_group(user_id, group_id)
+        self.assertFalse(mock_list.called)
+
     def test_list_group_members_when_no_members(self):
         # List group members when there is no member in the group.
         # No exception should be raised.
@@ -1925,6 +1964,40 @@ class LDAPIdentity(BaseLDAPIdentity, tests.TestCase):
         self.assertEqual('crap', user_ref['id'])
         self.assertEqual('Foo Bar', user_ref['name'])
 
+    def test_authenticate_with_auth_cache(self):
+        self.config_fixture.config(group='ldap', auth_cache_enabled=True)
+        self.reload_backends(CONF.identity.default_domain_id)
+        driver = self.identity_api._select_identity_driver(
+            CONF.identity.default_domain_id)
+
+        def authenticate(password):
+            return self.identity_api.authenticate(
+                context={}, user_id=self.user_foo['id'], password=password)
+
+        user_ref = authenticate(self.user_foo['password'])
+        with mock.patch.object(
+                driver.user, 'get_connection',
+                wraps=driver.user.get_connection) as mock_connection:
+            self.assertEqual(user_ref,
+                             authenticate(self.user_foo['password']))
+        # The user is looked up, but doesn't bind again.
+        for call in mock_connection.call_args_list:
+            self.assertFalse(call[1].get('end_user_auth'))
+        self.assertEqual(1, driver.auth_cache.hits)
+        self.assertEqual(1, driver.auth_cache.misses)
+
+        # A wrong password is still checked against the server.
+        self.assertRaises(AssertionError, authenticate, uuid.uuid4().hex)
+        self.assertEqual(2, driver.auth_cache.misses)
+
+        # Changing the password forgets the old one.
+        new_password = uuid.uuid4().hex
+        self.identity_api.update_user(self.user_foo['id'],
+                                      {'password': new_password})
+        self.assertRaises(AssertionError,
+                          authenticate, self.user_foo['password'])
+        authenticate(new_password)
+
 
 class LDAPIdentityEnabledEmulation(LDAPIdentity):
     def setUp(self):
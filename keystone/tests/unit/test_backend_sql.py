@@ -24,11 +24,13 @@ import sqlalchemy
 from sqlalchemy import exc
 from testtools import matchers
 
+from keystone.assignment import core as assignment_core
 from keystone.common import driver_hints
 from keystone.common import sql
 from keystone import exception
 from keystone.identity.backends import sql as identity_sql
 from keystone.openstack.common import versionutils
+from keystone.resource.backends import sql as resource_sql
 from keystone.tests import unit as tests
 from keystone.tests.unit import default_fixtures
 from keystone.tests.unit.ksfixtures import database
@@ -429,12 +431,177 @@ class SqlIdentity(SqlTests, test_backend.IdentityTests):
         # roles assignments.
         self.assertThat(user_domains, matchers.HasLength(0))
 
+    def test_list_role_ids_for_user_on_project(self):
+        self.config_fixture.config(group='os_inherit', enabled=True)
+        projects = self._create_projects_hierarchy(hierarchy_size=3)
+        user = {'name': uuid.uuid4().hex, 'domain_id': DEFAULT_DOMAIN_ID,
+                'password': uuid.uuid4().hex, 'enabled': True}
+        user = self.identity_api.create_user(user)
+        group = {'name': uuid.uuid4().hex, 'domain_id': DEFAULT_DOMAIN_ID}
+        group = self.identity_api.create_group(group)
+        roles = []
+        for i in range(7):
+            role = {'id': uuid.uuid4().hex, 'name': uuid.uuid4().hex}
+            self.role_api.create_role(role['id'], role)
+            roles.append(role['id'])
+
+        grants = [
+            # Direct on the project, for the user and for the group
+            dict(user_id=user['id'], project_id=projects[2]['id']),
+            dict(group_id=group['id'], project_id=projects[2]['id']),
+            # Inherited from the domain and from a parent
+            dict(user_id=user['id'], domain_id=DEFAULT_DOMAIN_ID,
+                 inherited_to_projects=True),
+            dict(group_id=group['id'], project_id=projects[0]['id'],
+                 inherited_to_projects=True),
+            # None of these apply to the project
+            dict(user_id=user['id'], domain_id=DEFAULT_DOMAIN_ID),
+            dict(user_id=user['id'], project_id=projects[1]['id']),
+            dict(user_id=user['id'], project_id=projects[2]['id'],
+                 inherited_to_projects=True),
+        ]
+        for role_id, grant in zip(roles, grants):
+            self.assignment_api.create_grant(role_id, **grant)
+
+        driver = self.assignment_api.driver
+        args = (user['id'], [group['id']], projects[2]['id'],
+                DEFAULT_DOMAIN_ID, [projects[1]['id'], projects[0]['id']])
+        role_ids = driver.list_role_ids_for_user_on_project(*args)
+        self.assertItemsEqual(roles[:4], role_ids)
+        self.assertItemsEqual(
+            role_ids,
+            assignment_core.Driver.list_role_ids_for_user_on_project(
+                driver, *args))
+
+        self.config_fixture.config(group='os_inherit', enabled=False)
+        self.assertItemsEqual(
+            roles[:2], driver.list_role_ids_for_user_on_project(*args))
+
+    def _create_project_tree(self):
+        projects = self._create_projects_hierarchy(hierarchy_size=4)
+        sibling = {'id': uuid.uuid4().hex,
+                   'description': '',
+                   'domain_id': DEFAULT_DOMAIN_ID,
+                   'enabled': True,
+                   'name': uuid.uuid4().hex,
+                   'parent_id': projects[1]['id']}
+        self.resource_api.create_project(sibling['id'], sibling)
+        return projects, sibling
+
+    def _check_project_tree(self, projects, sibling):
+        driver = self.resource_api.driver
+        subtree = driver.list_projects_in_subtree(projects[0]['id'])
+        self.assertItemsEqual(
+            [projects[1]['id'], projects[2]['id'], projects[3]['id'],
+             sibling['id']],
+            [p['id'] for p in subtree])
+        # Nearer levels of the tree come first.
+        self.assertEqual(projects[1]['id'], subtree[0]['id'])
+        self.assertEqual(projects[3]['id'], subtree[-1]['id'])
+
+        parents = driver.list_project_parents(projects[3]['id'])
+        self.assertEqual(
+            [projects[2]['id'], projects[1]['id'], projects[0]['id']],
+            [p['id'] for p in parents])
+        self.assertEqual([], driver.list_project_parents(projects[0]['id']))
+        self.assertEqual([],
+                         driver.list_projects_in_subtree(projects[3]['id']))
+        self.assertRaises(exception.ProjectNotFound,
+                          driver.list_project_parents, uuid.uuid4().hex)
+
+    def _skip_if_no_recursive_queries(self):
+        if not resource_sql._supports_recursive_queries(sql.get_session()):
+            self.skipTest('The database does not support recursive queries')
+
+    def test_project_hierarchy_with_recursive_queries(self):
+        self._skip_if_no_recursive_queries()
+        projects, sibling = self._create_project_tree()
+        self._check_project_tree(projects, sibling)
+
+    def test_project_hierarchy_without_recursive_queries(self):
+        projects, sibling = self._create_project_tree()
+        with mock.patch.object(resource_sql, '_supports_recursive_queries',
+                               return_value=False):
+            self._check_project_tree(projects, sibling)
+
+    def test_circular_project_hierarchy_is_detected(self):
+        projects = self._create_projects_hierarchy(hierarchy_size=3)
+        session = sql.get_session()
+        with session.begin():
+            root = session.query(resource_sql.Project).get(projects[0]['id'])
+            root.parent_id = projects[2]['id']
+
+        driver = self.resource_api.driver
+        recursive_modes = [False]
+        if resource_sql._supports_recursive_queries(session):
+            recursive_modes.append(True)
+        for recursive in recursive_modes:
+            with mock.patch.object(resource_sql,
+                                   '_supports_recursive_queries',
+                                   return_value=recursive):
+                self.assertIsNone(
+                    driver.list_projects_in_subtree(projects[0]['id']))
+                self.assertIsNone(
+                    driver.list_project_parents(projects[0]['id']))
+
 
 class SqlTrust(SqlTests, test_backend.TrustTests):
     pass
 
 
 class SqlToken(SqlTests, test_backend.TokenTests):
+    def test_delete_tokens_for_user_projects(self):
+        token_id1, data = self.create_token_sample_data(
+            tenant_id='testtenantid')
+        token_id2, data = self.create_token_sample_data(
+            tenant_id='testtenantid2')
+        token_id3, data = self.create_token_sample_data(
+            tenant_id='testtenantid',
+            user_id='testuserid1')
+        token_id4, data = self.create_token_sample_data(
+            user_id='testuserid1')
+        token_id5, data = self.create_token_sample_data(
+            tenant_id='testtenantid',
+            user_id='testuserid2')
+        self.token_provider_api._persistence.delete_tokens_for_user_projects(
+            {'testuserid': ['testtenantid'], 'testuserid1': None})
+        for token_id in [token_id1, token_id3, token_id4]:
+            self.assertRaises(exception.TokenNotFound,
+                              self.token_provider_api._persistence.get_token,
+                              token_id)
+        self.token_provider_api._persistence.get_token(token_id2)
+        self.token_provider_api._persistence.get_token(token_id5)
+
+    def test_delete_tokens_for_user_projects_with_trust(self):
+        trust = self.trust_api.create_trust(
+            uuid.uuid4().hex,
+            {'trustor_user_id': self.user_foo['id'],
+             'trustee_user_id': self.user_two['id'],
+             'project_id': self.tenant_bar['id'],
+             'impersonation': False},
+            roles=[{'id': 'member'}])
+        token_id1, data = self.create_token_sample_data(
+            tenant_id=self.tenant_bar['id'], user_id=self.user_two['id'],
+            trust_id=trust['id'])
+        token_id2, data = self.create_token_sample_data(
+            tenant_id=self.tenant_bar['id'], user_id=self.user_two['id'])
+
+        # Deleting the trustor's tokens deletes the trustee's tokens that
+        # are scoped to the trust, and the trusts of all of the users are
+        # listed at once.
+        persistence = self.token_provider_api._persistence
+        driver = self.trust_api.driver
+        with mock.patch.object(
+                driver, 'list_trusts_for_users',
+                wraps=driver.list_trusts_for_users) as mock_list:
+            persistence.delete_tokens_for_user_projects(
+                {self.user_foo['id']: None,
+                 uuid.uuid4().hex: [self.tenant_bar['id']]})
+        self.assertEqual(1, mock_list.call_count)
+        self.assertRaises(exception.TokenNotFound,
+                          persistence.get_token, token_id1)
+        persistence.get_token(token_id2)
+
     def test_token_revocation_list_uses_right_columns(self):
         # This query used to be heavy with too many columns. We want
         # to make sure it is only running with the minimum columns
@@ -582,6 +749,76 @@ class SqlCatalog(SqlTests, test_backend.CatalogTests):
         self.assertIsNone(catalog_endpoint.get('adminURL'))
         self.assertIsNone(catalog_endpoint.get('internalURL'))
 
+    def test_catalog_skeleton_is_reused(self):
+        service = {
+            'id': uuid.uuid4().hex,
+            'type': uuid.uuid4().hex,
+            'name': uuid.uuid4().hex,
+            'description': uuid.uuid4().hex,
+        }
+        self.catalog_api.create_service(service['id'], service.copy())
+
+        endpoint = {
+            'id': uuid.uuid4().hex,
+            'region_id': None,
+            'interface': 'public',
+            'url': 'http://localhost/$(tenant_id)s',
+            'service_id': service['id'],
+        }
+        self.catalog_api.create_endpoint(endpoint['id'], endpoint.copy())
+
+        driver = self.catalog_api.driver
+        with mock.patch.object(driver, '_build_catalog_skeleton',
+                               wraps=driver._build_catalog_skeleton) as build:
+            catalog_a = self.catalog_api.get_v3_catalog('user', 'tenant-a')
+            catalog_b = self.catalog_api.get_v3_catalog('user', 'tenant-b')
+            catalog = self.catalog_api.get_catalog('user', 'tenant-c')
+        self.assertEqual(1, build.call_count)
+
+        def url(catalog):
+            endpoints = [e for s in catalog if s['id'] == service['id']
+                         for e in s['endpoints']]
+            return endpoints[0]['url']
+
+        self.assertEqual('http://localhost/tenant-a', url(catalog_a))
+        self.assertEqual('http://localhost/tenant-b', url(catalog_b))
+        self.assertEqual('http://localhost/tenant-c',
+                         catalog[None][service['type']]['publicURL'])
+
+    def test_catalog_skeleton_is_rebuilt_on_change(self):
+        service = {
+            'id': uuid.uuid4().hex,
+            'type': uuid.uuid4().hex,
+            'name': uuid.uuid4().hex,
+            'description': uuid.uuid4().hex,
+        }
+        self.catalog_api.create_service(service['id'], service.copy())
+        catalog = self.catalog_api.get_v3_catalog('user', 'tenant')
+        self.assertIn(service['id'], [s['id'] for s in catalog])
+
+        endpoint = {
+            'id': uuid.uuid4().hex,
+            'region_id': None,
+            'interface': 'public',
+            'url': uuid.uuid4().hex,
+            'service_id': service['id'],
+        }
+        self.catalog_api.create_endpoint(endpoint['id'], endpoint.copy())
+        catalog = self.catalog_api.get_v3_catalog('user', 'tenant')
+        endpoints = [e for s in catalog if s['id'] == service['id']
+                     for e in s['endpoints']]
+        self.assertEqual([endpoint['id']], [e['id'] for e in endpoints])
+
+        self.catalog_api.update_endpoint(endpoint['id'], {'enabled': False})
+        catalog = self.catalog_api.get_v3_catalog('user', 'tenant')
+        endpoints = [e for s in catalog if s['id'] == service['id']
+                     for e in s['endpoints']]
+        self.assertEqual([], endpoints)
+
+        self.catalog_api.delete_service(service['id'])
+        catalog = self.catalog_api.get_v3_catalog('user', 'tenant')
+        self.assertNotIn(service['id'], [s['id'] for s in catalog])
+
     def test_create_endpoint_region_404(self):
         service = {
             'id': uuid.uuid4().hex,
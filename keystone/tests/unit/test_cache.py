@@ -17,6 +17,7 @@ import time
 import uuid
 
 from dogpile.cache import api
+from dogpile.cache.backends import memory
 from dogpile.cache import proxy
 import mock
 from oslo_config import cfg
@@ -291,6 +292,80 @@ class CacheRegionTest(tests.TestCase):
                           "bogus")
 
 
+class LocalCacheProxyTest(tests.TestCase):
+
+    def setUp(self):
+        super(LocalCacheProxyTest, self).setUp()
+        self.backend = memory.MemoryBackend({})
+        self.local = cache.LocalCacheProxy(10, 60).wrap(self.backend)
+
+    def test_region_uses_local_cache(self):
+        self.config_fixture.config(group='cache', local_cache_size=10)
+        region = cache.make_region()
+        cache.configure_cache_region(region)
+        self.assertIsInstance(region.backend, cache.LocalCacheProxy)
+
+    def test_reads_are_served_locally(self):
+        self.local.set('key', 'value')
+        self.backend.set('key', 'changed elsewhere')
+        self.assertEqual('value', self.local.get('key'))
+        self.assertEqual(['value', NO_VALUE],
+                         self.local.get_multi(['key', 'missing']))
+
+        # Deletions made through the proxy apply to both.
+        self.local.delete('key')
+        self.assertEqual(NO_VALUE, self.local.get('key'))
+        self.assertEqual(NO_VALUE, self.backend.get('key'))
+
+    def test_backend_values_are_kept_locally(self):
+        self.backend.set_multi({'key1': 1, 'key2': 2})
+        self.assertEqual([1, 2], self.local.get_multi(['key1', 'key2']))
+        self.backend.delete_multi(['key1', 'key2'])
+        self.assertEqual([1, 2], self.local.get_multi(['key1', 'key2']))
+
+    def test_local_values_expire(self):
+        self.local.expiration_time = 0
+        self.local.set('key', 'value')
+        self.backend.set('key', 'changed elsewhere')
+        self.assertEqual('changed elsewhere', self.local.get('key'))
+
+    def test_invalidation_reaches_other_processes(self):
+        other = cache.LocalCacheProxy(10, 60).wrap(self.backend)
+        self.local.set('key', 'value')
+        self.assertEqual('value', other.get('key'))
+
+        self.local.delete('key')
+        self.assertEqual(NO_VALUE, other.get('key'))
+
+    def test_invalidation_drops_only_affected_values(self):
+        other = cache.LocalCacheProxy(10, 60).wrap(self.backend)
+        key = 'key'
+        unaffected = next(k for k in ('key%d' % i for i in range(100))
+                          if other._bucket(k) != other._bucket(key))
+        self.local.set_multi({key: 'value', unaffected: 'value'})
+        self.assertEqual(['value', 'value'],
+                         other.get_multi([key, unaffected]))
+        self.backend.set(unaffected, 'changed elsewhere')
+
+        self.local.delete(key)
+        self.assertEqual(NO_VALUE, other.get(key))
+        self.assertEqual('value', other.get(unaffected))
+
+    def test_invalidation_checks_are_rate_limited(self):
+        other = cache.LocalCacheProxy(10, 60, 60).wrap(self.backend)
+        self.local.set('key', 'value')
+        self.assertEqual('value', other.get('key'))
+
+        self.local.delete('key')
+        self.assertEqual('value', other.get('key'))
+
+    def test_values_are_not_shared(self):
+        self.local.set('key', {'a': 1})
+        value = self.local.get('key')
+        value['a'] = 2
+        self.assertEqual({'a': 1}, self.local.get('key'))
+
+
 class CacheNoopBackendTest(tests.TestCase):
 
     def setUp(self):
@@ -166,6 +166,70 @@ class PolicyTestCase(BasePolicyTestCase):
         rules.enforce(admin_credentials, lowercase_action, self.target)
         rules.enforce(admin_credentials, uppercase_action, self.target)
 
+    def test_decisions_are_remembered(self):
+        driver = rules.Policy()
+        action = "example:my_file"
+        credentials = {'project_id': 'fake', 'roles': []}
+        target_mine = {'project_id': 'fake'}
+        target_not_mine = {'project_id': 'another'}
+
+        driver.enforce(credentials, action, target_mine)
+        driver.enforce(credentials, action, target_mine)
+        self.assertEqual(1, driver.enforcements_avoided)
+
+        # Values the rule doesn't refer to are not part of the decision.
+        driver.enforce(dict(credentials, user_id='fake'), action,
+                       dict(target_mine, name='fake'))
+        self.assertEqual(2, driver.enforcements_avoided)
+
+        for i in range(2):
+            self.assertRaises(exception.ForbiddenAction, driver.enforce,
+                              credentials, action, target_not_mine)
+        self.assertEqual(3, driver.enforcements_avoided)
+
+        # A role the rule refers to changes the decision.
+        driver.enforce(dict(credentials, roles=['compute_admin']), action,
+                       target_not_mine)
+        self.assertEqual(3, driver.enforcements_avoided)
+
+    def test_http_decisions_are_not_remembered(self):
+        driver = rules.Policy()
+
+        def fakeurlopen(url, post_data):
+            return six.StringIO("True")
+
+        with mock.patch.object(urlrequest, 'urlopen', fakeurlopen):
+            driver.enforce(self.credentials, "example:get_http", self.target)
+            driver.enforce(self.credentials, "example:get_http", self.target)
+        self.assertEqual(0, driver.enforcements_avoided)
+
+    def test_decisions_are_forgotten_when_rules_change(self):
+        driver = rules.Policy()
+        driver.enforce(self.credentials, "example:allowed", self.target)
+
+        self.rules["example:allowed"] = [["false:false"]]
+        self._set_rules()
+        self.assertRaises(exception.ForbiddenAction, driver.enforce,
+                          self.credentials, "example:allowed", self.target)
+        self.assertEqual(0, driver.enforcements_avoided)
+
+    def test_rules_are_loaded_once_per_decision(self):
+        driver = rules.Policy()
+        with mock.patch.object(rules._ENFORCER, 'load_rules',
+                               wraps=rules._ENFORCER.load_rules) as load:
+            driver.enforce(self.credentials, "example:allowed", self.target)
+            self.assertEqual(1, load.call_count)
+            self.assertRaises(exception.ForbiddenAction, driver.enforce,
+                              self.credentials, "example:denied", self.target)
+            self.assertEqual(2, load.call_count)
+
+    def test_decision_cache_disabled(self):
+        self.config_fixture.config(group='policy', decision_cache_size=0)
+        driver = rules.Policy()
+        driver.enforce(self.credentials, "example:allowed", self.target)
+        driver.enforce(self.credentials, "example:allowed", self.target)
+        self.assertEqual(0, driver.enforcements_avoided)
+
 
 class DefaultPolicyTestCase(BasePolicyTestCase):
     def setUp(self):
@@ -15,6 +15,7 @@ import datetime
 import uuid
 
 import mock
+from oslo_config import cfg
 from oslo_utils import timeutils
 from testtools import matchers
 
@@ -25,6 +26,9 @@ from keystone.tests.unit import test_backend_sql
 from keystone.token import provider
 
 
+CONF = cfg.CONF
+
+
 def _new_id():
     return uuid.uuid4().hex
 
@@ -166,6 +170,50 @@ class RevokeTests(object):
         # should no longer throw an exception
         self.revoke_api.check_token(token_values)
 
+    def test_revoke_tree_is_updated_incrementally(self):
+        token_values = _sample_blank_token()
+        token_values['user_id'] = _new_id()
+        self.revoke_api.revoke_by_user(_new_id())
+        self.revoke_api.check_token(token_values)
+
+        with mock.patch.object(self.revoke_api.driver, 'list_events',
+                               wraps=self.revoke_api.driver.list_events) as m:
+            self.revoke_api.revoke_by_user(token_values['user_id'])
+            self.assertRaises(exception.TokenNotFound,
+                              self.revoke_api.check_token,
+                              token_values)
+            self.assertIsNotNone(m.call_args[1]['last_fetch'])
+
+    def test_event_recorded_elsewhere_is_noticed(self):
+        token_values = _sample_blank_token()
+        token_values['user_id'] = _new_id()
+        self.revoke_api.check_token(token_values)
+
+        # Simulate another process recording the event.
+        self.revoke_api.driver.revoke(
+            model.RevokeEvent(user_id=token_values['user_id']))
+        self.revoke_api._get_revoke_generation.invalidate(self.revoke_api)
+        self.assertRaises(exception.TokenNotFound,
+                          self.revoke_api.check_token,
+                          token_values)
+
+    def test_event_committed_late_is_noticed(self):
+        token_values = _sample_blank_token()
+        token_values['user_id'] = _new_id()
+        self.revoke_api.revoke_by_user(_new_id())
+        self.revoke_api.check_token(token_values)
+
+        # Simulate another server recording an event with a clock that is
+        # behind, after this one has read a newer event.
+        event = model.RevokeEvent(user_id=token_values['user_id'])
+        event.revoked_at -= datetime.timedelta(
+            seconds=CONF.revoke.fetch_overlap - 1)
+        self.revoke_api.driver.revoke(event)
+        self.revoke_api._get_revoke_generation.invalidate(self.revoke_api)
+        self.assertRaises(exception.TokenNotFound,
+                          self.revoke_api.check_token,
+                          token_values)
+
     def test_revoke_by_expiration_project_and_domain_fails(self):
         user_id = _new_id()
         expires_at = timeutils.isotime(_future_time(), subsecond=True)
@@ -561,44 +609,37 @@ class RevokeTreeTests(tests.TestCase):
 
         self._assertTokenRevoked(token_data)
 
+    def test_not_revoked_verdict_is_cached_until_next_event(self):
+        token_data = _sample_blank_token()
+        token_data['user_id'] = _new_id()
+        token_data['audit_id'] = _new_id()
+        self._revoke_by_user(_new_id())
+        self.assertFalse(self.tree.is_revoked(token_data))
+
+        with mock.patch.object(model, '_token_candidates') as m:
+            self.assertFalse(self.tree.is_revoked(token_data))
+            self.assertFalse(m.called)
+
+        self._revoke_by_audit_id(token_data['audit_id'])
+        self.assertTrue(self.tree.is_revoked(token_data))
+
     def _assertEmpty(self, collection):
         return self.assertEqual(0, len(collection), "collection not empty")
 
     def _assertEventsMatchIteration(self, turn):
-        self.assertEqual(1, len(self.tree.revoke_map))
-        self.assertEqual(turn + 1, len(self.tree.revoke_map
-                                       ['trust_id=*']
-                                       ['consumer_id=*']
-                                       ['access_token_id=*']
-                                       ['audit_id=*']
-                                       ['audit_chain_id=*']))
-        # two different functions add  domain_ids, +1 for None
-        self.assertEqual(2 * turn + 1, len(self.tree.revoke_map
-                                           ['trust_id=*']
-                                           ['consumer_id=*']
-                                           ['access_token_id=*']
-                                           ['audit_id=*']
-                                           ['audit_chain_id=*']
-                                           ['expires_at=*']))
-        # two different functions add  project_ids, +1 for None
-        self.assertEqual(2 * turn + 1, len(self.tree.revoke_map
-                                           ['trust_id=*']
-                                           ['consumer_id=*']
-                                           ['access_token_id=*']
-                                           ['audit_id=*']
-                                           ['audit_chain_id=*']
-                                           ['expires_at=*']
-                                           ['domain_id=*']))
-        # 10 users added
+        # five different shapes of event are added on every turn
+        self.assertEqual(5, len(self.tree.revoke_map))
+        self.assertEqual(turn, len(self.tree.revoke_map
+                                   [('user_id',)]))
+        self.assertEqual(turn, len(self.tree.revoke_map
+                                   [('expires_at', 'user_id')]))
+        self.assertEqual(turn, len(self.tree.revoke_map
+                                   [('project_id', 'role_id')]))
+        # two different functions add domain role assignments
+        self.assertEqual(2 * turn, len(self.tree.revoke_map
+                                       [('domain_id', 'role_id')]))
         self.assertEqual(turn, len(self.tree.revoke_map
-                                   ['trust_id=*']
-                                   ['consumer_id=*']
-                                   ['access_token_id=*']
-                                   ['audit_id=*']
-                                   ['audit_chain_id=*']
-                                   ['expires_at=*']
-                                   ['domain_id=*']
-                                   ['project_id=*']))
+                                   [('project_id', 'user_id')]))
 
     def test_cleanup(self):
         events = self.events
@@ -613,12 +654,8 @@ class RevokeTreeTests(tests.TestCase):
             events.append(
                 self._revoke_by_expiration(*args))
 
-            self.assertEqual(i + 2, len(self.tree.revoke_map
-                                        ['trust_id=*']
-                                        ['consumer_id=*']
-                                        ['access_token_id=*']
-                                        ['audit_id=*']
-                                        ['audit_chain_id=*']),
+            self.assertEqual(i + 1, len(self.tree.revoke_map
+                                        [('expires_at', 'user_id')]),
                              'adding %s to %s' % (args,
                                                   self.tree.revoke_map))
 
@@ -13,7 +13,10 @@
 # under the License.
 
 import datetime
+import os
 
+import fixtures
+import mock
 from oslo_config import cfg
 from oslo_utils import timeutils
 
@@ -780,6 +783,56 @@ class TestTokenProvider(tests.TestCase):
         self.assertIsNone(
             self.token_provider_api._is_valid_token(create_v3_token()))
 
+    def test_revocation_list_signed_once(self):
+        with mock.patch.object(token.provider.cmsutils, 'cms_sign_text',
+                               return_value='signed') as sign:
+            signed, etag = self.token_provider_api.get_signed_revocation_list()
+            self.assertEqual('signed', signed)
+            self.assertEqual(
+                (signed, etag),
+                self.token_provider_api.get_signed_revocation_list())
+            self.assertEqual(1, sign.call_count)
+
+            # A new generation alone doesn't cause the unchanged list to be
+            # signed again.
+            self.token_provider_api._persistence.invalidate_revocation_list()
+            self.assertEqual(
+                (signed, etag),
+                self.token_provider_api.get_signed_revocation_list())
+            self.assertEqual(1, sign.call_count)
+
+            token_id = 'revoked-token'
+            data = {'id': token_id, 'a': 'b',
+                    'expires': timeutils.utcnow() + datetime.timedelta(
+                        minutes=5),
+                    'user': {'id': 'testuserid'}}
+            self.token_provider_api._persistence.create_token(token_id, data)
+            self.token_provider_api._persistence.delete_token(token_id)
+            signed, new_etag = (
+                self.token_provider_api.get_signed_revocation_list())
+            self.assertNotEqual(etag, new_etag)
+            self.assertEqual(2, sign.call_count)
+
+    def test_revocation_list_signed_again_after_cert_rotation(self):
+        certfile = self.useFixture(fixtures.TempDir()).join('signing_cert.pem')
+        with open(certfile, 'w') as f:
+            f.write('old certificate')
+        self.config_fixture.config(group='signing', certfile=certfile)
+        with mock.patch.object(token.provider.cmsutils, 'cms_sign_text',
+                               side_effect=['signed', 'signed again']) as sign:
+            signed, etag = self.token_provider_api.get_signed_revocation_list()
+
+            # Replace the certificate, as if rotated, without changing the
+            # revocation list.
+            with open(certfile + '.new', 'w') as f:
+                f.write('new certificate')
+            os.rename(certfile + '.new', certfile)
+            new_signed, new_etag = (
+                self.token_provider_api.get_signed_revocation_list())
+            self.assertEqual('signed again', new_signed)
+            self.assertNotEqual(etag, new_etag)
+            self.assertEqual(2, sign.call_count)
+
 
 # NOTE(ayoung): renamed to avoid automatic test detection
 class PKIProviderTests(object):
@@ -1198,6 +1198,34 @@ class V2TestCase(RestfulTestCase, CoreApiTests, LegacyV2UsernameTests):
             expected_status=200)
         self.assertValidRevocationListResponse(r)
 
+    def test_fetch_revocation_list_not_modified(self):
+        token = self.get_scoped_token()
+        r = self.admin_request(
+            method='GET',
+            path='/v2.0/tokens/revoked',
+            token=token,
+            expected_status=200)
+        etag = r.headers['ETag']
+
+        self.admin_request(
+            method='GET',
+            path='/v2.0/tokens/revoked',
+            token=token,
+            headers={'If-None-Match': etag},
+            expected_status=304)
+
+        self.admin_request(method='DELETE',
+                           path='/v2.0/tokens/%s' % self.get_scoped_token(),
+                           token=token)
+        r = self.admin_request(
+            method='GET',
+            path='/v2.0/tokens/revoked',
+            token=token,
+            headers={'If-None-Match': etag},
+            expected_status=200)
+        self.assertValidRevocationListResponse(r)
+        self.assertNotEqual(etag, r.headers['ETag'])
+
     def assertValidRevocationListResponse(self, response):
         self.assertIsNotNone(response.result['signed'])
 
@@ -1386,6 +1414,9 @@ class RevokeApiTestCase(V2TestCase):
     def test_fetch_revocation_list_admin_200(self):
         self.skipTest('Revoke API disables revocation_list.')
 
+    def test_fetch_revocation_list_not_modified(self):
+        self.skipTest('Revoke API disables revocation_list.')
+
     def test_fetch_revocation_list_md5(self):
         self.skipTest('Revoke API disables revocation_list.')
 
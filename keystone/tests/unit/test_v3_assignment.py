@@ -14,6 +14,7 @@ import random
 import six
 import uuid
 
+import mock
 from oslo_config import cfg
 
 from keystone.common import controller
@@ -1748,6 +1749,43 @@ class AssignmentTestCase(test_v3.RestfulTestCase):
         self.assertRoleAssignmentInListResponse(r, up_entity)
         self.assertRoleAssignmentInListResponse(r, up1_entity)
 
+    def test_effective_user_filter_does_not_expand_whole_groups(self):
+        """Call ``GET /role_assignments?effective&user.id={user_id}``.
+
+        Filtering effective assignments by user should be answered from the
+        user's own group memberships, without listing every member of the
+        groups that hold assignments.
+
+        """
+        user1 = self.new_user_ref(domain_id=self.domain['id'])
+        user1 = self.identity_api.create_user(user1)
+        user2 = self.new_user_ref(domain_id=self.domain['id'])
+        user2 = self.identity_api.create_user(user2)
+        group1 = self.new_group_ref(domain_id=self.domain['id'])
+        group1 = self.identity_api.create_group(group1)
+        self.identity_api.add_user_to_group(user1['id'], group1['id'])
+        self.identity_api.add_user_to_group(user2['id'], group1['id'])
+
+        gp_entity = _build_role_assignment_entity(
+            project_id=self.project_id, group_id=group1['id'],
+            role_id=self.role_id)
+        self.put(gp_entity['links']['assignment'])
+
+        collection_url = ('/role_assignments?effective&user.id=%s' %
+                          user1['id'])
+        with mock.patch.object(self.identity_api,
+                               'list_users_in_group') as list_users:
+            r = self.get(collection_url)
+        self.assertFalse(list_users.called)
+        self.assertValidRoleAssignmentListResponse(r,
+                                                   expected_length=1,
+                                                   resource_url=collection_url)
+        up_entity = _build_role_assignment_entity(
+            link=gp_entity['links']['assignment'],
+            project_id=self.project_id, user_id=user1['id'],
+            role_id=self.role_id)
+        self.assertRoleAssignmentInListResponse(r, up_entity)
+
 
 class RoleAssignmentBaseTestCase(test_v3.RestfulTestCase):
     """Base class for testing /v3/role_assignments API behavior."""
@@ -2969,6 +3007,47 @@ class AssignmentInheritanceTestCase(test_v3.RestfulTestCase):
         inher_up_entity['scope']['project']['id'] = leaf_id
         self.assertRoleAssignmentInListResponse(r, inher_up_entity)
 
+    def test_get_effective_role_assignments_filtered_by_leaf_project(self):
+        """Call ``GET /role_assignments?effective&scope.project.id={leaf}``.
+
+        Test Plan:
+
+        - Create 2 roles
+        - Create a hierarchy of projects with one root and one leaf project
+        - Issue the URL to add a non-inherited user role to the root project
+        - Issue the URL to add an inherited user role to the root project
+        - Issue the URL to get effective role assignments on the leaf project -
+          this should return just 1 role (inherited) on the leaf project.
+
+        """
+        # Create default scenario
+        root_id, leaf_id, non_inherited_role_id, inherited_role_id = (
+            self._setup_hierarchical_projects_scenario())
+
+        # Grant non-inherited role
+        non_inher_up_entity = _build_role_assignment_entity(
+            project_id=root_id, user_id=self.user['id'],
+            role_id=non_inherited_role_id)
+        self.put(non_inher_up_entity['links']['assignment'])
+
+        # Grant inherited role
+        inher_up_entity = _build_role_assignment_entity(
+            project_id=root_id, user_id=self.user['id'],
+            role_id=inherited_role_id, inherited_to_projects=True)
+        self.put(inher_up_entity['links']['assignment'])
+
+        # Get effective role assignments on the leaf project
+        collection_url = ('/role_assignments?effective&scope.project.id=%s' %
+                          leaf_id)
+        r = self.get(collection_url)
+        self.assertValidRoleAssignmentListResponse(r,
+                                                   expected_length=1,
+                                                   resource_url=collection_url)
+
+        # Assert that the user has inherited role on leaf project
+        inher_up_entity['scope']['project']['id'] = leaf_id
+        self.assertRoleAssignmentInListResponse(r, inher_up_entity)
+
     def test_get_inherited_role_assignments_for_project_hierarchy(self):
         """Call ``GET /role_assignments?scope.OS-INHERIT:inherited_to``.
 
@@ -2609,6 +2609,50 @@ class TestAuth(test_v3.RestfulTestCase):
             password=self.default_domain_user['password'])
         self.v3_authenticate_token(auth_data, expected_status=401)
 
+    def test_validate_tokens(self):
+        auth_data = self.build_authentication_request(
+            user_id=self.user['id'],
+            password=self.user['password'],
+            project_id=self.project['id'])
+        token1 = self.get_requested_token(auth_data)
+        token2 = self.get_requested_token(auth_data)
+        revoked_token = self.get_requested_token(auth_data)
+        self.delete('/auth/tokens',
+                    headers={'X-Subject-Token': revoked_token},
+                    expected_status=204)
+
+        r = self.post(
+            '/auth/tokens/validate',
+            body={'tokens': [token1, uuid.uuid4().hex, revoked_token,
+                             token2]},
+            expected_status=200)
+        results = r.result['tokens']
+        self.assertEqual(4, len(results))
+        for token_data in (results[0], results[3]):
+            self.assertEqual(self.user['id'],
+                             token_data['token']['user']['id'])
+            self.assertEqual(self.project['id'],
+                             token_data['token']['project']['id'])
+            self.assertIn('catalog', token_data['token'])
+        self.assertNotEqual(results[0]['token']['audit_ids'],
+                            results[3]['token']['audit_ids'])
+        self.assertEqual(404, results[1]['error']['code'])
+        self.assertEqual(404, results[2]['error']['code'])
+
+    def test_validate_tokens_nocatalog(self):
+        token = self.get_requested_token(self.build_authentication_request(
+            user_id=self.user['id'],
+            password=self.user['password'],
+            project_id=self.project['id']))
+        r = self.post('/auth/tokens/validate?nocatalog',
+                      body={'tokens': [token]},
+                      expected_status=200)
+        self.assertNotIn('catalog', r.result['tokens'][0]['token'])
+
+    def test_validate_tokens_empty_batch_fails(self):
+        self.post('/auth/tokens/validate', body={'tokens': []},
+                  expected_status=400)
+
 
 class TestAuthJSONExternal(test_v3.RestfulTestCase):
     content_type = 'json'
@@ -4199,6 +4243,66 @@ class TestFernetTokenProvider(test_v3.RestfulTestCase):
         project_scoped_token = self._get_project_scoped_token()
         self._validate_token(project_scoped_token)
 
+    def test_project_scoped_token_data_is_assembled_once(self):
+        first_token = self._get_project_scoped_token()
+        second_token = self._get_project_scoped_token()
+        driver = self.token_provider_api.driver
+        helper = driver.v3_token_data_helper
+        first = driver.validate_v3_token(first_token)
+        with mock.patch.object(helper, 'get_token_data',
+                               wraps=helper.get_token_data) as get_token_data:
+            second = driver.validate_v3_token(second_token)
+        self.assertEqual(0, get_token_data.call_count)
+        self.assertEqual(first['token']['roles'], second['token']['roles'])
+        self.assertNotEqual(first['token']['audit_ids'],
+                            second['token']['audit_ids'])
+
+    def test_token_data_is_not_shared_without_cached_generations(self):
+        self.config_fixture.config(group='revoke', caching=False)
+        token = self._get_project_scoped_token()
+        driver = self.token_provider_api.driver
+        helper = driver.v3_token_data_helper
+        with mock.patch.object(helper, 'get_token_data',
+                               wraps=helper.get_token_data) as get_token_data:
+            with mock.patch.object(driver,
+                                   '_get_scoped_token_data') as memoized:
+                driver.validate_v3_token(token)
+                driver.validate_v3_token(token)
+        self.assertFalse(memoized.called)
+        self.assertEqual(2, get_token_data.call_count)
+
+    def test_project_scoped_token_data_includes_new_grant(self):
+        driver = self.token_provider_api.driver
+        driver.validate_v3_token(self._get_project_scoped_token())
+
+        role = self.new_role_ref()
+        self.role_api.create_role(role['id'], role)
+        self.assignment_api.add_role_to_user_and_project(
+            self.user['id'], self.project_id, role['id'])
+
+        token_data = driver.validate_v3_token(
+            self._get_project_scoped_token())
+        self.assertIn(role['id'],
+                      [r['id'] for r in token_data['token']['roles']])
+
+    def test_project_scoped_token_data_includes_new_group_grant(self):
+        driver = self.token_provider_api.driver
+        driver.validate_v3_token(self._get_project_scoped_token())
+
+        role = self.new_role_ref()
+        self.role_api.create_role(role['id'], role)
+        group = self.identity_api.create_group(
+            self.new_group_ref(domain_id=self.domain_id))
+        self.assignment_api.create_grant(
+            role['id'], group_id=group['id'], project_id=self.project_id)
+        driver.validate_v3_token(self._get_project_scoped_token())
+
+        self.identity_api.add_user_to_group(self.user['id'], group['id'])
+        token_data = driver.validate_v3_token(
+            self._get_project_scoped_token())
+        self.assertIn(role['id'],
+                      [r['id'] for r in token_data['token']['roles']])
+
     def test_validate_domain_scoped_token(self):
         # Grant user access to domain
         self.assignment_api.create_grant(self.role['id'],
@@ -10,12 +10,18 @@
 # License for the specific language governing permissions and limitations
 # under the License.
 
+import base64
+import hashlib
 import os
 import random
 import subprocess
 from testtools import matchers
 import uuid
 
+from cryptography.hazmat import backends
+from cryptography.hazmat.primitives.asymmetric import padding
+from cryptography.hazmat.primitives import hashes
+from cryptography import x509
 from lxml import etree
 import mock
 from oslo_config import cfg
@@ -3108,6 +3114,7 @@ class SAMLGenerationTests(FederationTests):
             # the assertion as is without signing it
             return assertion_content
 
+        self.config_fixture.config(group='saml', sign_in_process=False)
         with mock.patch('subprocess.check_output',
                         side_effect=mocked_subprocess_check_output):
             generator = keystone_idp.SAMLGenerator()
@@ -3151,6 +3158,54 @@ class SAMLGenerationTests(FederationTests):
         cert_text = cert_text.replace(os.linesep, '')
         self.assertEqual(idp_public_key, cert_text)
 
+    def test_saml_signing_in_process(self):
+        generator = keystone_idp.SAMLGenerator()
+        with mock.patch('subprocess.check_output') as check_output:
+            response = generator.samlize_token(self.ISSUER, self.RECIPIENT,
+                                               self.SUBJECT, self.ROLES,
+                                               self.PROJECT)
+        self.assertFalse(check_output.called)
+
+        signature = response.assertion.signature
+        idp_public_key = sigver.read_cert_from_file(CONF.saml.certfile, 'pem')
+        cert_text = signature.key_info.x509_data[0].x509_certificate.text
+        self.assertEqual(idp_public_key, cert_text)
+
+        # Check the digest and signature the way a service provider would.
+        assertion = etree.fromstring(response.assertion.to_string())
+        signature = assertion.find('{%s}Signature' % xmldsig.NAMESPACE)
+        assertion.remove(signature)
+        signed_info = signature.find('{%s}SignedInfo' % xmldsig.NAMESPACE)
+        digest_value = signed_info.find('.//{%s}DigestValue' %
+                                        xmldsig.NAMESPACE)
+        digest = hashlib.sha1(etree.tostring(
+            assertion, method='c14n', exclusive=True)).digest()
+        self.assertEqual(digest, base64.b64decode(digest_value.text))
+
+        with open(CONF.saml.certfile, 'rb') as f:
+            cert = x509.load_pem_x509_certificate(
+                f.read(), backends.default_backend())
+        signature_value = signature.find('{%s}SignatureValue' %
+                                         xmldsig.NAMESPACE)
+        cert.public_key().verify(
+            base64.b64decode(signature_value.text),
+            etree.tostring(signed_info, method='c14n', exclusive=True),
+            padding.PKCS1v15(), hashes.SHA1())
+
+    def test_saml_signing_falls_back_to_xmlsec1(self):
+        def mocked_subprocess_check_output(*popenargs, **kwargs):
+            with open(popenargs[0][-1], 'r') as f:
+                return f.read()
+
+        self.config_fixture.config(group='saml',
+                                   keyfile=CONF.saml.certfile)
+        with mock.patch('subprocess.check_output',
+                        side_effect=mocked_subprocess_check_output) as m:
+            generator = keystone_idp.SAMLGenerator()
+            generator.samlize_token(self.ISSUER, self.RECIPIENT,
+                                    self.SUBJECT, self.ROLES, self.PROJECT)
+        self.assertEqual(1, m.call_count)
+
     def _create_generate_saml_request(self, token_id, sp_id):
         return {
             "auth": {
@@ -173,6 +173,9 @@ FEDERATED_AUTH_URL = ('/OS-FEDERATION/identity_providers/{identity_provider}'
 V3_JSON_HOME_RESOURCES_INHERIT_DISABLED = {
     json_home.build_v3_resource_relation('auth_tokens'): {
         'href': '/auth/tokens'},
+    json_home.build_v3_resource_relation('auth_tokens_validate'): {
+        'href': '/auth/tokens/validate',
+        'hints': {'status': 'experimental'}},
     json_home.build_v3_resource_relation('auth_catalog'): {
         'href': '/auth/catalog'},
     json_home.build_v3_resource_relation('auth_projects'): {
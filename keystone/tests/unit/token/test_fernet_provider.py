@@ -11,17 +11,23 @@
 # under the License.
 
 import datetime
+import os
 import uuid
 
+from cryptography import fernet as crypto_fernet
+import mock
 from oslo_utils import timeutils
+from testtools import matchers
 
 from keystone.common import config
+from keystone.common import environment
 from keystone import exception
 from keystone.tests import unit as tests
 from keystone.tests.unit import ksfixtures
 from keystone.token import provider
 from keystone.token.providers import fernet
 from keystone.token.providers.fernet import token_formatters
+from keystone.token.providers.fernet import utils
 
 
 CONF = config.CONF
@@ -52,6 +58,64 @@ class TestFernetTokenProvider(tests.TestCase):
             uuid.uuid4().hex)
 
 
+class TestKeyRing(tests.TestCase):
+    def setUp(self):
+        super(TestKeyRing, self).setUp()
+        self.useFixture(ksfixtures.KeyRepository(self.config_fixture))
+        self.formatter = token_formatters.TokenFormatter()
+
+    def test_keys_are_loaded_once(self):
+        with mock.patch.object(utils, 'load_keys',
+                               wraps=utils.load_keys) as m:
+            for i in range(3):
+                token = self.formatter.pack(b'payload')
+                self.assertEqual(b'payload', self.formatter.unpack(token))
+            self.assertThat(m.call_count, matchers.LessThan(2))
+
+    def test_keys_are_reloaded_after_rotation(self):
+        token = self.formatter.pack(b'payload')
+        with mock.patch.object(utils, 'load_keys',
+                               wraps=utils.load_keys) as m:
+            utils.rotate_keys()
+            self.assertEqual(b'payload', self.formatter.unpack(token))
+            self.assertEqual(1, m.call_count)
+
+    def test_keys_are_reloaded_after_key_file_is_modified(self):
+        self.formatter.pack(b'payload')
+        key_repository = CONF.fernet_tokens.key_repository
+        primary_key_file = os.path.join(
+            key_repository, str(max(int(f) for f in os.listdir(
+                key_repository))))
+        directory_mtime = os.stat(key_repository).st_mtime
+        with open(primary_key_file, 'w') as f:
+            f.write(crypto_fernet.Fernet.generate_key().decode('utf-8'))
+        # Make sure the modification is noticed even on file systems with a
+        # coarse timestamp resolution, and that only the file changed.
+        key_stat_info = os.stat(primary_key_file)
+        os.utime(primary_key_file, (key_stat_info.st_atime,
+                                    key_stat_info.st_mtime + 10))
+        self.assertEqual(directory_mtime, os.stat(key_repository).st_mtime)
+
+        with mock.patch.object(utils, 'load_keys',
+                               wraps=utils.load_keys) as m:
+            self.formatter.pack(b'payload')
+            self.assertEqual(1, m.call_count)
+
+    def test_keys_are_reloaded_after_environment_reset(self):
+        token = self.formatter.pack(b'payload')
+        with mock.patch.object(utils, 'load_keys',
+                               wraps=utils.load_keys) as m:
+            environment.reset()
+            self.assertEqual(b'payload', self.formatter.unpack(token))
+            self.assertEqual(1, m.call_count)
+
+    def test_missing_keys_raises_keys_not_found(self):
+        utils.KEY_RING.reset()
+        with mock.patch.object(utils, 'load_keys', return_value=[]):
+            self.assertRaises(exception.KeysNotFound,
+                              self.formatter.pack, b'payload')
+
+
 class TestPayloads(tests.TestCase):
     def test_uuid_hex_to_byte_conversions(self):
         payload_cls = token_formatters.BasePayload
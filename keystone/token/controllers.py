@@ -12,13 +12,10 @@
 #    License for the specific language governing permissions and limitations
 #    under the License.
 
-import datetime
 import sys
 
-from keystoneclient.common import cms
 from oslo_config import cfg
 from oslo_log import log
-from oslo_serialization import jsonutils
 from oslo_utils import timeutils
 import six
 
@@ -457,19 +454,10 @@ class Auth(controller.V2Controller):
     def revocation_list(self, context, auth=None):
         if not CONF.token.revoke_by_id:
             raise exception.Gone()
-        tokens = self.token_provider_api.list_revoked_tokens()
-
-        for t in tokens:
-            expires = t['expires']
-            if expires and isinstance(expires, datetime.datetime):
-                t['expires'] = timeutils.isotime(expires)
-        data = {'revoked': tokens}
-        json_data = jsonutils.dumps(data)
-        signed_text = cms.cms_sign_text(json_data,
-                                        CONF.signing.certfile,
-                                        CONF.signing.keyfile)
-
-        return {'signed': signed_text}
+        signed_text, etag = (
+            self.token_provider_api.get_signed_revocation_list())
+        return wsgi.render_conditional_response(
+            context, {'signed': signed_text}, etag)
 
     @controller.v2_deprecated
     def endpoints(self, context, token_id):
@@ -15,6 +15,7 @@
 
 from __future__ import absolute_import
 import copy
+import datetime
 
 from oslo_config import cfg
 from oslo_log import log
@@ -31,6 +32,8 @@ from keystone.token import provider
 CONF = cfg.CONF
 LOG = log.getLogger(__name__)
 
+EPOCH = datetime.datetime(1970, 1, 1)
+
 
 class Token(token.persistence.Driver):
     """KeyValueStore backend for tokens.
@@ -42,6 +45,9 @@ class Token(token.persistence.Driver):
 
     revocation_key = 'revocation-list'
     kvs_backend = 'openstack.kvs.Memory'
+    # Width, in seconds, of the expiry windows the per-user token index is
+    # split into.
+    user_index_bucket_width = 300
 
     def __init__(self, backing_store=None, **kwargs):
         super(Token, self).__init__()
@@ -138,11 +144,43 @@ class Token(token.persistence.Driver):
 
         return data_copy
 
+    def _get_user_token_bucket_key(self, user_key, bucket):
+        return '%s-%d' % (user_key, bucket)
+
+    def _get_user_token_buckets_key(self, user_key):
+        return '%s-buckets' % user_key
+
+    def _get_expiry_bucket(self, expires):
+        """Return the index of the expiry window `expires` falls into."""
+        epoch = timeutils.normalize_time(expires) - EPOCH
+        return int(epoch.total_seconds()) // self.user_index_bucket_width
+
+    def _get_user_token_buckets(self, user_key):
+        return self._get_key_or_default(
+            self._get_user_token_buckets_key(user_key), default=[])
+
     def _get_user_token_list_with_expiry(self, user_key):
         """Return a list of tuples in the format (token_id, token_expiry) for
         the user_key.
         """
-        return self._get_key_or_default(user_key, default=[])
+        bucket_keys = [self._get_user_token_bucket_key(user_key, bucket)
+                       for bucket in self._get_user_token_buckets(user_key)]
+        if not bucket_keys:
+            # NOTE: tokens indexed before the index was split by expiry are
+            # found under the user_key itself, until the next token issued
+            # to the user moves them into buckets.
+            return list(self._get_key_or_default(user_key, default=[]))
+        token_list = []
+        try:
+            bucket_lists = self._store.get_multi(bucket_keys)
+        except exception.NotFound:
+            # Some of the buckets have expired or been evicted, fall back to
+            # fetching them one at a time.
+            bucket_lists = [self._get_key_or_default(key, default=[])
+                            for key in bucket_keys]
+        for bucket_list in bucket_lists:
+            token_list.extend(bucket_list)
+        return token_list
 
     def _get_user_token_list(self, user_key):
         """Return a list of token_ids for the user_key."""
@@ -153,39 +191,81 @@ class Token(token.persistence.Driver):
         return [t[0] for t in token_list]
 
     def _update_user_token_list(self, user_key, token_id, expires_isotime_str):
+        """Add a token to the user's index.
+
+        The index is split into buckets by token expiry so that adding a token
+        only rewrites the (small) list of tokens expiring around the same
+        time, whatever the number of tokens the user holds. Buckets are
+        dropped as a whole once every token in them has expired.
+
+        """
+        expires = timeutils.parse_isotime(expires_isotime_str)
+        bucket = self._get_expiry_bucket(expires)
+        bucket_key = self._get_user_token_bucket_key(user_key, bucket)
+
+        with self._store.get_lock(bucket_key) as lock:
+            token_list = self._get_key_or_default(bucket_key, default=[])
+            token_list.append((token_id, expires_isotime_str))
+            self._set_key(bucket_key, token_list, lock)
+
+        self._add_user_token_bucket(user_key, bucket)
+        return token_list
+
+    def _add_user_token_bucket(self, user_key, bucket):
+        """Record a bucket in the user's index, pruning expired buckets."""
+        if bucket in self._get_user_token_buckets(user_key):
+            return
+
         current_time = self._get_current_time()
-        revoked_token_list = set([t['id'] for t in
-                                  self.list_revoked_tokens()])
-
-        with self._store.get_lock(user_key) as lock:
-            filtered_list = []
-            token_list = self._get_user_token_list_with_expiry(user_key)
-            for item in token_list:
-                try:
-                    item_id, expires = self._format_token_index_item(item)
-                except (ValueError, TypeError):
-                    # NOTE(morganfainberg): Skip on expected errors
-                    # possibilities from the `_format_token_index_item` method.
-                    continue
-
-                if expires < current_time:
-                    LOG.debug(('Token `%(token_id)s` is expired, removing '
-                               'from `%(user_key)s`.'),
-                              {'token_id': item_id, 'user_key': user_key})
-                    continue
-
-                if item_id in revoked_token_list:
-                    # NOTE(morganfainberg): If the token has been revoked, it
-                    # can safely be removed from this list.  This helps to keep
-                    # the user_token_list as reasonably small as possible.
-                    LOG.debug(('Token `%(token_id)s` is revoked, removing '
-                               'from `%(user_key)s`.'),
-                              {'token_id': item_id, 'user_key': user_key})
-                    continue
-                filtered_list.append(item)
-            filtered_list.append((token_id, expires_isotime_str))
-            self._set_key(user_key, filtered_list, lock)
-            return filtered_list
+        current_bucket = self._get_expiry_bucket(current_time)
+        buckets_key = self._get_user_token_buckets_key(user_key)
+        with self._store.get_lock(buckets_key) as lock:
+            buckets = self._get_user_token_buckets(user_key)
+            migrate = not buckets
+            if migrate:
+                buckets = self._migrate_legacy_user_token_list(
+                    user_key, current_time)
+            expired = [b for b in buckets if b < current_bucket]
+            buckets = [b for b in buckets if b >= current_bucket]
+            if bucket not in buckets:
+                buckets.append(bucket)
+            self._set_key(buckets_key, sorted(buckets), lock)
+            if migrate:
+                # Only drop the legacy index once the buckets holding its
+                # tokens are recorded, so readers always find them.
+                self._store.delete_multi([user_key])
+
+        if expired:
+            LOG.debug('Removing expired token buckets %(buckets)s from '
+                      '`%(user_key)s`.',
+                      {'buckets': expired, 'user_key': user_key})
+            self._store.delete_multi(
+                [self._get_user_token_bucket_key(user_key, b)
+                 for b in expired])
+
+    def _migrate_legacy_user_token_list(self, user_key, current_time):
+        """Move the live tokens of a pre-bucket user index into buckets.
+
+        :returns: the buckets the tokens were added to
+
+        """
+        items_by_bucket = {}
+        for item in self._get_key_or_default(user_key, default=[]):
+            try:
+                token_id, expires = self._format_token_index_item(item)
+            except (TypeError, ValueError):
+                continue
+            if expires > current_time:
+                items_by_bucket.setdefault(
+                    self._get_expiry_bucket(expires), []).append(item)
+
+        for bucket, items in items_by_bucket.items():
+            bucket_key = self._get_user_token_bucket_key(user_key, bucket)
+            with self._store.get_lock(bucket_key) as lock:
+                token_list = self._get_key_or_default(bucket_key, default=[])
+                token_list.extend(items)
+                self._set_key(bucket_key, token_list, lock)
+        return list(items_by_bucket)
 
     def _get_current_time(self):
         return timeutils.normalize_time(timeutils.utcnow())
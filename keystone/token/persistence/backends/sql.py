@@ -29,6 +29,9 @@ from keystone.token import provider
 CONF = cfg.CONF
 LOG = log.getLogger(__name__)
 
+# Keep IN clauses well below the bound parameter limits of the backends.
+_USER_ID_BATCH_SIZE = 500
+
 
 class TokenModel(sql.ModelBase, sql.DictBase):
     __tablename__ = 'token'
@@ -153,6 +156,37 @@ class Token(token.persistence.Driver):
 
         return token_list
 
+    def delete_tokens_for_user_projects(self, user_projects):
+        """Deletes the tokens of many users in one session
+
+        Users are looked up in batches, rather than with one query per user
+        and project.
+
+        """
+        session = sql.get_session()
+        token_list = []
+        user_ids = list(user_projects)
+        with session.begin():
+            now = timeutils.utcnow()
+            for i in range(0, len(user_ids), _USER_ID_BATCH_SIZE):
+                query = session.query(TokenModel)
+                query = query.filter_by(valid=True)
+                query = query.filter(TokenModel.expires > now)
+                query = query.filter(TokenModel.user_id.in_(
+                    user_ids[i:i + _USER_ID_BATCH_SIZE]))
+
+                for token_ref in query.all():
+                    project_ids = user_projects[token_ref.user_id]
+                    if project_ids is not None:
+                        tenant = token_ref.to_dict().get('tenant')
+                        if not tenant or tenant.get('id') not in project_ids:
+                            continue
+
+                    token_ref.valid = False
+                    token_list.append(token_ref.id)
+
+        return token_list
+
     def _tenant_matches(self, tenant_id, token_ref_dict):
         return ((tenant_id is None) or
                 (token_ref_dict.get('tenant') and
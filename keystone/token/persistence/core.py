@@ -16,6 +16,7 @@
 
 import abc
 import copy
+import uuid
 
 from oslo_config import cfg
 from oslo_log import log
@@ -111,11 +112,21 @@ class PersistenceManager(manager.Manager):
     def list_revoked_tokens(self):
         return self.driver.list_revoked_tokens()
 
+    @REVOCATION_MEMOIZE
+    def get_revocation_list_generation(self):
+        """Return a marker that changes whenever the revocation list does.
+
+        Without caching a new marker is returned on every call.
+
+        """
+        return uuid.uuid4().hex
+
     def invalidate_revocation_list(self):
         # NOTE(morganfainberg): Note that ``self`` needs to be passed to
         # invalidate() because of the way the invalidation method works on
         # determining cache-keys.
         self.list_revoked_tokens.invalidate(self)
+        self.get_revocation_list_generation.invalidate(self)
 
     def delete_tokens_for_domain(self, domain_id):
         """Delete all tokens for a given domain.
@@ -182,6 +193,38 @@ class PersistenceManager(manager.Manager):
         for user_id in user_ids:
             self.delete_tokens_for_user(user_id, project_id=project_id)
 
+    def delete_tokens_for_user_projects(self, user_projects):
+        """Delete the tokens of many users, or user-project combinations.
+
+        The tokens are deleted from the backend in bulk and the revocation
+        list is invalidated once, rather than once per user and project.
+
+        :param user_projects: dict of user identifiers to a list of project
+                              identifiers, or to None to delete all of the
+                              user's tokens
+        """
+        if not CONF.token.revoke_by_id:
+            return
+        token_list = self.driver.delete_tokens_for_user_projects(
+            user_projects)
+        # Tokens scoped to trusts are not indexed by the user, see
+        # delete_tokens_for_user(). The trusts of all of the users are loaded
+        # at once.
+        trusts = self.trust_api.list_trusts_for_users(list(user_projects))
+        for trust in trusts:
+            for user_id in (trust['trustee_user_id'],
+                            trust['trustor_user_id']):
+                if user_id not in user_projects:
+                    continue
+                for project_id in user_projects[user_id] or [None]:
+                    token_list.extend(self.driver.delete_tokens(
+                        trust['trustee_user_id'], trust_id=trust['id'],
+                        tenant_id=project_id))
+        for token_id in token_list:
+            unique_id = self.token_provider_api.unique_id(token_id)
+            self._invalidate_individual_token_cache(unique_id)
+        self.invalidate_revocation_list()
+
     def _invalidate_individual_token_cache(self, token_id):
         # NOTE(morganfainberg): invalidate takes the exact same arguments as
         # the normal method, this means we need to pass "self" in (which gets
@@ -323,6 +366,23 @@ class Driver(object):
                 pass
         return token_list
 
+    def delete_tokens_for_user_projects(self, user_projects):
+        """Deletes the tokens of many users or user-project combinations.
+
+        :param user_projects: dict of user identifiers to a list of project
+                              identifiers, or to None to delete all of the
+                              user's tokens
+        :type user_projects: dict
+        :returns: The tokens that have been deleted.
+
+        """
+        token_list = []
+        for user_id, project_ids in six.iteritems(user_projects):
+            for project_id in project_ids or [None]:
+                token_list.extend(
+                    self.delete_tokens(user_id, tenant_id=project_id) or [])
+        return token_list
+
     @abc.abstractmethod
     def _list_tokens(self, user_id, tenant_id=None, trust_id=None,
                      consumer_id=None):
@@ -17,18 +17,23 @@
 import abc
 import base64
 import datetime
+import hashlib
 import sys
+import threading
 import uuid
 
 from keystoneclient.common import cms
 from oslo_config import cfg
 from oslo_log import log
+from oslo_serialization import jsonutils
 from oslo_utils import timeutils
 import six
 
 from keystone.common import cache
+from keystone.common import cmsutils
 from keystone.common import dependency
 from keystone.common import manager
+from keystone.common import signing
 from keystone import exception
 from keystone.i18n import _, _LE
 from keystone.models import token_model
@@ -120,6 +125,8 @@ class Manager(manager.Manager):
     def __init__(self):
         super(Manager, self).__init__(CONF.token.provider)
         self._register_callback_listeners()
+        self._signed_revocation_list = None
+        self._signed_revocation_list_lock = threading.Lock()
 
     def _register_callback_listeners(self):
         # This is used by the @dependency.provider decorator to register the
@@ -140,6 +147,8 @@ class Manager(manager.Manager):
                     self._delete_user_tokens_callback],
                 [notifications.INVALIDATE_USER_PROJECT_TOKEN_PERSISTENCE,
                     self._delete_user_project_tokens_callback],
+                [notifications.INVALIDATE_USERS_TOKEN_PERSISTENCE,
+                    self._delete_users_tokens_callback],
                 [notifications.INVALIDATE_USER_OAUTH_CONSUMER_TOKENS,
                     self._delete_user_oauth_consumer_tokens_callback],
             ]
@@ -255,6 +264,56 @@ class Manager(manager.Manager):
         self._is_valid_token(token)
         return token
 
+    def validate_v3_tokens(self, token_ids):
+        """Validate a batch of V3 tokens.
+
+        The token data of the whole batch is built by the provider in one go
+        and checked against the revocation list in a single pass.
+
+        :param token_ids: list of token identifiers
+        :returns: a list with, for each token in order, the token data or
+                  None if the token is not valid, has expired or has been
+                  revoked
+        """
+        if self._needs_persistence:
+            token_refs = []
+            for token_id in token_ids:
+                try:
+                    token_refs.append(
+                        self._persistence.get_token(self.unique_id(token_id)))
+                except exception.TokenNotFound:
+                    token_refs.append(None)
+        else:
+            token_refs = list(token_ids)
+
+        found = [i for i, ref in enumerate(token_refs) if ref is not None]
+        results = [None] * len(token_refs)
+        validated = self.driver.validate_v3_tokens(
+            [token_refs[i] for i in found])
+        for index, token in zip(found, validated):
+            results[index] = token
+
+        current_time = timeutils.normalize_time(timeutils.utcnow())
+        unexpired = []
+        for index, token in enumerate(results):
+            if token is None:
+                continue
+            expiry = timeutils.normalize_time(
+                timeutils.parse_isotime(token['token']['expires_at']))
+            if current_time < expiry:
+                unexpired.append(index)
+            else:
+                results[index] = None
+
+        token_values = [
+            self.revoke_api.model.build_token_values(results[i]['token'])
+            for i in unexpired]
+        revoked = self.revoke_api.check_tokens(token_values)
+        for index, is_revoked in zip(unexpired, revoked):
+            if is_revoked:
+                results[index] = None
+        return results
+
     @MEMOIZE
     def _validate_token(self, token_id):
         if not self._needs_persistence:
@@ -429,6 +488,67 @@ class Manager(manager.Manager):
     def list_revoked_tokens(self):
         return self._persistence.list_revoked_tokens()
 
+    def get_signed_revocation_list(self):
+        """Return the revocation list as signed for the auth_token middleware.
+
+        The signed document is kept for as long as neither the revocation
+        list nor the signing certificate and key change, so that it is not
+        re-signed for every poll.
+
+        :returns: a tuple of the signed document and an ETag for it. The ETag
+                  only depends on the contents of the revocation list and of
+                  the signing certificate.
+
+        """
+        generation = self._persistence.get_revocation_list_generation()
+        signing_fingerprint = signing.get_fingerprint(CONF.signing.certfile,
+                                                      CONF.signing.keyfile)
+        with self._signed_revocation_list_lock:
+            # NOTE: The cached tuple is (generation, signing fingerprint,
+            # certificate digest, signed document, ETag).
+            cached = self._signed_revocation_list
+            if cached is not None and cached[:2] == (generation,
+                                                     signing_fingerprint):
+                return cached[3], cached[4]
+
+            if cached is not None and cached[1] == signing_fingerprint:
+                cert_digest = cached[2]
+            else:
+                cert_digest = self._get_signing_cert_digest()
+
+            tokens = []
+            for t in self.list_revoked_tokens():
+                t = dict(t)
+                expires = t['expires']
+                if expires and isinstance(expires, datetime.datetime):
+                    t['expires'] = timeutils.isotime(expires)
+                tokens.append(t)
+            json_data = jsonutils.dumps({'revoked': tokens})
+            etag = hashlib.sha256(
+                json_data.encode('utf-8') + cert_digest).hexdigest()
+
+            # NOTE: without caching the generation changes on every call, so
+            # the contents decide whether the list needs to be signed again.
+            if (cached is not None and cached[1] == signing_fingerprint and
+                    cached[4] == etag):
+                signed_text = cached[3]
+            else:
+                signed_text = cmsutils.cms_sign_text(json_data,
+                                                     CONF.signing.certfile,
+                                                     CONF.signing.keyfile)
+            self._signed_revocation_list = (generation, signing_fingerprint,
+                                            cert_digest, signed_text, etag)
+            return signed_text, etag
+
+    @staticmethod
+    def _get_signing_cert_digest():
+        try:
+            with open(CONF.signing.certfile, 'rb') as f:
+                return hashlib.sha256(f.read()).digest()
+        except IOError:
+            # NOTE: signing fails without the certificate anyway.
+            return b''
+
     def _trust_deleted_event_callback(self, service, resource_type, operation,
                                       payload):
         if CONF.token.revoke_by_id:
@@ -457,6 +577,12 @@ class Manager(manager.Manager):
             self._persistence.delete_tokens_for_user(user_id=user_id,
                                                      project_id=project_id)
 
+    def _delete_users_tokens_callback(self, service, resource_type,
+                                      operation, payload):
+        if CONF.token.revoke_by_id:
+            self._persistence.delete_tokens_for_user_projects(
+                payload['resource_info'])
+
     def _delete_project_tokens_callback(self, service, resource_type,
                                         operation, payload):
         if CONF.token.revoke_by_id:
@@ -573,6 +699,25 @@ class Provider(object):
         """
         raise exception.NotImplemented()  # pragma: no cover
 
+    def validate_v3_tokens(self, token_refs):
+        """Validate a batch of V3 tokens and return their token data.
+
+        Providers able to share work between the tokens of a batch should
+        override this; by default every token is validated on its own.
+
+        :param token_refs: the token references
+        :type token_refs: list
+        :returns: a list with, for each token in order, the token data or
+                  None if the token is not valid
+        """
+        results = []
+        for token_ref in token_refs:
+            try:
+                results.append(self.validate_v3_token(token_ref))
+            except (exception.NotFound, exception.Unauthorized):
+                results.append(None)
+        return results
+
     @abc.abstractmethod
     def _get_token_id(self, token_data):
         """Generate the token_id based upon the data in token_data.
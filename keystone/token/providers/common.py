@@ -237,7 +237,7 @@ class V3TokenDataHelper(object):
         if project_id:
             roles = self.assignment_api.get_roles_for_user_and_project(
                 user_id, project_id)
-        return [self.role_api.get_role(role_id) for role_id in roles]
+        return self.role_api.list_roles_from_ids(sorted(roles))
 
     def _populate_roles_for_groups(self, group_ids,
                                    project_id=None, domain_id=None,
@@ -309,15 +309,10 @@ class V3TokenDataHelper(object):
             return
 
         if access_token:
-            filtered_roles = []
             authed_role_ids = jsonutils.loads(access_token['role_ids'])
-            all_roles = self.role_api.list_roles()
-            for role in all_roles:
-                for authed_role in authed_role_ids:
-                    if authed_role == role['id']:
-                        filtered_roles.append({'id': role['id'],
-                                               'name': role['name']})
-            token_data['roles'] = filtered_roles
+            roles = self.role_api.list_roles_from_ids(sorted(authed_role_ids))
+            token_data['roles'] = [{'id': role['id'], 'name': role['name']}
+                                   for role in roles]
             return
 
         if CONF.trust.enabled and trust:
@@ -336,11 +331,11 @@ class V3TokenDataHelper(object):
                                              token_project_id)
             filtered_roles = []
             if CONF.trust.enabled and trust:
+                roles_by_id = dict((role['id'], role) for role in roles)
                 for trust_role in trust['roles']:
-                    match_roles = [x for x in roles
-                                   if x['id'] == trust_role['id']]
-                    if match_roles:
-                        filtered_roles.append(match_roles[0])
+                    role = roles_by_id.get(trust_role['id'])
+                    if role is not None:
+                        filtered_roles.append(role)
                     else:
                         raise exception.Forbidden(
                             _('Trustee has no delegated roles.'))
@@ -10,9 +10,12 @@
 # License for the specific language governing permissions and limitations
 # under the License.
 
+import copy
+
 from oslo_config import cfg
 from oslo_log import log
 
+from keystone.common import cache
 from keystone.common import dependency
 from keystone.contrib import federation
 from keystone import exception
@@ -24,9 +27,15 @@ from keystone.token.providers.fernet import token_formatters as tf
 
 CONF = cfg.CONF
 LOG = log.getLogger(__name__)
+MEMOIZE = cache.get_memoization_decorator(section='token')
+
+# The scoped token data is only shared while the token cache and the
+# generation markers in its cache key are cached.
+_SHOULD_SHARE_TOKEN_DATA = [cache.get_should_cache_fn(section)
+                            for section in ('token', 'revoke', 'role')]
 
 
-@dependency.requires('trust_api')
+@dependency.requires('assignment_api', 'revoke_api', 'trust_api')
 class Provider(common.BaseProvider):
     def __init__(self, *args, **kwargs):
         super(Provider, self).__init__(*args, **kwargs)
@@ -237,27 +246,135 @@ class Provider(common.BaseProvider):
                                                  supported
 
         """
-        (user_id, methods, audit_ids, domain_id, project_id, trust_id,
-            federated_info, created_at, expires_at) = (
-                self.token_formatter.validate_token(token))
+        return self._get_v3_token_data(
+            *self.token_formatter.validate_token(token))
+
+    def _get_v3_token_data(self, user_id, methods, audit_ids, domain_id,
+                           project_id, trust_id, federated_info, created_at,
+                           expires_at):
+        """Build the V3 token data from the attributes of a token payload."""
+        return self._complete_token_data(
+            self._get_scoped_v3_token_data(user_id, methods, domain_id,
+                                           project_id, trust_id,
+                                           federated_info),
+            audit_ids, created_at, expires_at)
+
+    def _get_scoped_v3_token_data(self, user_id, methods, domain_id,
+                                  project_id, trust_id, federated_info):
+        """Return the V3 token data shared by the tokens of a scope.
+
+        The token data is the same for every token with the same user, scope
+        and methods except for the expiry, issue time and audit IDs, so it is
+        assembled once per scope and those fields are filled in per token by
+        _complete_token_data(). The result must not be modified.
 
+        """
+        args = (user_id, tuple(methods), domain_id, project_id, trust_id,
+                self._federated_info_key(federated_info))
+        if not all(should_cache(None)
+                   for should_cache in _SHOULD_SHARE_TOKEN_DATA):
+            # Without cached generation markers, every call would have a new
+            # cache key.
+            return self._build_scoped_token_data(*args)
+        return self._get_scoped_token_data(
+            *(args + (self._get_token_data_generation(),)))
+
+    def _complete_token_data(self, scoped_token_data, audit_ids, created_at,
+                             expires_at):
+        token_data = copy.deepcopy(scoped_token_data)
+        token_data['token']['expires_at'] = expires_at
+        token_data['token']['issued_at'] = created_at
+        token_data['token']['audit_ids'] = audit_ids
+        return token_data
+
+    def _get_token_data_generation(self):
+        # NOTE: Any revocation event or assignment change gives the scoped
+        # token data a new cache key, so a token never carries a role, trust
+        # or project its revocation checks would reject, nor misses a role
+        # granted since its scope was last assembled. Anything else is
+        # refreshed when the token cache expires, as for cached validations.
+        return (self.revoke_api.get_revoke_generation(),
+                self.assignment_api.get_assignment_generation())
+
+    @MEMOIZE
+    def _get_scoped_token_data(self, user_id, methods, domain_id, project_id,
+                               trust_id, federated_key, generation):
+        # NOTE: generation is not used directly, it is part of the arguments
+        # so that it is part of the cache key.
+        return self._build_scoped_token_data(user_id, methods, domain_id,
+                                             project_id, trust_id,
+                                             federated_key)
+
+    def _build_scoped_token_data(self, user_id, methods, domain_id,
+                                 project_id, trust_id, federated_key):
         token_dict = None
         trust_ref = None
-        if federated_info:
-            token_dict = self._rebuild_federated_info(federated_info, user_id)
+        if federated_key:
+            group_ids, idp_id, protocol_id = federated_key
+            token_dict = self._rebuild_federated_info(
+                dict(group_ids=[{'id': group_id} for group_id in group_ids],
+                     idp_id=idp_id, protocol_id=protocol_id),
+                user_id)
         if trust_id:
             trust_ref = self.trust_api.get_trust(trust_id)
 
         return self.v3_token_data_helper.get_token_data(
             user_id,
-            method_names=methods,
+            method_names=list(methods),
             domain_id=domain_id,
             project_id=project_id,
-            issued_at=created_at,
-            expires=expires_at,
             trust=trust_ref,
-            token=token_dict,
-            audit_info=audit_ids)
+            token=token_dict)
+
+    def validate_v3_tokens(self, tokens):
+        """Validate a batch of V3 formatted tokens.
+
+        All the tokens are decrypted with the same set of keys, and the token
+        data is only assembled once for every distinct user, scope and set of
+        methods in the batch; only the expiry, issue time and audit IDs
+        differ between tokens sharing them.
+
+        :param tokens: a list of strings describing the tokens to validate
+        :returns: a list with, for each token in order, the token data or None
+                  if the token is not valid
+
+        """
+        scoped_token_data = {}
+        results = []
+        for payload in self.token_formatter.validate_tokens(tokens):
+            if payload is None:
+                results.append(None)
+                continue
+
+            (user_id, methods, audit_ids, domain_id, project_id, trust_id,
+                federated_info, created_at, expires_at) = payload
+
+            scope = (user_id, tuple(methods), domain_id, project_id, trust_id,
+                     self._federated_info_key(federated_info))
+            if scope not in scoped_token_data:
+                try:
+                    scoped_token_data[scope] = (
+                        self._get_scoped_v3_token_data(
+                            user_id, methods, domain_id, project_id,
+                            trust_id, federated_info))
+                except (exception.NotFound, exception.Unauthorized,
+                        exception.Forbidden):
+                    scoped_token_data[scope] = None
+
+            if scoped_token_data[scope] is None:
+                results.append(None)
+                continue
+
+            results.append(self._complete_token_data(
+                scoped_token_data[scope], audit_ids, created_at, expires_at))
+        return results
+
+    def _federated_info_key(self, federated_info):
+        if not federated_info:
+            return None
+        return (tuple(g['id'] for g in federated_info['group_ids']),
+                federated_info['idp_id'],
+                federated_info['protocol_id'])
 
     def _get_token_id(self, token_data):
         """Generate the token_id based upon the data in token_data.
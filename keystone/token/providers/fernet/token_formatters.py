@@ -55,25 +55,25 @@ class TokenFormatter(object):
         ``encrypt(plaintext)`` and ``decrypt(ciphertext)``.
 
         """
-        keys = utils.load_keys()
-
-        if not keys:
-            raise exception.KeysNotFound()
-
-        fernet_instances = [fernet.Fernet(key) for key in utils.load_keys()]
-        return fernet.MultiFernet(fernet_instances)
+        return utils.KEY_RING.crypto
 
     def pack(self, payload):
         """Pack a payload for transport as a token."""
         # base64 padding (if any) is not URL-safe
         return urllib.parse.quote(self.crypto.encrypt(payload))
 
-    def unpack(self, token):
-        """Unpack a token, and validate the payload."""
+    def unpack(self, token, crypto=None):
+        """Unpack a token, and validate the payload.
+
+        :param crypto: optional, the cryptography instance to use instead of
+                       ``self.crypto``
+
+        """
         token = urllib.parse.unquote(six.binary_type(token))
+        crypto = crypto or self.crypto
 
         try:
-            return self.crypto.decrypt(token)
+            return crypto.decrypt(token)
         except fernet.InvalidToken as e:
             raise exception.Unauthorized(six.text_type(e))
 
@@ -153,13 +153,13 @@ class TokenFormatter(object):
 
         return token
 
-    def validate_token(self, token):
+    def validate_token(self, token, crypto=None):
         """Validates a Fernet token and returns the payload attributes."""
         # Convert v2 unicode token to a string
         if not isinstance(token, six.binary_type):
             token = token.encode('ascii')
 
-        serialized_payload = self.unpack(token)
+        serialized_payload = self.unpack(token, crypto=crypto)
         versioned_payload = msgpack.unpackb(serialized_payload)
         version, payload = versioned_payload[0], versioned_payload[1:]
 
@@ -200,6 +200,23 @@ class TokenFormatter(object):
         return (user_id, methods, audit_ids, domain_id, project_id, trust_id,
                 federated_info, created_at, expires_at)
 
+    def validate_tokens(self, tokens):
+        """Validates a batch of Fernet tokens using the same set of keys.
+
+        :returns: a list with, for each token in order, the payload attributes
+                  as returned by ``validate_token()`` or None if the token is
+                  not valid
+
+        """
+        crypto = self.crypto
+        results = []
+        for token in tokens:
+            try:
+                results.append(self.validate_token(token, crypto=crypto))
+            except (exception.Unauthorized, ValueError):
+                results.append(None)
+        return results
+
 
 class BasePayload(object):
     # each payload variant should have a unique version
@@ -12,11 +12,14 @@
 
 import os
 import stat
+import threading
 
 from cryptography import fernet
 from oslo_config import cfg
 from oslo_log import log
 
+from keystone.common import environment
+from keystone import exception
 from keystone.i18n import _LE, _LW, _LI
 
 
@@ -214,6 +217,10 @@ def rotate_keys(keystone_user_id=None, keystone_group_id=None):
     for i in excess_keys:
         os.remove(key_files[i])
 
+    # don't rely on the directory timestamp to notice a rotation done by this
+    # very process
+    KEY_RING.reset()
+
 
 def load_keys():
     """Load keys from disk into a list.
@@ -241,3 +248,79 @@ def load_keys():
 
     # return the encryption_keys, sorted by key number, descending
     return [keys[x] for x in sorted(keys.keys(), reverse=True)]
+
+
+class KeyRing(object):
+    """Process-wide cache of the keys in the key repository.
+
+    Keys are loaded from disk once and only reloaded when the key repository
+    directory or any key file in it is replaced, added, removed or modified,
+    or when ``reset()`` is called, e.g. on SIGHUP.
+
+    The key ring implements ``encrypt(plaintext)`` and
+    ``decrypt(ciphertext)`` using the primary key for encryption and all
+    active keys for decryption.
+
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._fingerprint = None
+        self._crypto = None
+
+    def _get_fingerprint(self):
+        key_repository = CONF.fernet_tokens.key_repository
+        try:
+            stat_info = os.stat(key_repository)
+            key_files = []
+            # NOTE: A key file written in place, rather than renamed into the
+            # repository, doesn't change the directory's modification time.
+            for filename in sorted(os.listdir(key_repository)):
+                key_stat_info = os.stat(
+                    os.path.join(key_repository, filename))
+                key_files.append((filename, key_stat_info.st_ino,
+                                  key_stat_info.st_mtime))
+        except OSError:
+            return None
+        return (key_repository, stat_info.st_ino, stat_info.st_mtime,
+                tuple(key_files))
+
+    @property
+    def crypto(self):
+        """Return a MultiFernet built from the current keys.
+
+        :raises keystone.exception.KeysNotFound: if no keys can be loaded
+
+        """
+        fingerprint = self._get_fingerprint()
+        crypto = self._crypto
+        if (crypto is not None and fingerprint is not None and
+                fingerprint == self._fingerprint):
+            return crypto
+
+        with self._lock:
+            keys = load_keys()
+            if not keys:
+                self.reset()
+                raise exception.KeysNotFound()
+
+            crypto = fernet.MultiFernet([fernet.Fernet(key) for key in keys])
+            self._crypto = crypto
+            self._fingerprint = fingerprint
+        return crypto
+
+    def reset(self):
+        """Forget the loaded keys so they are read again on next use."""
+        self._crypto = None
+        self._fingerprint = None
+
+    def encrypt(self, plaintext):
+        return self.crypto.encrypt(plaintext)
+
+    def decrypt(self, ciphertext):
+        return self.crypto.decrypt(ciphertext)
+
+
+KEY_RING = KeyRing()
+# Reload the keys when the server is reset, e.g. on SIGHUP.
+environment.register_reset_callback(KEY_RING.reset)
@@ -12,11 +12,11 @@
 
 """Keystone Compressed PKI Token Provider"""
 
-from keystoneclient.common import cms
 from oslo_config import cfg
 from oslo_log import log
 from oslo_serialization import jsonutils
 
+from keystone.common import cmsutils
 from keystone.common import environment
 from keystone.common import utils
 from keystone import exception
@@ -38,9 +38,9 @@ class Provider(common.BaseProvider):
             # str()
             # TODO(ayoung): Make to a byte_str for Python3
             token_json = jsonutils.dumps(token_data, cls=utils.PKIEncoder)
-            token_id = str(cms.pkiz_sign(token_json,
-                                         CONF.signing.certfile,
-                                         CONF.signing.keyfile))
+            token_id = str(cmsutils.pkiz_sign(token_json,
+                                              CONF.signing.certfile,
+                                              CONF.signing.keyfile))
             return token_id
         except environment.subprocess.CalledProcessError:
             LOG.exception(ERROR_MESSAGE)
@@ -12,10 +12,11 @@
 # License for the specific language governing permissions and limitations
 # under the License.
 
-import time
+import collections
 
 from oslo_log import log
 from oslo_utils import timeutils
+import sqlalchemy
 
 from keystone.common import sql
 from keystone import exception
@@ -23,9 +24,6 @@ from keystone import trust
 
 
 LOG = log.getLogger(__name__)
-# The maximum number of iterations that will be attempted for optimistic
-# locking on consuming a limited-use trust.
-MAXIMUM_CONSUME_ATTEMPTS = 10
 
 
 class TrustModel(sql.ModelBase, sql.DictBase):
@@ -81,52 +79,35 @@ class Trust(trust.Driver):
 
     @sql.handle_conflicts(conflict_type='trust')
     def consume_use(self, trust_id):
+        with sql.transaction() as session:
+            try:
+                query_result = (session.query(TrustModel.remaining_uses).
+                                filter_by(id=trust_id).
+                                filter_by(deleted_at=None).one())
+            except sql.NotFound:
+                raise exception.TrustNotFound(trust_id=trust_id)
 
-        for attempt in range(MAXIMUM_CONSUME_ATTEMPTS):
-            with sql.transaction() as session:
-                try:
-                    query_result = (session.query(TrustModel.remaining_uses).
-                                    filter_by(id=trust_id).
-                                    filter_by(deleted_at=None).one())
-                except sql.NotFound:
-                    raise exception.TrustNotFound(trust_id=trust_id)
-
-                remaining_uses = query_result.remaining_uses
-
-                if remaining_uses is None:
-                    # unlimited uses, do nothing
-                    break
-                elif remaining_uses > 0:
-                    # NOTE(morganfainberg): use an optimistic locking method
-                    # to ensure we only ever update a trust that has the
-                    # expected number of remaining uses.
-                    rows_affected = (
-                        session.query(TrustModel).
-                        filter_by(id=trust_id).
-                        filter_by(deleted_at=None).
-                        filter_by(remaining_uses=remaining_uses).
-                        update({'remaining_uses': (remaining_uses - 1)},
-                               synchronize_session=False))
-                    if rows_affected == 1:
-                        # Successfully consumed a single limited-use trust.
-                        # Since trust_id is the PK on the Trust table, there is
-                        # no case we should match more than 1 row in the
-                        # update. We either update 1 row or 0 rows.
-                        break
-                else:
-                    raise exception.TrustUseLimitReached(trust_id=trust_id)
-            # NOTE(morganfainberg): Ensure we have a yield point for eventlet
-            # here. This should cost us nothing otherwise. This can be removed
-            # if/when oslo_db cleanly handles yields on db calls.
-            time.sleep(0)
-        else:
-            # NOTE(morganfainberg): In the case the for loop is not prematurely
-            # broken out of, this else block is executed. This means the trust
-            # was not unlimited nor was it consumed (we hit the maximum
-            # iteration limit). This is just an indicator that we were unable
-            # to get the optimistic lock rather than silently failing or
-            # incorrectly indicating a trust was consumed.
-            raise exception.TrustConsumeMaximumAttempt(trust_id=trust_id)
+            if query_result.remaining_uses is None:
+                # unlimited uses, do nothing
+                return
+
+            # NOTE: Decrement in the database with a single conditional
+            # UPDATE rather than writing back a value read earlier. The
+            # database serializes concurrent consumers on the row, so every
+            # one of them either takes a use or finds none left, and none
+            # has to retry.
+            rows_affected = (
+                session.query(TrustModel).
+                filter_by(id=trust_id).
+                filter_by(deleted_at=None).
+                filter(TrustModel.remaining_uses > 0).
+                update({'remaining_uses': TrustModel.remaining_uses - 1},
+                       synchronize_session=False))
+            if rows_affected != 1:
+                # Since trust_id is the PK on the Trust table we either
+                # update 1 row or 0 rows, the latter meaning the uses ran
+                # out (possibly to a concurrent consumer).
+                raise exception.TrustUseLimitReached(trust_id=trust_id)
 
     def get_trust(self, trust_id, deleted=False):
         session = sql.get_session()
@@ -149,6 +130,32 @@ class Trust(trust.Driver):
         self._add_roles(trust_id, session, trust_dict)
         return trust_dict
 
+    def get_trust_pedigree(self, trust_id):
+        session = sql.get_session()
+        trust_chain = []
+        next_id = trust_id
+        # NOTE: redelegated_trust_id is kept in the extra column, so the
+        # chain is followed one primary key lookup per hop; its length is
+        # bounded by the maximum redelegation count.
+        while next_id:
+            ref = (session.query(TrustModel).
+                   filter_by(id=next_id).
+                   filter_by(deleted_at=None).first())
+            if ref is None:
+                raise exception.TrustNotFound(trust_id=next_id)
+            trust_chain.append(ref.to_dict())
+            next_id = trust_chain[-1].get('redelegated_trust_id')
+
+        roles = collections.defaultdict(list)
+        trust_roles = (session.query(TrustRole).
+                       filter(TrustRole.trust_id.in_(
+                           [t['id'] for t in trust_chain])))
+        for trust_role in trust_roles:
+            roles[trust_role.trust_id].append({'id': trust_role.role_id})
+        for t in trust_chain:
+            t['roles'] = roles[t['id']]
+        return trust_chain
+
     @sql.handle_conflicts(conflict_type='trust')
     def list_trusts(self):
         session = sql.get_session()
@@ -171,6 +178,18 @@ class Trust(trust.Driver):
                   filter_by(trustor_user_id=trustor_user_id))
         return [trust_ref.to_dict() for trust_ref in trusts]
 
+    @sql.handle_conflicts(conflict_type='trust')
+    def list_trusts_for_users(self, user_ids):
+        if not user_ids:
+            return []
+        session = sql.get_session()
+        trusts = (session.query(TrustModel).
+                  filter_by(deleted_at=None).
+                  filter(sqlalchemy.or_(
+                      TrustModel.trustee_user_id.in_(user_ids),
+                      TrustModel.trustor_user_id.in_(user_ids))))
+        return [trust_ref.to_dict() for trust_ref in trusts]
+
     @sql.handle_conflicts(conflict_type='trust')
     def delete_trust(self, trust_id):
         with sql.transaction() as session:
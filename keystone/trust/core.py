@@ -15,11 +15,13 @@
 """Main entry point into the Identity service."""
 
 import abc
+import copy
 
 from oslo_config import cfg
 from oslo_log import log
 import six
 
+from keystone.common import cache
 from keystone.common import dependency
 from keystone.common import manager
 from keystone import exception
@@ -30,6 +32,7 @@ from keystone import notifications
 CONF = cfg.CONF
 
 LOG = log.getLogger(__name__)
+MEMOIZE = cache.get_memoization_decorator(section='trust')
 
 
 @dependency.requires('identity_api')
@@ -86,25 +89,17 @@ class Manager(manager.Manager):
             raise exception.Forbidden(
                 _('Some of requested roles are not in redelegated trust'))
 
+    @MEMOIZE
     def get_trust_pedigree(self, trust_id):
-        trust = self.driver.get_trust(trust_id)
-        trust_chain = [trust]
-        if trust and trust.get('redelegated_trust_id'):
-            trusts = self.driver.list_trusts_for_trustor(
-                trust['trustor_user_id'])
-            while trust_chain[-1].get('redelegated_trust_id'):
-                for t in trusts:
-                    if t['id'] == trust_chain[-1]['redelegated_trust_id']:
-                        trust_chain.append(t)
-                        break
-
-        return trust_chain
+        return self.driver.get_trust_pedigree(trust_id)
 
     def get_trust(self, trust_id, deleted=False):
         trust = self.driver.get_trust(trust_id, deleted)
 
         if trust and trust.get('redelegated_trust_id') and not deleted:
-            trust_chain = self.get_trust_pedigree(trust_id)
+            # NOTE: the validation below may fill in the expiry of trusts
+            # in the chain, so it works on a copy of the cached pedigree.
+            trust_chain = copy.deepcopy(self.get_trust_pedigree(trust_id))
 
             for parent, child in zip(trust_chain[1:], trust_chain):
                 self._validate_redelegation(parent, child)
@@ -194,6 +189,7 @@ class Manager(manager.Manager):
 
         # end recursion
         self.driver.delete_trust(trust_id)
+        self.get_trust_pedigree.invalidate(self, trust_id)
 
         notifications.Audit.deleted(self._TRUST, trust_id, initiator)
 
@@ -221,6 +217,30 @@ class Driver(object):
         """
         raise exception.NotImplemented()  # pragma: no cover
 
+    def get_trust_pedigree(self, trust_id):
+        """Get a trust and the chain of trusts it was redelegated from.
+
+        :param trust_id: the trust identifier
+        :type trust_id: string
+        :returns: a list of trusts, starting with the given trust and
+                  followed by the trust each one was redelegated from
+        :raises: keystone.exception.TrustNotFound if any trust in the chain
+                 does not exist or is deleted
+
+        """
+        trust_chain = []
+        next_id = trust_id
+        while next_id:
+            # NOTE: Trusts further up the chain are returned even if they
+            # have expired, so that the caller can tell why the chain isn't
+            # valid any more.
+            trust = self.get_trust(next_id, deleted=True)
+            if trust.get('deleted_at'):
+                raise exception.TrustNotFound(trust_id=next_id)
+            trust_chain.append(trust)
+            next_id = trust.get('redelegated_trust_id')
+        return trust_chain
+
     @abc.abstractmethod
     def list_trusts(self):
         raise exception.NotImplemented()  # pragma: no cover
@@ -233,6 +253,23 @@ class Driver(object):
     def list_trusts_for_trustor(self, trustor):
         raise exception.NotImplemented()  # pragma: no cover
 
+    def list_trusts_for_users(self, user_ids):
+        """List the trusts that any of the given users is a party to.
+
+        :param user_ids: identifiers of the trustors and trustees
+        :type user_ids: list
+        :returns: a list of trusts in which any of the users is either the
+                  trustor or the trustee, each listed once
+
+        """
+        trusts = {}
+        for user_id in user_ids:
+            for trust in self.list_trusts_for_trustee(user_id):
+                trusts[trust['id']] = trust
+            for trust in self.list_trusts_for_trustor(user_id):
+                trusts[trust['id']] = trust
+        return list(trusts.values())
+
     @abc.abstractmethod
     def delete_trust(self, trust_id):
         raise exception.NotImplemented()  # pragma: no cover
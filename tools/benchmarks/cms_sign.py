@@ -0,0 +1,81 @@
+#!/usr/bin/env python
+
+# Licensed under the Apache License, Version 2.0 (the "License"); you may
+# not use this file except in compliance with the License. You may obtain
+# a copy of the License at
+#
+#      http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS, WITHOUT
+# WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the
+# License for the specific language governing permissions and limitations
+# under the License.
+
+"""Micro-benchmark for signing PKI tokens.
+
+Reports how many PKI and PKIZ tokens a single core can sign by running the
+openssl command, as keystoneclient does, and in-process, and checks that
+both produce the same tokens.
+
+Usage: python tools/benchmarks/cms_sign.py [--certfile F] [--keyfile F]
+                                           [--tokens N] [--size N]
+
+"""
+
+from __future__ import print_function
+
+import argparse
+import timeit
+
+from keystoneclient.common import cms
+from oslo_serialization import jsonutils
+
+from keystone.common import cmsutils
+from keystone import config
+
+
+CONF = config.CONF
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--certfile',
+                        default='examples/pki/certs/signing_cert.pem')
+    parser.add_argument('--keyfile',
+                        default='examples/pki/private/signing_key.pem')
+    parser.add_argument('--tokens', type=int, default=200)
+    parser.add_argument('--size', type=int, default=20,
+                        help='number of catalog entries in the token')
+    args = parser.parse_args()
+
+    CONF([], project='keystone', default_config_files=[])
+
+    token_json = jsonutils.dumps({'access': {
+        'token': {'id': 'placeholder', 'expires': '2015-01-01T00:00:00Z'},
+        'serviceCatalog': [
+            {'type': 'service%d' % i,
+             'endpoints': [{'publicURL': 'http://localhost:%d/v2' % i}]}
+            for i in range(args.size)]}})
+
+    for name, openssl_sign, in_process_sign in [
+            ('pki', cms.cms_sign_token, cmsutils.cms_sign_token),
+            ('pkiz', cms.pkiz_sign, cmsutils.pkiz_sign)]:
+        expected = openssl_sign(token_json, args.certfile, args.keyfile)
+        actual = in_process_sign(token_json, args.certfile, args.keyfile)
+        if expected != actual:
+            print('%s: in-process token differs from openssl' % name)
+
+        openssl = timeit.timeit(
+            lambda: openssl_sign(token_json, args.certfile, args.keyfile),
+            number=args.tokens)
+        in_process = timeit.timeit(
+            lambda: in_process_sign(token_json, args.certfile, args.keyfile),
+            number=args.tokens)
+        print('%s token of %d bytes' % (name, len(actual)))
+        print('  openssl:    %10.1f tokens/s' % (args.tokens / openssl))
+        print('  in-process: %10.1f tokens/s' % (args.tokens / in_process))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,66 @@
+#!/usr/bin/env python
+
+# Licensed under the Apache License, Version 2.0 (the "License"); you may
+# not use this file except in compliance with the License. You may obtain
+# a copy of the License at
+#
+#      http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS, WITHOUT
+# WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the
+# License for the specific language governing permissions and limitations
+# under the License.
+
+"""Micro-benchmark for checking user passwords.
+
+Reports how many password checks a single core can do against a stored
+hash, both in full and once the password has been remembered by the
+verified password cache.
+
+Usage: python tools/benchmarks/password_check.py [--rounds N] [--checks N]
+
+"""
+
+from __future__ import print_function
+
+import argparse
+import timeit
+import uuid
+
+from keystone.common import utils
+from keystone import config
+
+
+CONF = config.CONF
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--rounds', type=int, default=40000,
+                        help='crypt_strength used to hash the password')
+    parser.add_argument('--checks', type=int, default=20)
+    args = parser.parse_args()
+
+    CONF([], project='keystone', default_config_files=[])
+    CONF.set_override('crypt_strength', args.rounds)
+
+    password = uuid.uuid4().hex
+    hashed = utils.hash_password(password)
+    cache = utils.VerifiedPasswordCache(1)
+    user_id = uuid.uuid4().hex
+
+    full = timeit.timeit(
+        lambda: utils.check_password(password, hashed), number=args.checks)
+    cache.check_password(user_id, password, hashed)
+    cached = timeit.timeit(
+        lambda: cache.check_password(user_id, password, hashed),
+        number=args.checks)
+
+    print('%d rounds of sha512_crypt' % args.rounds)
+    print('full check:   %10.1f checks/s' % (args.checks / full))
+    print('cached check: %10.1f checks/s' % (args.checks / cached))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,89 @@
+#!/usr/bin/env python
+
+# Licensed under the Apache License, Version 2.0 (the "License"); you may
+# not use this file except in compliance with the License. You may obtain
+# a copy of the License at
+#
+#      http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS, WITHOUT
+# WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the
+# License for the specific language governing permissions and limitations
+# under the License.
+
+"""Micro-benchmark for checking tokens against the revocation tree.
+
+Fills a RevokeTree with a mix of revocation events and reports how long it
+takes to check a token that is not revoked, both the first time it is seen
+and once its verdict has been cached.
+
+Usage: python tools/benchmarks/revoke_tree.py [--events N] [--checks N]
+
+"""
+
+from __future__ import print_function
+
+import argparse
+import datetime
+import timeit
+import uuid
+
+from keystone.contrib.revoke import model
+
+
+def _new_id():
+    return uuid.uuid4().hex
+
+
+def build_tree(count):
+    tree = model.RevokeTree()
+    expires_at = datetime.datetime.utcnow() + datetime.timedelta(hours=1)
+    makers = [
+        lambda: model.RevokeEvent(user_id=_new_id()),
+        lambda: model.RevokeEvent(audit_id=_new_id()),
+        lambda: model.RevokeEvent(project_id=_new_id(), role_id=_new_id()),
+        lambda: model.RevokeEvent(user_id=_new_id(), project_id=_new_id()),
+        lambda: model.RevokeEvent(user_id=_new_id(), expires_at=expires_at),
+        lambda: model.RevokeEvent(domain_id=_new_id(), role_id=_new_id()),
+    ]
+    for i in range(count):
+        tree.add_event(makers[i % len(makers)]())
+    return tree
+
+
+def sample_token():
+    token_data = model.blank_token_data(
+        datetime.datetime.utcnow() - datetime.timedelta(minutes=5))
+    token_data.update(user_id=_new_id(),
+                      project_id=_new_id(),
+                      identity_domain_id=_new_id(),
+                      assignment_domain_id=_new_id(),
+                      audit_id=_new_id(),
+                      audit_chain_id=_new_id(),
+                      expires_at=datetime.datetime.utcnow(),
+                      roles=[_new_id() for i in range(5)])
+    return token_data
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--events', type=int, default=50000)
+    parser.add_argument('--checks', type=int, default=10000)
+    args = parser.parse_args()
+
+    tree = build_tree(args.events)
+    tokens = [sample_token() for i in range(args.checks)]
+
+    uncached = timeit.timeit(
+        lambda: [tree.is_revoked(t) for t in tokens], number=1)
+    cached = timeit.timeit(
+        lambda: [tree.is_revoked(t) for t in tokens], number=1)
+
+    print('%d events, %d shapes' % (args.events, len(tree.revoke_map)))
+    print('first check:  %.2f us/token' % (uncached / args.checks * 1e6))
+    print('cached check: %.2f us/token' % (cached / args.checks * 1e6))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,78 @@
+#!/usr/bin/env python
+
+# Licensed under the Apache License, Version 2.0 (the "License"); you may
+# not use this file except in compliance with the License. You may obtain
+# a copy of the License at
+#
+#      http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS, WITHOUT
+# WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the
+# License for the specific language governing permissions and limitations
+# under the License.
+
+"""Micro-benchmark for generating signed SAML assertions.
+
+Reports how many signed assertions a single core can generate, as for
+keystone to keystone federation, when signing in-process and, if it is
+installed, by running xmlsec1.
+
+Usage: python tools/benchmarks/saml_sign.py [--certfile F] [--keyfile F]
+                                            [--assertions N] [--roles N]
+
+"""
+
+from __future__ import print_function
+
+import argparse
+import distutils.spawn
+import timeit
+
+from keystone.contrib.federation import idp
+from keystone import config
+
+
+CONF = config.CONF
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--certfile',
+                        default='examples/pki/certs/signing_cert.pem')
+    parser.add_argument('--keyfile',
+                        default='examples/pki/private/signing_key.pem')
+    parser.add_argument('--assertions', type=int, default=200)
+    parser.add_argument('--roles', type=int, default=5,
+                        help='number of roles in each assertion')
+    args = parser.parse_args()
+
+    CONF([], project='keystone', default_config_files=[])
+    CONF.set_override('certfile', args.certfile, group='saml')
+    CONF.set_override('keyfile', args.keyfile, group='saml')
+
+    roles = ['role%d' % i for i in range(args.roles)]
+
+    def generate():
+        idp.SAMLGenerator().samlize_token(
+            'https://keystone.example.com/v3/OS-FEDERATION/saml2/idp',
+            'https://sp.example.com/Shibboleth.sso/SAML2/ECP',
+            'user', roles, 'project')
+
+    modes = [('in-process', True)]
+    if distutils.spawn.find_executable(CONF.saml.xmlsec1_binary):
+        modes.append(('xmlsec1', False))
+    else:
+        print('%s not found, only signing in-process' %
+              CONF.saml.xmlsec1_binary)
+
+    print('assertions with %d roles' % args.roles)
+    for name, sign_in_process in modes:
+        CONF.set_override('sign_in_process', sign_in_process, group='saml')
+        elapsed = timeit.timeit(generate, number=args.assertions)
+        print('  %-11s %10.1f assertions/s' %
+              (name + ':', args.assertions / elapsed))
+
+
+if __name__ == '__main__':
+    main()
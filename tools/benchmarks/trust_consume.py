@@ -0,0 +1,129 @@
+#!/usr/bin/env python
+
+# Licensed under the Apache License, Version 2.0 (the "License"); you may
+# not use this file except in compliance with the License. You may obtain
+# a copy of the License at
+#
+#      http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS, WITHOUT
+# WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the
+# License for the specific language governing permissions and limitations
+# under the License.
+
+"""Contention benchmark for consuming uses of a limited-use trust.
+
+Starts a number of concurrent consumers that all take uses of the same
+trust through the SQL trust driver, and reports the throughput and how
+many attempts failed, by exception. The trust has exactly enough uses for
+every attempt, so any failure is caused by contention.
+
+Usage: python tools/benchmarks/trust_consume.py [--consumers N] [--uses N]
+                                                [--connection URL]
+
+"""
+
+from __future__ import print_function
+
+import argparse
+import collections
+import datetime
+import os
+import shutil
+import tempfile
+import threading
+import time
+import uuid
+
+from keystone.common import sql
+from keystone import config
+from keystone.trust.backends import sql as trust_sql
+
+
+CONF = config.CONF
+
+
+def create_trust(driver, remaining_uses):
+    trust_id = uuid.uuid4().hex
+    expires_at = datetime.datetime.utcnow() + datetime.timedelta(hours=1)
+    driver.create_trust(trust_id,
+                        {'trustor_user_id': uuid.uuid4().hex,
+                         'trustee_user_id': uuid.uuid4().hex,
+                         'project_id': uuid.uuid4().hex,
+                         'expires_at': expires_at,
+                         'impersonation': False,
+                         'remaining_uses': remaining_uses},
+                        roles=[{'id': uuid.uuid4().hex}])
+    return trust_id
+
+
+def consume(driver, trust_id, uses, start, failures, lock):
+    start.wait()
+    for i in range(uses):
+        try:
+            driver.consume_use(trust_id)
+        except Exception as e:
+            with lock:
+                failures[type(e).__name__] += 1
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--consumers', type=int, default=100)
+    parser.add_argument('--uses', type=int, default=20,
+                        help='uses consumed by each consumer')
+    parser.add_argument('--connection',
+                        help='database URL, defaults to a temporary SQLite '
+                             'file')
+    args = parser.parse_args()
+
+    CONF([], project='keystone', default_config_files=[])
+    sql.initialize()
+    tempdir = None
+    connection = args.connection
+    if connection is None:
+        tempdir = tempfile.mkdtemp()
+        connection = 'sqlite:///%s' % os.path.join(tempdir, 'keystone.db')
+    CONF.set_override('connection', connection, group='database')
+    CONF.set_override('max_pool_size', args.consumers, group='database')
+
+    engine = sql.get_engine()
+    tables = [trust_sql.TrustModel.__table__, trust_sql.TrustRole.__table__]
+    sql.ModelBase.metadata.create_all(bind=engine, tables=tables)
+    try:
+        driver = trust_sql.Trust()
+        trust_id = create_trust(driver, args.consumers * args.uses)
+
+        start = threading.Event()
+        failures = collections.Counter()
+        lock = threading.Lock()
+        threads = [threading.Thread(target=consume,
+                                    args=(driver, trust_id, args.uses, start,
+                                          failures, lock))
+                   for i in range(args.consumers)]
+        for thread in threads:
+            thread.start()
+        began = time.time()
+        start.set()
+        for thread in threads:
+            thread.join()
+        elapsed = time.time() - began
+
+        attempts = args.consumers * args.uses
+        consumed = attempts - sum(failures.values())
+        print('%d consumers, %d uses each, on %s' %
+              (args.consumers, args.uses, engine.name))
+        print('consumed:   %10d uses' % consumed)
+        print('throughput: %10.1f uses/s' % (consumed / elapsed))
+        for name, count in sorted(failures.items()):
+            print('failed:     %10d %s' % (count, name))
+    finally:
+        sql.ModelBase.metadata.drop_all(bind=engine, tables=tables)
+        sql.cleanup()
+        if tempdir is not None:
+            shutil.rmtree(tempdir)
+
+
+if __name__ == '__main__':
+    main()